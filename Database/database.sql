@@ -256,10 +256,10 @@ CREATE TABLE Pricing_rules(
 
 -- Data for Pricing Rules
 INSERT INTO Pricing_rules (Rule_name, Rule_type, Multiplier_min, Multiplier_max, Is_active) VALUES
-('Early Bird Discount', 'time_based', 0.90, 1.00, TRUE),
+('Early Bird Discount', 'time_based', 0.85, 1.00, TRUE),
 ('Standard Pricing', 'time_based', 1.00, 1.20, TRUE),
-('Last Minute Premium', 'time_based', 1.30, 1.60, TRUE),
-('Low Demand', 'demand_based', 0.95, 1.00, TRUE),
+('Last Minute Premium', 'time_based', 1.30, 2.00, TRUE),
+('Low Demand', 'demand_based', 0.90, 1.00, TRUE),
 ('Moderate Demand', 'demand_based', 1.10, 1.30, TRUE),
 ('High Demand', 'demand_based', 1.40, 1.80, TRUE),
 ('Very High Demand', 'demand_based', 1.80, 2.20, TRUE),
@@ -295,4 +295,21 @@ CREATE TABLE payment_transactions(
     Index idx_booking (BookingID),
     Index idx_status (Transaction_status)
 );
+
+-- PNR Blocks Table (ranges of the PNR sequence claimed by app workers)
+CREATE TABLE Pnr_blocks(
+    BlockID INT PRIMARY KEY AUTO_INCREMENT,
+    Claimed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Idempotency Keys Table (stored responses for retried booking requests)
+CREATE TABLE Idempotency_keys(
+    KeyID INT PRIMARY KEY AUTO_INCREMENT,
+    Scope_key VARCHAR(320) NOT NULL UNIQUE,
+    Request_hash CHAR(64) NOT NULL,
+    Status_code INT NULL,
+    Response_body MEDIUMTEXT NULL,
+    Created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    Index idx_created (Created_at)
+);
 show tables;
\ No newline at end of file
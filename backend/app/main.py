@@ -16,6 +16,9 @@ load_dotenv()
 # Import routers
 from app.routers import users, flights, bookings, admin, price_history
 from app.services.simulator import market_simulator
+from app.services.pricing_engine import pricing_rules_reload_loop
+from app.services.search_index import search_index_reconcile_loop
+from app.services.hold_expiry import hold_expiry_loop
 from app.database_connection import engine, Base
 
 # Configure logging
@@ -40,17 +43,32 @@ async def lifespan(app: FastAPI):
         market_simulator.scheduler_loop(interval=simulator_interval)
     )
     logger.info(f"Market simulator started (interval: {simulator_interval}s)")
+
+    # Keep the pricing plan in sync with the Pricing_rules table
+    rules_interval = int(os.getenv("PRICING_RULES_RELOAD_INTERVAL", "60"))
+    rules_task = asyncio.create_task(pricing_rules_reload_loop(interval=rules_interval))
+
+    # Build the in-memory search index, then reconcile it with the database periodically
+    index_interval = int(os.getenv("SEARCH_INDEX_RECONCILE_INTERVAL", "300"))
+    index_refresh = float(os.getenv("SEARCH_INDEX_REFRESH_INTERVAL", "1"))
+    index_task = asyncio.create_task(
+        search_index_reconcile_loop(interval=index_interval, refresh_interval=index_refresh)
+    )
+
+    # Release pending holds as their Expiry_time passes
+    hold_task = asyncio.create_task(hold_expiry_loop())
     
     yield  # Application runs here
     
     # Shutdown
     logger.info("Shutting down Flight Booking API...")
     market_simulator.stop()
-    simulator_task.cancel()
-    try:
-        await simulator_task
-    except asyncio.CancelledError:
-        pass
+    for task in (simulator_task, rules_task, index_task, hold_task):
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
     logger.info("Shutdown complete")
 
 # Create FastAPI app
@@ -208,10 +226,17 @@ async def api_info():
             },
             "flights": {
                 "list_all": "GET /api/v1/flights/",
+                "export": "GET /api/v1/flights/export",
                 "search": "POST /api/v1/flights/search",
+                "search_faceted": "POST /api/v1/flights/search/faceted",
+                "search_connections": "POST /api/v1/flights/search/connections",
+                "search_round_trip": "POST /api/v1/flights/search/round-trip",
+                "fare_calendar": "GET /api/v1/flights/calendar",
                 "details": "GET /api/v1/flights/{flight_id}",
+                "details_batch": "GET /api/v1/flights/batch?ids=1,2,3",
                 "airlines": "GET /api/v1/flights/airlines/list",
-                "airports": "GET /api/v1/flights/airports/list"
+                "airports": "GET /api/v1/flights/airports/list",
+                "airport_suggest": "GET /api/v1/flights/airports/suggest?q=del"
             },
             "bookings": {
                 "create": "POST /api/v1/bookings/create",
@@ -224,7 +249,14 @@ async def api_info():
                 "add_flight": "POST /api/v1/admin/flights",
                 "update_flight": "PUT /api/v1/admin/flights/{flight_id}",
                 "delete_flight": "DELETE /api/v1/admin/flights/{flight_id}",
-                "stats": "GET /api/v1/admin/stats"
+                "stats": "GET /api/v1/admin/stats",
+                "price_cache": "GET /api/v1/admin/pricing/cache",
+                "repricing_scheduler": "GET /api/v1/admin/pricing/scheduler",
+                "search_index": "GET /api/v1/admin/search-index",
+                "hold_expiry": "GET /api/v1/admin/holds",
+                "idempotency": "GET /api/v1/admin/idempotency",
+                "reload_pricing_rules": "POST /api/v1/admin/pricing/reload",
+                "reload_reference_data": "POST /api/v1/admin/reference/reload"
             },
             "price_history": {
                 "history": "GET /api/v1/price-history/{flight_id}",
@@ -157,6 +157,26 @@ class PriceHistory(Base):
     flight = relationship("Flight", back_populates="price_history")
 
 
+class PnrBlock(Base):
+    __tablename__ = "Pnr_blocks"
+    
+    # Each row hands its process the PNR sequence values
+    # [(BlockID - 1) * block size, BlockID * block size)
+    BlockID = Column(Integer, primary_key=True, autoincrement=True)
+    Claimed_at = Column(TIMESTAMP, default=datetime.utcnow)
+
+
+class IdempotencyKey(Base):
+    __tablename__ = "Idempotency_keys"
+    
+    KeyID = Column(Integer, primary_key=True, autoincrement=True)
+    Scope_key = Column(String(320), nullable=False, unique=True)  # endpoint:user:Idempotency-Key
+    Request_hash = Column(String(64), nullable=False)
+    Status_code = Column(Integer, nullable=True)  # NULL while the first request is running
+    Response_body = Column(Text, nullable=True)
+    Created_at = Column(TIMESTAMP, default=datetime.utcnow, index=True)
+
+
 class PaymentTransaction(Base):
     __tablename__ = "payment_transactions"
     
@@ -7,6 +7,8 @@ from datetime import datetime
 from pydantic import BaseModel
 from app.database_connection import get_db
 from app.models import Flight, Airline, Airport, SeatInventory
+from app.services.inventory_events import notify_inventory_changed
+from app.services.pricing_engine import quote_cache, reload_pricing_rules
 
 router = APIRouter(prefix="/api/v1/admin", tags=["Admin"])
 
@@ -112,6 +114,7 @@ def add_flight(
     
     db.commit()
     db.refresh(new_flight)
+    notify_inventory_changed([new_flight.FlightID])
     
     return {
         "message": "Flight added successfully",
@@ -147,6 +150,7 @@ def update_flight(
         flight.Flight_status = update_data.Flight_status
     
     db.commit()
+    notify_inventory_changed([flight_id])
     
     return {
         "message": "Flight updated successfully",
@@ -171,12 +175,71 @@ def delete_flight(
     
     db.delete(flight)
     db.commit()
+    notify_inventory_changed([flight_id])
     
     return {
         "message": "Flight deleted successfully",
         "flight_number": flight.Flight_Number
     }
 
+@router.get("/pricing/cache")
+def get_price_cache_stats():
+
+    return quote_cache.stats()
+
+@router.get("/pricing/scheduler")
+def get_repricing_scheduler_stats():
+
+    from app.services.repricing_scheduler import repricing_scheduler
+
+    return repricing_scheduler.stats()
+
+@router.get("/holds")
+def get_hold_expiry_stats():
+
+    from app.services.hold_expiry import hold_expiry
+
+    return hold_expiry.stats()
+
+@router.get("/idempotency")
+def get_idempotency_stats():
+
+    from app.services.idempotency import idempotency_store
+
+    return idempotency_store.stats()
+
+@router.get("/search-index")
+def get_search_index_stats():
+
+    from app.services.search_index import search_index
+
+    return search_index.stats()
+
+@router.post("/pricing/reload")
+def reload_pricing_plan(db: Session = Depends(get_db)):
+
+    plan = reload_pricing_rules(db)
+    return {
+        "message": "Pricing rules reloaded",
+        "plan_version": plan.version,
+        "factor_bands": dict(plan.factor_bands),
+        "seat_factors": plan.seat_factors,
+        "time_factors": plan.time_factors,
+        "last_day_factor": plan.last_day_factor,
+        "final_hour_factor": plan.final_hour_factor
+    }
+
+@router.post("/reference/reload")
+def reload_reference(db: Session = Depends(get_db)):
+
+    # After editing Airlines or Airports rows, instead of waiting for the cache TTL
+    from app.services.reference_data import reload_reference_data
+
+    return {
+        "message": "Reference data reloaded",
+        "etags": reload_reference_data(db)
+    }
+
 @router.get("/stats")
 def get_system_stats(db: Session = Depends(get_db)):
 
@@ -1,61 +1,83 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from typing import List
+from fastapi import APIRouter, Depends, Header, HTTPException, Response, status
+from sqlalchemy.orm import Session, joinedload, selectinload
+from typing import List, Optional
 from app.database_connection import get_db
 from app.models import User, Booking, Passenger, Flight, Airline, Airport
 from app.schemas import BookingCreate, BookingResponse, PassengerResponse
 from app.utils.security import get_current_user
 from app.services.booking_service import booking_service
+from app.services.idempotency import idempotency_store
+from app.utils.fast_json import json_response
 
 router = APIRouter(prefix="/api/v1/bookings", tags=["Bookings"])
 
+BOOKING_RELATIONS = (
+    joinedload(Booking.flight).joinedload(Flight.airline),
+    joinedload(Booking.flight).joinedload(Flight.departure_airport),
+    joinedload(Booking.flight).joinedload(Flight.arrival_airport),
+    selectinload(Booking.passengers),
+)
+
 @router.post("/create", response_model=BookingResponse, status_code=status.HTTP_201_CREATED)
 def create_booking(
     booking_data: BookingCreate,
+    idempotency_key: Optional[str] = Header(default=None),
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
 
-    new_booking = booking_service.create_booking(
-        booking_data=booking_data,
-        user_id=current_user.UserID,
-        db=db
-    )
+    def create() -> Response:
+        new_booking = booking_service.create_booking(
+            booking_data=booking_data,
+            user_id=current_user.UserID,
+            db=db
+        )
+        # Flight and passengers come back attached to the booking
+        return json_response(_booking_payload(new_booking), status_code=status.HTTP_201_CREATED)
     
-    # Fetch complete booking details
-    return get_booking_by_pnr(new_booking.pnr, current_user, db)
+    # A retry with the same Idempotency-Key gets the first booking back
+    return idempotency_store.run(
+        db, idempotency_key, f"create:{current_user.UserID}", booking_data.model_dump_json(), create
+    )
 
 @router.post("/{pnr}/confirm")
 def confirm_booking(
     pnr: str,
     payment_method: str,
+    idempotency_key: Optional[str] = Header(default=None),
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
 
-    # Verify booking belongs to user
-    booking = db.query(Booking).filter(Booking.pnr == pnr.upper()).first()
-    if not booking:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Booking not found"
-        )
-    
-    if booking.UserID != current_user.UserID:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="You don't have permission to confirm this booking"
-        )
-    
-    confirmed_booking = booking_service.confirm_booking(pnr.upper(), payment_method, db)
+    def confirm() -> Response:
+        # Verify booking belongs to user
+        booking = db.query(Booking).filter(Booking.pnr == pnr.upper()).first()
+        if not booking:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Booking not found"
+            )
+        
+        if booking.UserID != current_user.UserID:
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="You don't have permission to confirm this booking"
+            )
+        
+        confirmed_booking = booking_service.confirm_booking(pnr.upper(), payment_method, db, booking=booking)
+        
+        return json_response({
+            "message": "Booking confirmed successfully",
+            "pnr": confirmed_booking.pnr,
+            "status": confirmed_booking.Booking_status,
+            "payment_status": confirmed_booking.Payment_status,
+            "total_amount": float(confirmed_booking.Total_price)
+        })
     
-    return {
-        "message": "Booking confirmed successfully",
-        "pnr": confirmed_booking.pnr,
-        "status": confirmed_booking.Booking_status,
-        "payment_status": confirmed_booking.Payment_status,
-        "total_amount": float(confirmed_booking.Total_price)
-    }
+    # A retried payment replays the first confirmation instead of charging again
+    return idempotency_store.run(
+        db, idempotency_key, f"confirm:{current_user.UserID}:{pnr.upper()}", payment_method, confirm
+    )
 
 @router.get("/my-bookings", response_model=List[BookingResponse])
 def get_my_bookings(
@@ -63,49 +85,12 @@ def get_my_bookings(
     db: Session = Depends(get_db)
 ):
 
-    bookings = db.query(Booking).filter(Booking.UserID == current_user.UserID).all()
+    # Flight, airline, airports and passengers for every booking in two queries
+    bookings = db.query(Booking).options(*BOOKING_RELATIONS).filter(
+        Booking.UserID == current_user.UserID
+    ).all()
     
-    result = []
-    for booking in bookings:
-        flight = db.query(Flight).filter(Flight.FlightID == booking.FlightID).first()
-        airline = db.query(Airline).filter(Airline.AirlineID == flight.AirlineID).first()
-        origin = db.query(Airport).filter(Airport.AirportID == flight.Departure_AirportID).first()
-        dest = db.query(Airport).filter(Airport.AirportID == flight.Arrival_AirportID).first()
-        passengers = db.query(Passenger).filter(Passenger.BookingID == booking.BookingID).all()
-        
-        result.append(BookingResponse(
-            BookingID=booking.BookingID,
-            pnr=booking.pnr,
-            FlightID=booking.FlightID,
-            flight_details={
-                "flight_number": flight.Flight_Number,
-                "airline": airline.Airline_Name,
-                "origin": f"{origin.City} ({origin.Airport_Code})",
-                "destination": f"{dest.City} ({dest.Airport_Code})",
-                "departure": flight.Departure_Time.isoformat(),
-                "arrival": flight.Arrival_Time.isoformat()
-            },
-            Seat_class=booking.Seat_class,
-            Num_passengers=booking.Num_passengers,
-            Total_price=float(booking.Total_price),
-            Booking_status=booking.Booking_status,
-            Payment_status=booking.Payment_status,
-            Booking_Date=booking.Booking_Date,
-            Expiry_time=booking.Expiry_time,
-            passengers=[PassengerResponse(
-                PassengerID=p.PassengerID,
-                First_name=p.First_name,
-                Last_name=p.Last_name,
-                Date_of_birth=p.Date_of_birth,
-                Gender=p.Gender,
-                Passport_number=p.Passport_number,
-                Nationality=p.Nationality,
-                Email=p.Email,
-                Phone=p.Phone
-            ) for p in passengers]
-        ))
-    
-    return result
+    return json_response([_booking_payload(booking, detailed=False) for booking in bookings])
 
 @router.get("/{pnr}", response_model=BookingResponse)
 def get_booking_by_pnr(
@@ -114,7 +99,11 @@ def get_booking_by_pnr(
     db: Session = Depends(get_db)
 ):
 
-    booking = db.query(Booking).filter(Booking.pnr == pnr.upper()).first()
+    return json_response(_booking_payload(_owned_booking(pnr, current_user, db)))
+
+def _owned_booking(pnr: str, current_user: User, db: Session) -> Booking:
+
+    booking = db.query(Booking).options(*BOOKING_RELATIONS).filter(Booking.pnr == pnr.upper()).first()
     
     if not booking:
         raise HTTPException(
@@ -129,47 +118,53 @@ def get_booking_by_pnr(
             detail="You don't have permission to view this booking"
         )
     
-    # Get flight details
-    flight = db.query(Flight).filter(Flight.FlightID == booking.FlightID).first()
-    airline = db.query(Airline).filter(Airline.AirlineID == flight.AirlineID).first()
-    origin = db.query(Airport).filter(Airport.AirportID == flight.Departure_AirportID).first()
-    dest = db.query(Airport).filter(Airport.AirportID == flight.Arrival_AirportID).first()
-    passengers = db.query(Passenger).filter(Passenger.BookingID == booking.BookingID).all()
-    
-    return BookingResponse(
-        BookingID=booking.BookingID,
-        pnr=booking.pnr,
-        FlightID=booking.FlightID,
-        flight_details={
-            "flight_number": flight.Flight_Number,
-            "airline": airline.Airline_Name,
-            "airline_code": airline.Airline_Code,
-            "origin": f"{origin.City} ({origin.Airport_Code})",
-            "destination": f"{dest.City} ({dest.Airport_Code})",
-            "departure": flight.Departure_Time.isoformat(),
-            "arrival": flight.Arrival_Time.isoformat(),
+    return booking
+
+def _booking_payload(booking: Booking, detailed: bool = True) -> dict:
+
+    # BookingResponse as a plain dict, encoded without a second validation
+    flight = booking.flight
+    origin = flight.departure_airport
+    dest = flight.arrival_airport
+    flight_details = {
+        "flight_number": flight.Flight_Number,
+        "airline": flight.airline.Airline_Name,
+        "origin": f"{origin.City} ({origin.Airport_Code})",
+        "destination": f"{dest.City} ({dest.Airport_Code})",
+        "departure": flight.Departure_Time.isoformat(),
+        "arrival": flight.Arrival_Time.isoformat()
+    }
+    if detailed:
+        flight_details.update({
+            "airline_code": flight.airline.Airline_Code,
             "duration": flight.Duration,
             "status": flight.Flight_status
-        },
-        Seat_class=booking.Seat_class,
-        Num_passengers=booking.Num_passengers,
-        Total_price=float(booking.Total_price),
-        Booking_status=booking.Booking_status,
-        Payment_status=booking.Payment_status,
-        Booking_Date=booking.Booking_Date,
-        Expiry_time=booking.Expiry_time,
-        passengers=[PassengerResponse(
-            PassengerID=p.PassengerID,
-            First_name=p.First_name,
-            Last_name=p.Last_name,
-            Date_of_birth=p.Date_of_birth,
-            Gender=p.Gender,
-            Passport_number=p.Passport_number,
-            Nationality=p.Nationality,
-            Email=p.Email,
-            Phone=p.Phone
-        ) for p in passengers]
-    )
+        })
+    
+    return {
+        "BookingID": booking.BookingID,
+        "pnr": booking.pnr,
+        "FlightID": booking.FlightID,
+        "flight_details": flight_details,
+        "Seat_class": booking.Seat_class,
+        "Num_passengers": booking.Num_passengers,
+        "Total_price": float(booking.Total_price),
+        "Booking_status": booking.Booking_status,
+        "Payment_status": booking.Payment_status,
+        "Booking_Date": booking.Booking_Date,
+        "Expiry_time": booking.Expiry_time,
+        "passengers": [{
+            "First_name": p.First_name,
+            "Last_name": p.Last_name,
+            "Date_of_birth": p.Date_of_birth,
+            "Gender": p.Gender,
+            "Passport_number": p.Passport_number,
+            "Nationality": p.Nationality,
+            "Email": p.Email,
+            "Phone": p.Phone,
+            "PassengerID": p.PassengerID
+        } for p in booking.passengers]
+    }
 
 @router.delete("/{pnr}/cancel")
 def cancel_booking(
@@ -192,7 +187,7 @@ def cancel_booking(
             detail="You don't have permission to cancel this booking"
         )
     
-    result = booking_service.cancel_booking(pnr.upper(), db)
+    result = booking_service.cancel_booking(pnr.upper(), db, booking=booking)
     return result
 
 @router.get("/health")
@@ -1,81 +1,235 @@
 # Flight search and listing endpoints with dynamic pricing
 
 
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, Header, HTTPException, status, Query
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 from sqlalchemy import and_, or_
-from datetime import datetime, date
-from typing import List, Optional
+from dataclasses import fields as dataclass_fields
+from datetime import datetime, date, timedelta
+from typing import List, Optional, Sequence, Tuple
 from app.database_connection import get_db
 from app.models import Flight, Airline, Airport, SeatInventory
 from app.schemas import (
     FlightSearchRequest,
     FlightSearchResponse,
+    FlightSearchRow,
+    FacetedSearchResponse,
     FlightDetailResponse,
+    FareCalendarResponse,
+    ConnectingSearchRequest,
+    ConnectingSearchResponse,
+    RoundTripSearchRequest,
+    RoundTripSearchResponse,
+    SeatClass,
     AirlineResponse,
     AirportResponse
 )
-from app.services.pricing_engine import get_dynamic_price
+from app.services.pricing_engine import get_dynamic_price, get_dynamic_prices_batch
+from app.services.fare_calendar import MAX_CALENDAR_DAYS, get_fare_calendar
+from app.services.flight_queries import (
+    after_position,
+    airport_id,
+    cursor_position,
+    flight_with_all_inventory,
+    flights_with_all_inventory,
+    flights_with_inventory,
+    iter_flight_chunks,
+    order_flights
+)
+from app.utils.helpers import decode_cursor, encode_cursor
+from app.utils.fast_json import dumps, json_response
+from app.services.search_index import IndexedFlight, search_index
+from app.services.itinerary_search import find_itineraries, price_itineraries
+from app.services.search_facets import SearchFilters, filter_and_facet, sort_and_page
+from app.services.round_trip import load_round_trip_candidates, top_k_combinations
+from app.services.reference_data import reference_response
+from app.services.airport_suggest import suggest_airports
 
 router = APIRouter(prefix="/api/v1/flights", tags=["Flights"])
 
+# Upper bound on flights per /batch request
+MAX_BATCH_FLIGHTS = 200
+
+SEARCH_FIELDS = tuple(field.name for field in dataclass_fields(FlightSearchRow))
+DETAIL_FIELDS = tuple(FlightDetailResponse.model_fields)
+
+def _search_response(flight: Flight, seat_inv: SeatInventory, price_data: dict, seat_class: str) -> FlightSearchRow:
+
+    # Price-only quotes (breakdown=False) carry just 'final_price'
+    return FlightSearchRow(
+        FlightID=flight.FlightID,
+        Flight_Number=flight.Flight_Number,
+        airline_name=flight.airline.Airline_Name,
+        airline_code=flight.airline.Airline_Code,
+        origin_city=flight.departure_airport.City,
+        origin_code=flight.departure_airport.Airport_Code,
+        destination_city=flight.arrival_airport.City,
+        destination_code=flight.arrival_airport.Airport_Code,
+        Departure_Time=flight.Departure_Time,
+        Arrival_Time=flight.Arrival_Time,
+        Duration=flight.Duration,
+        base_price=float(flight.Price),
+        dynamic_price=price_data['final_price'],
+        price_breakdown=price_data if len(price_data) > 1 else None,
+        seats_available=seat_inv.Available_seats,
+        seat_class=seat_class
+    )
+
+def _price_for(flight: Flight, seat_inv: SeatInventory, seat_class: str, breakdown: bool = True) -> dict:
+
+    return get_dynamic_price(
+        base_fare=float(flight.Price),
+        seats_available=seat_inv.Available_seats,
+        total_seats=seat_inv.Total_Seats,
+        departure_time=flight.Departure_Time,
+        origin_code=flight.departure_airport.Airport_Code,
+        destination_code=flight.arrival_airport.Airport_Code,
+        airline_code=flight.airline.Airline_Code,
+        seat_class=seat_class,
+        flight_id=flight.FlightID,
+        breakdown=breakdown
+    )
+
+def _quote_rows(prices: dict, count: int) -> List[dict]:
+
+    # Batch quote columns as one plain dict per row, in the same shape and
+    # rounding as a get_dynamic_price quote for the listing
+    columns = {key: values.tolist() for key, values in prices.items()}
+    return [{key: values[i] for key, values in columns.items()} for i in range(count)]
+
+def _select_fields(
+    fields: Optional[Sequence[str]],
+    include_breakdown: bool,
+    known: Tuple[str, ...]
+) -> Optional[Tuple[str, ...]]:
+
+    # Fields to keep in each result, or None for the full row
+    if not fields and include_breakdown:
+        return None
+    selected = tuple(dict.fromkeys(fields)) if fields else known
+    unknown = [name for name in selected if name not in known]
+    if unknown:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unknown fields: {', '.join(unknown)}"
+        )
+    if not include_breakdown:
+        selected = tuple(name for name in selected if name != 'price_breakdown')
+    return selected
+
+def _split_fields(fields: Optional[str]) -> Optional[List[str]]:
+    if fields is None:
+        return None
+    return [name.strip() for name in fields.split(',') if name.strip()]
+
+def _wants_breakdown(selected: Optional[Tuple[str, ...]]) -> bool:
+    return selected is None or 'price_breakdown' in selected
+
+def _project(rows: list, selected: Optional[Tuple[str, ...]]) -> list:
+    if selected is None:
+        return rows
+    return [{name: getattr(row, name) for name in selected} for row in rows]
+
+def _decode_position(cursor: Optional[str]) -> Optional[dict]:
+
+    if cursor is None:
+        return None
+    try:
+        return decode_cursor(cursor)
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid cursor"
+        )
+
 @router.get("/", response_model=List[FlightSearchResponse])
 def list_all_flights(
     skip: int = 0,
     limit: int = 100,
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor value from the previous page"),
+    order_by: str = Query("flight_id", pattern="^(flight_id|departure_time)$"),
+    fields: Optional[str] = Query(None, description="Comma-separated result fields to return"),
+    include_breakdown: bool = Query(True, description="Include the per-factor price_breakdown"),
     db: Session = Depends(get_db)
 ):
 
-    flights = db.query(Flight).offset(skip).limit(limit).all()
+    selected = _select_fields(_split_fields(fields), include_breakdown, SEARCH_FIELDS)
+    breakdown = _wants_breakdown(selected)
+    
+    # Flights, airlines, airports and economy inventory in one query. With a
+    # cursor the page starts right after it (skip is ignored), so deep pages
+    # cost the same as the first one.
+    query = flights_with_inventory(db, 'economy')
+    position = _decode_position(cursor)
+    if position is not None:
+        try:
+            query = order_flights(after_position(query, position, order_by), order_by)
+        except ValueError as e:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    else:
+        query = order_flights(query, order_by).offset(skip)
+    rows = query.limit(limit).all()
+    
+    # A full page may have more behind it
+    headers = {}
+    if rows and len(rows) == limit:
+        headers["X-Next-Cursor"] = encode_cursor(cursor_position(rows[-1][0], order_by))
     
     result = []
-    for flight in flights:
-        # Get airline and airport details
-        airline = db.query(Airline).filter(Airline.AirlineID == flight.AirlineID).first()
-        origin_airport = db.query(Airport).filter(Airport.AirportID == flight.Departure_AirportID).first()
-        dest_airport = db.query(Airport).filter(Airport.AirportID == flight.Arrival_AirportID).first()
-        
-        # Get seat inventory
-        seat_inv = db.query(SeatInventory).filter(
-            SeatInventory.FlightID == flight.FlightID,
-            SeatInventory.Class == 'economy'
-        ).first()
-        
+    for flight, seat_inv in rows:
         if not seat_inv:
             continue
         
-        # Calculate dynamic price
-        price_data = get_dynamic_price(
-            base_fare=float(flight.Price),
-            seats_available=seat_inv.Available_seats,
-            total_seats=seat_inv.Total_Seats,
-            departure_time=flight.Departure_Time,
-            origin_code=origin_airport.Airport_Code,
-            destination_code=dest_airport.Airport_Code,
-            airline_code=airline.Airline_Code,
-            seat_class='economy'
+        price_data = _price_for(flight, seat_inv, 'economy', breakdown)
+        result.append(_search_response(flight, seat_inv, price_data, 'economy'))
+    
+    return json_response(_project(result, selected), headers=headers)
+
+@router.get("/export")
+def export_flights(
+    seat_class: SeatClass = SeatClass.economy,
+    order_by: str = Query("flight_id", pattern="^(flight_id|departure_time)$"),
+    cursor: Optional[str] = Query(None, description="Resume after this position"),
+    db: Session = Depends(get_db)
+):
+
+    # Whole schedule as NDJSON, one priced flight per line. Rows come from a
+    # server-side cursor in chunks and each chunk is priced in one batch, so
+    # memory stays flat however many flights there are.
+    position = _decode_position(cursor)
+    if position is not None and position.get('o') != order_by:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Cursor was issued for a different ordering"
         )
-        
-        result.append(FlightSearchResponse(
-            FlightID=flight.FlightID,
-            Flight_Number=flight.Flight_Number,
-            airline_name=airline.Airline_Name,
-            airline_code=airline.Airline_Code,
-            origin_city=origin_airport.City,
-            origin_code=origin_airport.Airport_Code,
-            destination_city=dest_airport.City,
-            destination_code=dest_airport.Airport_Code,
-            Departure_Time=flight.Departure_Time,
-            Arrival_Time=flight.Arrival_Time,
-            Duration=flight.Duration,
-            base_price=float(flight.Price),
-            dynamic_price=price_data['final_price'],
-            price_breakdown=price_data,
-            seats_available=seat_inv.Available_seats,
-            seat_class='economy'
-        ))
     
-    return result
+    # The stream outlives the request-scoped session
+    stream_db = Session(bind=db.get_bind())
+    
+    def generate():
+        try:
+            for chunk in iter_flight_chunks(stream_db, seat_class.value, order_by, position):
+                prices = get_dynamic_prices_batch(
+                    base_fares=[float(flight.Price) for flight, _ in chunk],
+                    seats_available=[seat_inv.Available_seats for _, seat_inv in chunk],
+                    total_seats=[seat_inv.Total_Seats for _, seat_inv in chunk],
+                    departure_times=[flight.Departure_Time for flight, _ in chunk],
+                    origin_codes=[flight.departure_airport.Airport_Code for flight, _ in chunk],
+                    destination_codes=[flight.arrival_airport.Airport_Code for flight, _ in chunk],
+                    airline_codes=[flight.airline.Airline_Code for flight, _ in chunk],
+                    seat_classes=seat_class.value,
+                    flight_ids=[flight.FlightID for flight, _ in chunk]
+                )
+                lines = [
+                    dumps(_search_response(flight, seat_inv, price_data, seat_class.value))
+                    for (flight, seat_inv), price_data in zip(chunk, _quote_rows(prices, len(chunk)))
+                ]
+                yield b"\n".join(lines) + b"\n"
+        finally:
+            stream_db.close()
+    
+    return StreamingResponse(generate(), media_type="application/x-ndjson")
 
 @router.post("/search", response_model=List[FlightSearchResponse])
 def search_flights(
@@ -83,29 +237,104 @@ def search_flights(
     db: Session = Depends(get_db)
 ):
 
-    # Get airport IDs
-    origin_airport = db.query(Airport).filter(Airport.Airport_Code == search.origin.upper()).first()
-    dest_airport = db.query(Airport).filter(Airport.Airport_Code == search.destination.upper()).first()
+    # Filtered, sorted page of results; X-Total-Count is the number of
+    # matches before offset/limit
+    selected = _select_fields(search.fields, search.include_breakdown, SEARCH_FIELDS)
+    candidates = _search_candidates(search, db, _wants_breakdown(selected))
+    matches, _ = filter_and_facet(candidates, _search_filters(search), with_facets=False)
+    page = sort_and_page(matches, search.sort_by, search.offset, search.limit)
+    return json_response(_project(page, selected), headers={"X-Total-Count": str(len(matches))})
+
+@router.post("/search/faceted", response_model=FacetedSearchResponse)
+def search_flights_faceted(
+    search: FlightSearchRequest,
+    db: Session = Depends(get_db)
+):
+
+    # Same results as /search, plus per-airline, departure band and price
+    # histogram counts taken in the same pass as the filters
+    selected = _select_fields(search.fields, search.include_breakdown, SEARCH_FIELDS)
+    candidates = _search_candidates(search, db, _wants_breakdown(selected))
+    matches, facets = filter_and_facet(candidates, _search_filters(search), search.price_bucket)
+    page = sort_and_page(matches, search.sort_by, search.offset, search.limit)
+    return json_response({
+        "results": _project(page, selected),
+        "total": len(matches),
+        "facets": facets.as_dict()
+    })
+
+def _search_filters(search: FlightSearchRequest) -> SearchFilters:
+
+    return SearchFilters(
+        airlines=frozenset(code.upper() for code in search.airlines or ()),
+        departure_bands=frozenset(band.value for band in search.departure_bands or ()),
+        max_duration=search.max_duration,
+        min_price=search.min_price,
+        max_price=search.max_price or None
+    )
+
+def _search_candidates(search: FlightSearchRequest, db: Session, breakdown: bool) -> List[FlightSearchRow]:
+
+    # Every priced flight on the route and day with enough seats, unfiltered
+    origin_code, dest_code = search.origin.upper(), search.destination.upper()
+    seat_class = search.seat_class.value if search.seat_class else 'economy'
     
-    if not origin_airport or not dest_airport:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Invalid airport code"
-        )
+    # Served from memory once the search index is built (it holds today onwards)
+    if search_index.is_ready and search.departure_date >= date.today():
+        return _search_from_index(search, origin_code, dest_code, seat_class, breakdown)
     
-    # Build query
-    query = db.query(Flight).filter(
+    # Flights with airline, airports and the requested class in one query;
+    # the airport codes are resolved in it too
+    rows = flights_with_inventory(db, seat_class).filter(
         and_(
-            Flight.Departure_AirportID == origin_airport.AirportID,
-            Flight.Arrival_AirportID == dest_airport.AirportID,
+            Flight.Departure_AirportID == airport_id(origin_code),
+            Flight.Arrival_AirportID == airport_id(dest_code),
             Flight.Departure_Time >= datetime.combine(search.departure_date, datetime.min.time()),
             Flight.Departure_Time < datetime.combine(search.departure_date, datetime.max.time()),
             Flight.Flight_status == 'scheduled'
         )
-    )
+    ).all()
     
-    flights = query.all()
+    if not rows:
+        # Only an empty result pays for telling a bad code from an empty day
+        known = db.query(Airport.Airport_Code).filter(
+            Airport.Airport_Code.in_([origin_code, dest_code])
+        ).all()
+        if len(known) < len({origin_code, dest_code}):
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Invalid airport code"
+            )
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"No flights found from {search.origin} to {search.destination} on {search.departure_date}"
+        )
     
+    result = []
+    for flight, seat_inv in rows:
+        if not seat_inv or seat_inv.Available_seats < search.passengers:
+            continue  # Skip if not enough seats
+        
+        price_data = _price_for(flight, seat_inv, seat_class, breakdown)
+        result.append(_search_response(flight, seat_inv, price_data, seat_class))
+    
+    return result
+
+def _search_from_index(
+    search: FlightSearchRequest,
+    origin_code: str,
+    dest_code: str,
+    seat_class: str,
+    breakdown: bool = True
+) -> List[FlightSearchRow]:
+
+    if not search_index.has_airport(origin_code) or not search_index.has_airport(dest_code):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Invalid airport code"
+        )
+    
+    flights = search_index.search(origin_code, dest_code, search.departure_date)
     if not flights:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -114,68 +343,267 @@ def search_flights(
     
     result = []
     for flight in flights:
-        airline = db.query(Airline).filter(Airline.AirlineID == flight.AirlineID).first()
-        
-        # Get seat inventory for requested class
-        seat_inv = db.query(SeatInventory).filter(
-            and_(
-                SeatInventory.FlightID == flight.FlightID,
-                SeatInventory.Class == search.seat_class
-            )
-        ).first()
-        
-        if not seat_inv or seat_inv.Available_seats < search.passengers:
+        seats = flight.inventory.get(seat_class)
+        if not seats or seats.available < search.passengers:
             continue  # Skip if not enough seats
         
-        # Calculate dynamic price
         price_data = get_dynamic_price(
-            base_fare=float(flight.Price),
-            seats_available=seat_inv.Available_seats,
-            total_seats=seat_inv.Total_Seats,
+            base_fare=flight.base_fare,
+            seats_available=seats.available,
+            total_seats=seats.total,
             departure_time=flight.Departure_Time,
-            origin_code=search.origin.upper(),
-            destination_code=search.destination.upper(),
-            airline_code=airline.Airline_Code,
-            seat_class=search.seat_class
+            origin_code=flight.origin_code,
+            destination_code=flight.destination_code,
+            airline_code=flight.airline_code,
+            seat_class=seat_class,
+            flight_id=flight.FlightID,
+            breakdown=breakdown
         )
-        
-        # Apply max price filter
-        if search.max_price and price_data['final_price'] > search.max_price:
-            continue
-        
-        result.append(FlightSearchResponse(
-            FlightID=flight.FlightID,
-            Flight_Number=flight.Flight_Number,
-            airline_name=airline.Airline_Name,
-            airline_code=airline.Airline_Code,
-            origin_city=origin_airport.City,
-            origin_code=origin_airport.Airport_Code,
-            destination_city=dest_airport.City,
-            destination_code=dest_airport.Airport_Code,
-            Departure_Time=flight.Departure_Time,
-            Arrival_Time=flight.Arrival_Time,
-            Duration=flight.Duration,
-            base_price=float(flight.Price),
-            dynamic_price=price_data['final_price'],
-            price_breakdown=price_data,
-            seats_available=seat_inv.Available_seats,
-            seat_class=search.seat_class
-        ))
-    
-    # Sort results
-    if search.sort_by == "price":
-        result.sort(key=lambda x: x.dynamic_price)
-    elif search.sort_by == "duration":
-        result.sort(key=lambda x: x.Duration)
-    elif search.sort_by == "departure_time":
-        result.sort(key=lambda x: x.Departure_Time)
+        result.append(_indexed_response(flight, price_data, seat_class))
     
     return result
 
+def _indexed_response(flight: IndexedFlight, price_data: dict, seat_class: str) -> FlightSearchRow:
+
+    return FlightSearchRow(
+        FlightID=flight.FlightID,
+        Flight_Number=flight.Flight_Number,
+        airline_name=flight.airline_name,
+        airline_code=flight.airline_code,
+        origin_city=flight.origin_city,
+        origin_code=flight.origin_code,
+        destination_city=flight.destination_city,
+        destination_code=flight.destination_code,
+        Departure_Time=flight.Departure_Time,
+        Arrival_Time=flight.Arrival_Time,
+        Duration=flight.Duration,
+        base_price=flight.base_fare,
+        dynamic_price=price_data['final_price'],
+        price_breakdown=price_data if len(price_data) > 1 else None,
+        seats_available=flight.inventory[seat_class].available,
+        seat_class=seat_class
+    )
+
+@router.post("/search/round-trip", response_model=RoundTripSearchResponse)
+def search_round_trip(
+    search: RoundTripSearchRequest,
+    db: Session = Depends(get_db)
+):
+
+    origin_code, dest_code = search.origin.upper(), search.destination.upper()
+    if origin_code == dest_code:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Origin and destination must differ"
+        )
+    if search.return_date < search.departure_date:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="return_date cannot be before departure_date"
+        )
+    
+    seat_class = search.seat_class.value if search.seat_class else 'economy'
+    outbound, inbound = load_round_trip_candidates(
+        db, origin_code, dest_code, search.departure_date, search.return_date, seat_class
+    )
+    
+    def bookable(flight: IndexedFlight) -> bool:
+        seats = flight.inventory.get(seat_class)
+        return seats is not None and seats.available >= search.passengers
+    
+    outbound = [flight for flight in outbound if bookable(flight)]
+    inbound = [flight for flight in inbound if bookable(flight)]
+    
+    # Both directions priced in one batch
+    candidates = outbound + inbound
+    result = {"combinations": [], "outbound_options": len(outbound), "return_options": len(inbound)}
+    if not outbound or not inbound:
+        return json_response(result)
+    
+    prices = get_dynamic_prices_batch(
+        base_fares=[flight.base_fare for flight in candidates],
+        seats_available=[flight.inventory[seat_class].available for flight in candidates],
+        total_seats=[flight.inventory[seat_class].total for flight in candidates],
+        departure_times=[flight.Departure_Time for flight in candidates],
+        origin_codes=[flight.origin_code for flight in candidates],
+        destination_codes=[flight.destination_code for flight in candidates],
+        airline_codes=[flight.airline_code for flight in candidates],
+        seat_classes=seat_class,
+        flight_ids=[flight.FlightID for flight in candidates]
+    )
+    breakdowns = _quote_rows(prices, len(candidates))
+    
+    # Cheapest first in each direction
+    outbound_order = sorted(range(len(outbound)), key=lambda i: breakdowns[i]['final_price'])
+    inbound_order = sorted(
+        range(len(outbound), len(candidates)), key=lambda i: breakdowns[i]['final_price']
+    )
+    outbound_prices = [breakdowns[i]['final_price'] for i in outbound_order]
+    inbound_prices = [breakdowns[i]['final_price'] for i in inbound_order]
+    turnaround = timedelta(minutes=search.min_turnaround_minutes)
+    # A return fits when it leaves after the outbound lands plus turnaround
+    earliest_return = [candidates[i].Arrival_Time + turnaround for i in outbound_order]
+    return_departures = [candidates[j].Departure_Time for j in inbound_order]
+    
+    pairs = top_k_combinations(
+        outbound_prices, inbound_prices, search.limit, earliest_return, return_departures
+    )
+    for i, j in pairs:
+        total = round(outbound_prices[i] + inbound_prices[j], 2)
+        # Pairs come out cheapest first, so nothing later fits under the cap
+        if search.max_price and total > search.max_price:
+            break
+        out_index, in_index = outbound_order[i], inbound_order[j]
+        result["combinations"].append({
+            "outbound": _indexed_response(candidates[out_index], breakdowns[out_index], seat_class),
+            "inbound": _indexed_response(candidates[in_index], breakdowns[in_index], seat_class),
+            "total_price": total
+        })
+    
+    return json_response(result)
+
+@router.post("/search/connections", response_model=ConnectingSearchResponse)
+def search_connecting_flights(search: ConnectingSearchRequest):
+
+    # Direct and connecting itineraries, answered from the in-memory index
+    if not search_index.is_ready:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Flight index is still loading, retry shortly"
+        )
+    
+    origin_code, dest_code = search.origin.upper(), search.destination.upper()
+    if not search_index.has_airport(origin_code) or not search_index.has_airport(dest_code):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Invalid airport code"
+        )
+    if search.min_connection_minutes >= search.max_connection_minutes:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="min_connection_minutes must be below max_connection_minutes"
+        )
+    
+    seat_class = search.seat_class.value if search.seat_class else 'economy'
+    itineraries, truncated = find_itineraries(
+        search_index,
+        origin_code,
+        dest_code,
+        search.departure_date,
+        seat_class,
+        search.passengers,
+        max_stops=search.max_stops,
+        min_connection=timedelta(minutes=search.min_connection_minutes),
+        max_connection=timedelta(minutes=search.max_connection_minutes)
+    )
+    prices = price_itineraries(itineraries, seat_class)
+    
+    result = []
+    for itinerary in itineraries:
+        first, last = itinerary[0], itinerary[-1]
+        result.append({
+            "legs": [
+                {
+                    "FlightID": leg.FlightID,
+                    "Flight_Number": leg.Flight_Number,
+                    "airline_name": leg.airline_name,
+                    "airline_code": leg.airline_code,
+                    "origin_code": leg.origin_code,
+                    "destination_code": leg.destination_code,
+                    "Departure_Time": leg.Departure_Time,
+                    "Arrival_Time": leg.Arrival_Time,
+                    "Duration": leg.Duration,
+                    "dynamic_price": prices[leg.FlightID],
+                    "seats_available": leg.inventory[seat_class].available
+                }
+                for leg in itinerary
+            ],
+            "stops": len(itinerary) - 1,
+            "Departure_Time": first.Departure_Time,
+            "Arrival_Time": last.Arrival_Time,
+            "total_duration": int((last.Arrival_Time - first.Departure_Time).total_seconds() // 60),
+            "total_price": round(sum(prices[leg.FlightID] for leg in itinerary), 2),
+            "seat_class": seat_class
+        })
+    
+    sort_keys = {
+        "price": lambda x: (x["total_price"], x["total_duration"]),
+        "duration": lambda x: (x["total_duration"], x["total_price"]),
+        "departure_time": lambda x: (x["Departure_Time"], x["total_price"]),
+    }
+    result.sort(key=sort_keys.get(search.sort_by, sort_keys["price"]))
+    
+    return {"itineraries": result[:search.limit], "truncated": truncated}
+
+@router.get("/calendar", response_model=FareCalendarResponse)
+def get_fare_calendar_for_route(
+    origin: str = Query(..., description="Origin airport code (e.g., DEL)"),
+    destination: str = Query(..., description="Destination airport code (e.g., BOM)"),
+    start_date: Optional[date] = Query(None, description="First day (YYYY-MM-DD), defaults to today"),
+    days: int = Query(30, ge=1, le=MAX_CALENDAR_DAYS),
+    seat_class: SeatClass = SeatClass.economy,
+    passengers: int = Query(1, ge=1, le=9),
+    db: Session = Depends(get_db)
+):
+
+    # Cheapest bookable fare for each day in the range
+    return get_fare_calendar(
+        db,
+        origin=origin,
+        destination=destination,
+        start_date=start_date or date.today(),
+        days=days,
+        seat_class=seat_class.value,
+        passengers=passengers
+    )
+
+@router.get("/batch", response_model=List[FlightDetailResponse])
+def get_flight_details_batch(
+    ids: str = Query(..., description="Comma-separated flight IDs"),
+    fields: Optional[str] = Query(None, description="Comma-separated fields to return per flight"),
+    include_breakdown: bool = Query(True, description="Include the per-class price_breakdown"),
+    db: Session = Depends(get_db)
+):
+
+    # Unknown IDs are left out; results follow the requested order
+    try:
+        flight_ids = list(dict.fromkeys(int(part) for part in ids.split(',') if part.strip()))
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="ids must be a comma-separated list of integers"
+        )
+    if not flight_ids:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="At least one flight ID is required"
+        )
+    if len(flight_ids) > MAX_BATCH_FLIGHTS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"At most {MAX_BATCH_FLIGHTS} flights per request"
+        )
+    
+    selected = _select_fields(_split_fields(fields), True, DETAIL_FIELDS)
+    
+    flights = {flight.FlightID: flight for flight in flights_with_all_inventory(db, flight_ids)}
+    ordered = [flights[flight_id] for flight_id in flight_ids if flight_id in flights]
+    details = [
+        _detail_response(flight, prices)
+        for flight, prices in zip(ordered, _price_all_classes(ordered, include_breakdown))
+    ]
+    return _detail_output(details, selected)
+
 @router.get("/{flight_id}", response_model=FlightDetailResponse)
-def get_flight_details(flight_id: int, db: Session = Depends(get_db)):
+def get_flight_details(
+    flight_id: int,
+    fields: Optional[str] = Query(None, description="Comma-separated fields to return"),
+    include_breakdown: bool = Query(True, description="Include the per-class price_breakdown"),
+    db: Session = Depends(get_db)
+):
 
-    flight = db.query(Flight).filter(Flight.FlightID == flight_id).first()
+    selected = _select_fields(_split_fields(fields), True, DETAIL_FIELDS)
+    flight = flight_with_all_inventory(db, flight_id)
     
     if not flight:
         raise HTTPException(
@@ -183,36 +611,72 @@ def get_flight_details(flight_id: int, db: Session = Depends(get_db)):
             detail=f"Flight with ID {flight_id} not found"
         )
     
-    # Get related data
-    airline = db.query(Airline).filter(Airline.AirlineID == flight.AirlineID).first()
-    origin_airport = db.query(Airport).filter(Airport.AirportID == flight.Departure_AirportID).first()
-    dest_airport = db.query(Airport).filter(Airport.AirportID == flight.Arrival_AirportID).first()
-    seat_inventories = db.query(SeatInventory).filter(SeatInventory.FlightID == flight_id).all()
+    # One flight: per-class quotes from the quote cache, so details match
+    # what search and booking show for the same flight
+    prices = [
+        _price_for(flight, seat_inv, seat_inv.Class, include_breakdown)
+        for seat_inv in flight.seat_inventory
+    ]
+    detail = _detail_response(flight, prices)
+    return _detail_output(detail, selected)
+
+def _detail_output(details, selected: Optional[Tuple[str, ...]]):
+
+    # Full details go through response_model as before; a field subset is
+    # encoded directly since it no longer matches the model
+    if selected is None:
+        return details
+    if isinstance(details, list):
+        return json_response([detail.model_dump(include=set(selected)) for detail in details])
+    return json_response(details.model_dump(include=set(selected)))
+
+def _price_all_classes(flights: List[Flight], breakdown: bool = True) -> List[List[dict]]:
+
+    # Every (flight, class) pair in one pricing batch; returns one list of
+    # price breakdowns per flight, in seat_inventory order
+    rows = [(flight, seat_inv) for flight in flights for seat_inv in flight.seat_inventory]
+    if not rows:
+        return [[] for _ in flights]
+    
+    prices = get_dynamic_prices_batch(
+        base_fares=[float(flight.Price) for flight, _ in rows],
+        seats_available=[seat_inv.Available_seats for _, seat_inv in rows],
+        total_seats=[seat_inv.Total_Seats for _, seat_inv in rows],
+        departure_times=[flight.Departure_Time for flight, _ in rows],
+        origin_codes=[flight.departure_airport.Airport_Code for flight, _ in rows],
+        destination_codes=[flight.arrival_airport.Airport_Code for flight, _ in rows],
+        airline_codes=[flight.airline.Airline_Code for flight, _ in rows],
+        seat_classes=[seat_inv.Class for _, seat_inv in rows],
+        flight_ids=[flight.FlightID for flight, _ in rows],
+        breakdown=breakdown
+    )
+    
+    per_flight = {flight.FlightID: [] for flight in flights}
+    for (flight, _), price_data in zip(rows, _quote_rows(prices, len(rows))):
+        per_flight[flight.FlightID].append(price_data)
+    return [per_flight[flight.FlightID] for flight in flights]
+
+def _detail_response(flight: Flight, prices: List[dict]) -> FlightDetailResponse:
+
+    # Related data was loaded with the flight
+    airline = flight.airline
+    origin_airport = flight.departure_airport
+    dest_airport = flight.arrival_airport
     
-    # Calculate dynamic prices for all classes
     seat_inventory_data = []
     total_available = 0
     
-    for seat_inv in seat_inventories:
-        price_data = get_dynamic_price(
-            base_fare=float(flight.Price),
-            seats_available=seat_inv.Available_seats,
-            total_seats=seat_inv.Total_Seats,
-            departure_time=flight.Departure_Time,
-            origin_code=origin_airport.Airport_Code,
-            destination_code=dest_airport.Airport_Code,
-            airline_code=airline.Airline_Code,
-            seat_class=seat_inv.Class
-        )
-        
-        seat_inventory_data.append({
+    for seat_inv, price_data in zip(flight.seat_inventory, prices):
+        seat_data = {
             "class": seat_inv.Class,
             "total_seats": seat_inv.Total_Seats,
             "available_seats": seat_inv.Available_seats,
             "base_price": float(flight.Price),
-            "dynamic_price": price_data['final_price'],
-            "price_breakdown": price_data
-        })
+            "dynamic_price": price_data['final_price']
+        }
+        if len(price_data) > 1:
+            seat_data["price_breakdown"] = price_data
+        seat_inventory_data.append(seat_data)
         
         total_available += seat_inv.Available_seats
     
@@ -252,14 +716,28 @@ def get_flight_details(flight_id: int, db: Session = Depends(get_db)):
     )
 
 @router.get("/airlines/list", response_model=List[AirlineResponse])
-def list_airlines(db: Session = Depends(get_db)):
-    airlines = db.query(Airline).all()
-    return airlines
+def list_airlines(
+    db: Session = Depends(get_db),
+    if_none_match: Optional[str] = Header(default=None)
+):
+    return reference_response(db, 'airlines', if_none_match)
 
 @router.get("/airports/list", response_model=List[AirportResponse])
-def list_airports(db: Session = Depends(get_db)):
-    airports = db.query(Airport).all()
-    return airports
+def list_airports(
+    db: Session = Depends(get_db),
+    if_none_match: Optional[str] = Header(default=None)
+):
+    return reference_response(db, 'airports', if_none_match)
+
+@router.get("/airports/suggest", response_model=List[AirportResponse])
+def suggest_airports_by_prefix(
+    q: str = Query(..., min_length=1, max_length=100, description="Code, city or airport name prefix"),
+    limit: int = Query(10, ge=1, le=50),
+    db: Session = Depends(get_db)
+):
+
+    # Code matches first, then city, then airport name; answered from memory
+    return json_response(suggest_airports(db, q, limit))
 
 @router.get("/health")
 def flight_service_health(db: Session = Depends(get_db)):
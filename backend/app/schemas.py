@@ -1,3 +1,4 @@
+from dataclasses import dataclass
 from pydantic import BaseModel, EmailStr, Field, validator
 from typing import Optional, List
 from datetime import datetime, date
@@ -9,6 +10,12 @@ class SeatClass(str, Enum):
     business = "business"
     first = "first"
 
+class DepartureBand(str, Enum):
+    night = "night"            # 00:00-06:00
+    morning = "morning"        # 06:00-12:00
+    afternoon = "afternoon"    # 12:00-18:00
+    evening = "evening"        # 18:00-24:00
+
 class FlightStatus(str, Enum):
     scheduled = "scheduled"
     delayed = "delayed"
@@ -65,6 +72,15 @@ class FlightSearchRequest(BaseModel):
     passengers: int = Field(default=1, ge=1, le=9)
     max_price: Optional[float] = None
     sort_by: Optional[str] = Field(default="price", description="Sort by: price, duration, departure_time")
+    include_breakdown: bool = Field(default=True, description="Include the per-factor price_breakdown")
+    fields: Optional[List[str]] = Field(default=None, description="Only return these result fields")
+    airlines: Optional[List[str]] = Field(default=None, description="Airline codes to keep (e.g., AI, 6E)")
+    departure_bands: Optional[List[DepartureBand]] = None
+    max_duration: Optional[int] = Field(default=None, ge=1, description="Maximum duration in minutes")
+    min_price: Optional[float] = None
+    offset: int = Field(default=0, ge=0)
+    limit: Optional[int] = Field(default=None, ge=1, le=500)
+    price_bucket: float = Field(default=1000.0, gt=0, description="Price histogram bucket width")
 
 class FlightBase(BaseModel):
     Flight_Number: str
@@ -105,13 +121,134 @@ class FlightSearchResponse(BaseModel):
     Duration: int
     base_price: float
     dynamic_price: float
-    price_breakdown: dict
+    price_breakdown: Optional[dict] = None
     seats_available: int
     seat_class: str
     
     class Config:
         from_attributes = True
 
+# Same fields as FlightSearchResponse, built on the raw JSON path where
+# results are encoded directly instead of validated again
+@dataclass
+class FlightSearchRow:
+    FlightID: int
+    Flight_Number: str
+    airline_name: str
+    airline_code: str
+    origin_city: str
+    origin_code: str
+    destination_city: str
+    destination_code: str
+    Departure_Time: datetime
+    Arrival_Time: datetime
+    Duration: int
+    base_price: float
+    dynamic_price: float
+    price_breakdown: Optional[dict]
+    seats_available: int
+    seat_class: str
+
+class AirlineFacet(BaseModel):
+    airline_code: str
+    airline_name: str
+    count: int
+    min_price: float
+
+class DepartureBandFacet(BaseModel):
+    band: DepartureBand
+    count: int
+
+class PriceBucketFacet(BaseModel):
+    min_price: float
+    max_price: float
+    count: int
+
+class SearchFacets(BaseModel):
+    airlines: List[AirlineFacet]
+    departure_bands: List[DepartureBandFacet]
+    price_histogram: List[PriceBucketFacet]
+
+class FacetedSearchResponse(BaseModel):
+    results: List[FlightSearchResponse]
+    total: int  # results matching the filters, before offset/limit
+    facets: SearchFacets
+
+class FareCalendarDay(BaseModel):
+    departure_date: date
+    cheapest_price: Optional[float] = None
+    FlightID: Optional[int] = None
+    Flight_Number: Optional[str] = None
+    airline_code: Optional[str] = None
+    flights_available: int = 0
+
+class FareCalendarResponse(BaseModel):
+    origin_code: str
+    destination_code: str
+    seat_class: str
+    passengers: int
+    start_date: date
+    days: List[FareCalendarDay]
+
+class RoundTripSearchRequest(BaseModel):
+    origin: str = Field(..., description="Origin airport code (e.g., DEL)")
+    destination: str = Field(..., description="Destination airport code (e.g., BOM)")
+    departure_date: date = Field(..., description="Outbound date (YYYY-MM-DD)")
+    return_date: date = Field(..., description="Return date (YYYY-MM-DD)")
+    seat_class: Optional[SeatClass] = SeatClass.economy
+    passengers: int = Field(default=1, ge=1, le=9)
+    max_price: Optional[float] = Field(default=None, description="Cap on the combined price per passenger")
+    min_turnaround_minutes: int = Field(default=120, ge=0, le=1440)
+    limit: int = Field(default=10, ge=1, le=50)
+
+class RoundTripOption(BaseModel):
+    outbound: FlightSearchResponse
+    inbound: FlightSearchResponse
+    total_price: float  # per passenger
+
+class RoundTripSearchResponse(BaseModel):
+    combinations: List[RoundTripOption]
+    outbound_options: int
+    return_options: int
+
+class ConnectingSearchRequest(BaseModel):
+    origin: str = Field(..., description="Origin airport code (e.g., DEL)")
+    destination: str = Field(..., description="Destination airport code (e.g., GOI)")
+    departure_date: date = Field(..., description="Departure date of the first leg (YYYY-MM-DD)")
+    seat_class: Optional[SeatClass] = SeatClass.economy
+    passengers: int = Field(default=1, ge=1, le=9)
+    max_stops: int = Field(default=1, ge=0, le=2)
+    min_connection_minutes: int = Field(default=45, ge=0, le=720)
+    max_connection_minutes: int = Field(default=360, ge=30, le=1440)
+    sort_by: Optional[str] = Field(default="price", description="Sort by: price, duration, departure_time")
+    limit: int = Field(default=20, ge=1, le=100)
+
+class ItineraryLeg(BaseModel):
+    FlightID: int
+    Flight_Number: str
+    airline_name: str
+    airline_code: str
+    origin_code: str
+    destination_code: str
+    Departure_Time: datetime
+    Arrival_Time: datetime
+    Duration: int
+    dynamic_price: float
+    seats_available: int
+
+class ItineraryResponse(BaseModel):
+    legs: List[ItineraryLeg]
+    stops: int
+    Departure_Time: datetime
+    Arrival_Time: datetime
+    total_duration: int  # minutes, door to door including connections
+    total_price: float  # per passenger, sum of leg prices
+    seat_class: str
+
+class ConnectingSearchResponse(BaseModel):
+    itineraries: List[ItineraryResponse]
+    truncated: bool  # the search budget ran out before every path was explored
+
 # Passenger Schemas
 class PassengerCreate(BaseModel):
     First_name: str = Field(..., min_length=2, max_length=100)
@@ -121,7 +258,7 @@ class PassengerCreate(BaseModel):
     Passport_number: Optional[str] = None
     Nationality: str = "India"
     Email: EmailStr
-    Phone: str = Field(..., regex=r"^\+?[1-9]\d{1,14}$")
+    Phone: str = Field(..., pattern=r"^\+?[1-9]\d{1,14}$")
 
 class PassengerResponse(PassengerCreate):
     PassengerID: int
@@ -0,0 +1,94 @@
+# Airport autocomplete over an in-memory sorted-array index
+#
+# The index is built from the cached airports reference set and rebuilt
+# whenever that set's ETag changes, so airport changes picked up by its TTL
+# or admin reload reach the suggestions without a separate invalidation path.
+# Keystrokes never reach the database while the set is cached.
+#
+# Keys live in three sorted tiers: airport codes, city words and airport
+# name words. A query walks the tiers in that order with a bisect per
+# tier and stops as soon as it has `limit` distinct airports.
+
+import json
+import re
+import threading
+from bisect import bisect_left
+from typing import List, Optional, Sequence, Tuple
+from sqlalchemy.orm import Session
+from app.services.reference_data import get_reference_set
+
+_WORD = re.compile(r"\w+")
+
+
+def normalize(text: str) -> str:
+    return " ".join(_WORD.findall(text.casefold()))
+
+
+class AirportSuggestIndex:
+
+    def __init__(self, airports: Sequence[dict], etag: Optional[str] = None):
+        self.etag = etag
+        self.airports = list(airports)
+        self.tiers = (
+            self._tier((airport['Airport_Code'],) for airport in self.airports),
+            self._tier(self._prefixes(airport['City']) for airport in self.airports),
+            self._tier(self._prefixes(airport['Airport_Name']) for airport in self.airports),
+        )
+
+    @staticmethod
+    def _prefixes(text: Optional[str]) -> List[str]:
+        # Every word suffix of the text, so "navi mumbai" matches both
+        # "navi" and "mumbai"
+        words = normalize(text or "").split()
+        return [" ".join(words[i:]) for i in range(len(words))]
+
+    @staticmethod
+    def _tier(keys_per_airport) -> Tuple[List[str], List[int]]:
+        entries = sorted(
+            (normalize(key), position)
+            for position, keys in enumerate(keys_per_airport)
+            for key in keys
+            if key
+        )
+        return [key for key, _ in entries], [position for _, position in entries]
+
+    def suggest(self, query: str, limit: int = 10) -> List[dict]:
+
+        prefix = normalize(query)
+        if not prefix:
+            return []
+
+        seen = set()
+        result = []
+        for keys, positions in self.tiers:
+            i = bisect_left(keys, prefix)
+            while i < len(keys) and keys[i].startswith(prefix):
+                position = positions[i]
+                if position not in seen:
+                    seen.add(position)
+                    result.append(self.airports[position])
+                    if len(result) >= limit:
+                        return result
+                i += 1
+        return result
+
+
+_index = AirportSuggestIndex([])
+_index_lock = threading.Lock()
+
+
+def get_suggest_index(db: Session) -> AirportSuggestIndex:
+
+    global _index
+    reference_set = get_reference_set(db, 'airports')
+    if _index.etag == reference_set.etag:
+        return _index
+
+    with _index_lock:
+        if _index.etag != reference_set.etag:
+            _index = AirportSuggestIndex(json.loads(reference_set.body), reference_set.etag)
+        return _index
+
+
+def suggest_airports(db: Session, query: str, limit: int = 10) -> List[dict]:
+    return get_suggest_index(db).suggest(query, limit)
@@ -0,0 +1,395 @@
+# Offline pricing backtest
+#
+# Replays recorded Price_history snapshots under one or more candidate
+# pricing plans and reports how prices and revenue would have differed.
+#
+#   cd backend
+#   python -m app.services.backtest --plans candidates.json --workers 4
+#
+# candidates.json maps a plan name to PricingPlan field overrides, applied
+# on top of the active plan and clamped into its Pricing_rules bands the way
+# a compiled plan is, e.g.
+#
+#   {"cheaper_far_out": {"time_factors": [null, 0.5, 0.3, 0.15, 0.0, -0.10, -0.20]},
+#    "tighter_cap": {"fare_bounds": [0.7, 2.0]}}
+#
+# History is read in keyset-paginated chunks per worker, and workers own
+# disjoint FlightID partitions (FlightID % workers), so memory stays bounded
+# by chunk size regardless of table size. Seats sold between consecutive
+# snapshots of a (flight, class) are taken as fixed: revenue for a plan is
+# those seats times the plan's price at the earlier snapshot. Demand is not
+# re-simulated, so the revenue figures show price effect only.
+
+import argparse
+import json
+import logging
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import replace
+from datetime import datetime
+from typing import Dict, List, Mapping, Optional, Tuple
+import numpy as np
+from sqlalchemy import and_, create_engine, or_, select
+from sqlalchemy.orm import aliased
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CHUNK_SIZE = 50_000
+BASELINE_PLAN = 'baseline'
+SEAT_CLASSES = ('economy', 'business', 'first')
+
+# Totals accumulated per plan and seat class
+_METRICS = ('rows', 'price_sum', 'recorded_price_sum', 'abs_delta_sum', 'seats_sold', 'revenue', 'recorded_revenue')
+
+
+def build_candidate_plans(base_plan, overrides: Mapping[str, Mapping]) -> Dict[str, object]:
+
+    # Overrides are clamped into the rule bands like a compiled plan, so a
+    # candidate is always a plan production could run
+    from app.services.pricing_plan import clamp_to_bands
+
+    plans = {BASELINE_PLAN: base_plan}
+    for name, fields in overrides.items():
+        fields = {
+            key: tuple(value) if isinstance(getattr(base_plan, key, None), tuple) else value
+            for key, value in fields.items()
+        }
+        plans[name] = clamp_to_bands(replace(base_plan, version=name, **fields))
+    return plans
+
+
+def _history_query(partition: int, workers: int, after: Tuple[int, int], chunk_size: int):
+
+    from app.models import Airline, Airport, Flight, PriceHistory, SeatInventory
+
+    origin, destination = aliased(Airport), aliased(Airport)
+    last_flight, last_history = after
+    return select(
+        PriceHistory.HistoryID,
+        PriceHistory.FlightID,
+        PriceHistory.Seat_class,
+        PriceHistory.Calculated_price,
+        PriceHistory.Available_seats,
+        PriceHistory.Days_to_departure,
+        PriceHistory.Recorded_at,
+        Flight.Price,
+        Flight.Departure_Time,
+        origin.Airport_Code,
+        destination.Airport_Code,
+        Airline.Airline_Code,
+        SeatInventory.Total_Seats
+    ).join(
+        Flight, Flight.FlightID == PriceHistory.FlightID
+    ).join(
+        origin, origin.AirportID == Flight.Departure_AirportID
+    ).join(
+        destination, destination.AirportID == Flight.Arrival_AirportID
+    ).join(
+        Airline, Airline.AirlineID == Flight.AirlineID
+    ).join(
+        SeatInventory,
+        and_(
+            SeatInventory.FlightID == PriceHistory.FlightID,
+            SeatInventory.Class == PriceHistory.Seat_class
+        )
+    ).where(
+        and_(
+            PriceHistory.FlightID % workers == partition,
+            or_(
+                PriceHistory.FlightID > last_flight,
+                and_(PriceHistory.FlightID == last_flight, PriceHistory.HistoryID > last_history)
+            )
+        )
+    ).order_by(
+        PriceHistory.FlightID, PriceHistory.HistoryID
+    ).limit(chunk_size)
+
+
+def _as_of_times(departures: np.ndarray, recorded: np.ndarray, days_to_departure: np.ndarray) -> np.ndarray:
+
+    # Price as of Recorded_at when it agrees with the recorded whole days to
+    # departure; otherwise (e.g. clock or timezone drift between writers)
+    # fall back to the middle of the recorded day band.
+    day = np.timedelta64(86_400_000_000, 'us')
+    recorded_days = (departures - recorded) // day
+    fallback = departures - days_to_departure * day - day // 2
+    return np.where(recorded_days == days_to_departure, recorded, fallback)
+
+
+class _PartitionBacktest:
+
+    def __init__(self, plans: Mapping[str, object], engine):
+        self.plans = plans
+        self.engine = engine
+        self.totals = {
+            name: {seat_class: dict.fromkeys(_METRICS, 0.0) for seat_class in SEAT_CLASSES}
+            for name in plans
+        }
+        # (FlightID, class) -> (available seats, recorded price, {plan: price})
+        # for the latest snapshot seen; only flights not yet finished are kept
+        self.carry: Dict[Tuple[int, str], Tuple[int, float, Dict[str, float]]] = {}
+
+    def process(self, rows: List) -> None:
+
+        columns = list(zip(*rows))
+        flight_ids = np.array(columns[1], dtype=np.int64)
+        classes = np.array(columns[2], dtype=str)
+        recorded_prices = np.array(columns[3], dtype=np.float64)
+        available = np.array(columns[4], dtype=np.int64)
+        days_to_departure = np.array(columns[5], dtype=np.int64)
+        recorded_at = np.array(columns[6], dtype='datetime64[us]')
+        base_fares = np.array(columns[7], dtype=np.float64)
+        departures = np.array(columns[8], dtype='datetime64[us]')
+        total_seats = np.array(columns[12], dtype=np.int64)
+
+        as_of = _as_of_times(departures, recorded_at, days_to_departure)
+        prices = {
+            name: self.engine.calculate_prices_batch(
+                base_fares=base_fares,
+                seats_available=available,
+                total_seats=total_seats,
+                departure_times=departures,
+                origin_codes=columns[9],
+                destination_codes=columns[10],
+                airline_codes=columns[11],
+                seat_classes=classes,
+                flight_ids=flight_ids,
+                now=as_of,
+                plan=plan
+            )['final_price']
+            for name, plan in self.plans.items()
+        }
+
+        # Rows arrive ordered by (FlightID, HistoryID); a stable sort on class
+        # within each flight keeps every (flight, class) series in time order
+        order = np.lexsort((classes, flight_ids))
+        flight_ids, classes = flight_ids[order], classes[order]
+        recorded_prices, available = recorded_prices[order], available[order]
+        prices = {name: values[order] for name, values in prices.items()}
+
+        same_series = np.zeros(len(order), dtype=bool)
+        same_series[1:] = (flight_ids[1:] == flight_ids[:-1]) & (classes[1:] == classes[:-1])
+        previous_available = np.roll(available, 1)
+        previous_recorded = np.roll(recorded_prices, 1)
+        previous_prices = {name: np.roll(values, 1) for name, values in prices.items()}
+
+        # The first row of each series continues from the previous chunk
+        has_previous = same_series.copy()
+        for index in np.flatnonzero(~same_series):
+            carried = self.carry.get((int(flight_ids[index]), classes[index]))
+            if carried is None:
+                continue
+            has_previous[index] = True
+            previous_available[index], previous_recorded[index], carried_prices = carried
+            for name in prices:
+                previous_prices[name][index] = carried_prices[name]
+
+        seats_sold = np.where(has_previous, np.clip(previous_available - available, 0, None), 0)
+
+        for seat_class in SEAT_CLASSES:
+            mask = classes == seat_class
+            if not mask.any():
+                continue
+            sold = seats_sold[mask]
+            recorded_revenue = float(np.dot(sold, previous_recorded[mask]))
+            for name in self.plans:
+                totals = self.totals[name][seat_class]
+                totals['rows'] += int(mask.sum())
+                totals['price_sum'] += float(prices[name][mask].sum())
+                totals['recorded_price_sum'] += float(recorded_prices[mask].sum())
+                totals['abs_delta_sum'] += float(np.abs(prices[name][mask] - recorded_prices[mask]).sum())
+                totals['seats_sold'] += int(sold.sum())
+                totals['revenue'] += float(np.dot(sold, previous_prices[name][mask]))
+                totals['recorded_revenue'] += recorded_revenue
+
+        # Keep the last snapshot of each series; earlier flights are complete
+        last_flight = int(flight_ids[-1])
+        self.carry = {key: value for key, value in self.carry.items() if key[0] == last_flight}
+        series_end = np.ones(len(order), dtype=bool)
+        series_end[:-1] = ~same_series[1:]
+        for index in np.flatnonzero(series_end & (flight_ids == last_flight)):
+            self.carry[(last_flight, classes[index])] = (
+                int(available[index]),
+                float(recorded_prices[index]),
+                {name: float(values[index]) for name, values in prices.items()}
+            )
+
+
+def _run_partition(
+    partition: int,
+    workers: int,
+    database_url: str,
+    plans: Mapping[str, object],
+    chunk_size: int,
+    seed: int,
+    bucket_seconds: int,
+    limit_rows: Optional[int] = None
+) -> Dict[str, Dict[str, Dict[str, float]]]:
+
+    from app.services.pricing_engine import DynamicPricingEngine
+
+    # Deterministic demand draws, so every plan sees the same demand noise
+    # and deltas reflect the plan alone
+    engine = DynamicPricingEngine()
+    engine.configure_demand(mode='deterministic', seed=seed, bucket_seconds=bucket_seconds)
+    backtest = _PartitionBacktest(plans, engine)
+
+    db_engine = create_engine(database_url)
+    after, processed = (-1, -1), 0
+    try:
+        with db_engine.connect() as conn:
+            while limit_rows is None or processed < limit_rows:
+                rows = conn.execute(_history_query(partition, workers, after, chunk_size)).all()
+                if not rows:
+                    break
+                backtest.process(rows)
+                after = (rows[-1][1], rows[-1][0])
+                processed += len(rows)
+                if len(rows) < chunk_size:
+                    break
+    finally:
+        db_engine.dispose()
+
+    logger.info(f"Backtest partition {partition}/{workers}: {processed} rows")
+    return backtest.totals
+
+
+def _merge_totals(results: List[Dict]) -> Dict[str, Dict[str, Dict[str, float]]]:
+
+    merged = {}
+    for totals in results:
+        for name, by_class in totals.items():
+            for seat_class, metrics in by_class.items():
+                target = merged.setdefault(name, {}).setdefault(seat_class, dict.fromkeys(_METRICS, 0.0))
+                for metric, value in metrics.items():
+                    target[metric] += value
+    return merged
+
+
+def _summarize(metrics: Mapping[str, float], baseline: Mapping[str, float]) -> Dict[str, float]:
+
+    rows = metrics['rows']
+    if not rows:
+        return {'rows': 0}
+
+    def pct(value, reference):
+        return round((value / reference - 1.0) * 100, 2) if reference else None
+
+    return {
+        'rows': int(rows),
+        'avg_price': round(metrics['price_sum'] / rows, 2),
+        'avg_recorded_price': round(metrics['recorded_price_sum'] / rows, 2),
+        'avg_price_change_pct': pct(metrics['price_sum'], metrics['recorded_price_sum']),
+        'mean_abs_price_delta': round(metrics['abs_delta_sum'] / rows, 2),
+        'seats_sold': int(metrics['seats_sold']),
+        'revenue': round(metrics['revenue'], 2),
+        'recorded_revenue': round(metrics['recorded_revenue'], 2),
+        'revenue_delta_vs_recorded': round(metrics['revenue'] - metrics['recorded_revenue'], 2),
+        'revenue_delta_vs_baseline': round(metrics['revenue'] - baseline['revenue'], 2),
+        'revenue_change_vs_baseline_pct': pct(metrics['revenue'], baseline['revenue'])
+    }
+
+
+def build_report(totals: Mapping[str, Mapping[str, Mapping[str, float]]]) -> Dict[str, Dict]:
+
+    report = {}
+    baseline = totals[BASELINE_PLAN]
+    baseline_overall = {
+        metric: sum(by_class[metric] for by_class in baseline.values()) for metric in _METRICS
+    }
+    for name, by_class in totals.items():
+        overall = {metric: sum(metrics[metric] for metrics in by_class.values()) for metric in _METRICS}
+        report[name] = {
+            'overall': _summarize(overall, baseline_overall),
+            'by_class': {
+                seat_class: _summarize(metrics, baseline[seat_class])
+                for seat_class, metrics in by_class.items()
+                if metrics['rows']
+            }
+        }
+    return report
+
+
+def run_backtest(
+    plans: Mapping[str, object],
+    database_url: str,
+    workers: int = 4,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    seed: int = 0,
+    bucket_seconds: int = 900,
+    limit_rows: Optional[int] = None
+) -> Dict[str, Dict]:
+
+    if BASELINE_PLAN not in plans:
+        raise ValueError(f"plans must include '{BASELINE_PLAN}'")
+
+    arguments = [
+        (partition, workers, database_url, plans, chunk_size, seed, bucket_seconds, limit_rows)
+        for partition in range(workers)
+    ]
+    if workers == 1:
+        results = [_run_partition(*arguments[0])]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(_run_partition, *zip(*arguments)))
+
+    return build_report(_merge_totals(results))
+
+
+def main(argv=None) -> int:
+
+    parser = argparse.ArgumentParser(description="Replay Price_history under candidate pricing plans")
+    parser.add_argument("--plans", help="JSON file of plan name -> PricingPlan field overrides")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+    parser.add_argument("--seed", type=int, default=int(os.getenv("PRICING_SEED", "0")))
+    parser.add_argument("--bucket-seconds", type=int, default=int(os.getenv("PRICING_BUCKET_SECONDS", "900")))
+    parser.add_argument("--limit-rows", type=int, help="Stop each worker after this many rows")
+    parser.add_argument("--database-url", help="Defaults to the application's database")
+    parser.add_argument("--output", help="Write the JSON report here instead of stdout")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+
+    from app.database_connection import SessionLocal, engine
+    from app.services.pricing_engine import pricing_engine
+    from app.services.pricing_plan import load_pricing_plan
+
+    database_url = args.database_url or engine.url.render_as_string(hide_password=False)
+
+    # Candidates are expressed relative to the plan currently in effect
+    db = SessionLocal()
+    try:
+        base_plan = load_pricing_plan(db, pricing_engine.default_plan)
+    finally:
+        db.close()
+
+    overrides = {}
+    if args.plans:
+        with open(args.plans) as f:
+            overrides = json.load(f)
+
+    started = datetime.now()
+    report = run_backtest(
+        build_candidate_plans(base_plan, overrides),
+        database_url,
+        workers=max(1, args.workers),
+        chunk_size=args.chunk_size,
+        seed=args.seed,
+        bucket_seconds=args.bucket_seconds,
+        limit_rows=args.limit_rows
+    )
+    logger.info(f"Backtest finished in {(datetime.now() - started).total_seconds():.1f}s")
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output)
+    else:
+        print(output)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,15 +1,38 @@
 
 
+import os
+from decimal import Decimal, ROUND_HALF_UP
+from typing import Optional
 from sqlalchemy.orm import Session
-from sqlalchemy import and_
+from sqlalchemy.orm.attributes import set_committed_value
+from sqlalchemy import and_, insert, select, update
 from datetime import datetime, timedelta
 from fastapi import HTTPException, status
 from app.models import Flight, SeatInventory, Booking, Passenger, PaymentTransaction
 from app.schemas import BookingCreate, PassengerCreate
-from app.utils.helpers import generate_pnr
+from app.services.pnr_allocator import pnr_allocator
 from app.services.pricing_engine import get_dynamic_price
+from app.services.flight_queries import flight_with_all_inventory
+from app.services.inventory_events import notify_inventory_changed
+from app.services.hold_expiry import hold_expiry
+
+# Booking amounts are stored as DECIMAL(10,2)
+CENTS = Decimal('0.01')
 
 class BookingService:
+
+    # 'optimistic' takes seats with one conditional UPDATE and no flight-row
+    # lock; 'locking' holds SELECT ... FOR UPDATE on the flight and inventory
+    # rows for the whole transaction
+    SEAT_MODES = ('optimistic', 'locking')
+    seat_mode = 'optimistic'
+    
+    @classmethod
+    def set_seat_mode(cls, mode: str) -> None:
+
+        if mode not in cls.SEAT_MODES:
+            raise ValueError(f"Unknown seat mode '{mode}', expected one of {cls.SEAT_MODES}")
+        cls.seat_mode = mode
     
     @staticmethod
     def create_booking(
@@ -18,6 +41,189 @@ class BookingService:
         db: Session
     ) -> Booking:
 
+        if BookingService.seat_mode == 'locking':
+            return BookingService._create_booking_locking(booking_data, user_id, db)
+        return BookingService._create_booking_optimistic(booking_data, user_id, db)
+    
+    @staticmethod
+    def _create_booking_optimistic(
+        booking_data: BookingCreate,
+        user_id: int,
+        db: Session
+    ) -> Booking:
+
+        # Everything is read without locks: flight, airline, airports and
+        # inventory in two queries. Seats are taken by the last statement
+        # before commit, which only succeeds while enough seats remain and the
+        # flight is still bookable, so the only lock held is that one row's
+        # for the commit itself.
+        try:
+            num_passengers = len(booking_data.passengers)
+            flight = flight_with_all_inventory(db, booking_data.FlightID)
+            
+            if not flight or flight.Flight_status != 'scheduled':
+                raise HTTPException(
+                    status_code=status.HTTP_404_NOT_FOUND,
+                    detail="Flight not found or not available for booking"
+                )
+            
+            if flight.Departure_Time <= datetime.now():
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail="Cannot book flights that have already departed"
+                )
+            
+            seat_inv = next(
+                (inv for inv in flight.seat_inventory if inv.Class == booking_data.Seat_class),
+                None
+            )
+            if not seat_inv:
+                raise HTTPException(
+                    status_code=status.HTTP_404_NOT_FOUND,
+                    detail=f"Seat class {booking_data.Seat_class} not available for this flight"
+                )
+            
+            if seat_inv.Available_seats < num_passengers:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail=f"Only {seat_inv.Available_seats} seats available, requested {num_passengers}"
+                )
+            
+            # Priced from the availability just read, as the locking path does
+            price_data = get_dynamic_price(
+                base_fare=float(flight.Price),
+                seats_available=seat_inv.Available_seats,
+                total_seats=seat_inv.Total_Seats,
+                departure_time=flight.Departure_Time,
+                origin_code=flight.departure_airport.Airport_Code,
+                destination_code=flight.arrival_airport.Airport_Code,
+                airline_code=flight.airline.Airline_Code,
+                seat_class=booking_data.Seat_class,
+                flight_id=flight.FlightID,
+                breakdown=False
+            )
+            
+            new_booking = BookingService._add_booking(
+                booking_data, user_id, price_data['final_price'] * num_passengers, flight, db
+            )
+            
+            bookable = select(Flight.FlightID).where(
+                and_(
+                    Flight.FlightID == booking_data.FlightID,
+                    Flight.Flight_status == 'scheduled',
+                    Flight.Departure_Time > datetime.now()
+                )
+            )
+            taken = db.execute(
+                update(SeatInventory)
+                .where(
+                    and_(
+                        SeatInventory.Inventory_ID == seat_inv.Inventory_ID,
+                        SeatInventory.Available_seats >= num_passengers,
+                        SeatInventory.FlightID.in_(bookable)
+                    )
+                )
+                .values(Available_seats=SeatInventory.Available_seats - num_passengers)
+                .execution_options(synchronize_session=False)
+            ).rowcount
+            
+            if taken != 1:
+                # Someone else got the seats (or the flight) first
+                raise HTTPException(
+                    status_code=status.HTTP_409_CONFLICT,
+                    detail="Seats are no longer available, please search again"
+                )
+            
+            BookingService._commit_keeping_state(db)
+            notify_inventory_changed([booking_data.FlightID])
+            hold_expiry.add_hold(new_booking.BookingID, new_booking.Expiry_time)
+            
+            return new_booking
+            
+        except HTTPException:
+            db.rollback()
+            raise
+        except Exception as e:
+            db.rollback()
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail=f"Booking failed: {str(e)}"
+            )
+    
+    @staticmethod
+    def _add_booking(
+        booking_data: BookingCreate,
+        user_id: int,
+        total_price: float,
+        flight: Flight,
+        db: Session
+    ) -> Booking:
+
+        # Pending booking and its passengers, written but not committed. The
+        # returned booking has its flight and passengers attached, so the
+        # response needs no further reads.
+        num_passengers = len(booking_data.passengers)
+        
+        # Create booking; the allocator never hands out a used PNR
+        new_booking = Booking(
+            pnr=pnr_allocator.allocate(db),
+            UserID=user_id,
+            FlightID=booking_data.FlightID,
+            Seat_class=booking_data.Seat_class,
+            Num_passengers=num_passengers,
+            # Rounded as the column stores it, so the response shows the saved amount
+            Total_price=Decimal(str(total_price)).quantize(CENTS, rounding=ROUND_HALF_UP),
+            Booking_status='pending',
+            Payment_status='unpaid',
+            Expiry_time=datetime.now() + timedelta(minutes=15)  # 15 min to complete payment
+        )
+        
+        db.add(new_booking)
+        db.flush()  # Get booking ID without committing
+        
+        # All passengers in one multi-row INSERT, then their generated IDs in
+        # one read, whatever the party size
+        db.execute(insert(Passenger).values([
+            {
+                'BookingID': new_booking.BookingID,
+                'First_name': passenger_data.First_name,
+                'Last_name': passenger_data.Last_name,
+                'Date_of_birth': passenger_data.Date_of_birth,
+                'Gender': passenger_data.Gender,
+                'Passport_number': passenger_data.Passport_number,
+                'Nationality': passenger_data.Nationality,
+                'Email': passenger_data.Email,
+                'Phone': passenger_data.Phone
+            }
+            for passenger_data in booking_data.passengers
+        ]))
+        passengers = db.query(Passenger).filter(
+            Passenger.BookingID == new_booking.BookingID
+        ).order_by(Passenger.PassengerID).all()
+        
+        set_committed_value(new_booking, 'passengers', passengers)
+        set_committed_value(new_booking, 'flight', flight)
+        return new_booking
+    
+    @staticmethod
+    def _commit_keeping_state(db: Session) -> None:
+
+        # Commit without expiring loaded objects: what was just written is
+        # what the response shows, so reading it back is wasted work
+        expire_on_commit = db.expire_on_commit
+        db.expire_on_commit = False
+        try:
+            db.commit()
+        finally:
+            db.expire_on_commit = expire_on_commit
+    
+    @staticmethod
+    def _create_booking_locking(
+        booking_data: BookingCreate,
+        user_id: int,
+        db: Session
+    ) -> Booking:
+
         try:
             # Start transaction
             flight = db.query(Flight).filter(
@@ -76,54 +282,22 @@ class BookingService:
                 origin_code=origin.Airport_Code,
                 destination_code=dest.Airport_Code,
                 airline_code=airline.Airline_Code,
-                seat_class=booking_data.Seat_class
+                seat_class=booking_data.Seat_class,
+                flight_id=flight.FlightID
             )
             
             price_per_seat = price_data['final_price']
             total_price = price_per_seat * num_passengers
             
-            # Generate unique PNR
-            pnr = generate_pnr()
-            while db.query(Booking).filter(Booking.pnr == pnr).first():
-                pnr = generate_pnr()  # Regenerate if collision
-            
-            # Create booking
-            new_booking = Booking(
-                pnr=pnr,
-                UserID=user_id,
-                FlightID=booking_data.FlightID,
-                Seat_class=booking_data.Seat_class,
-                Num_passengers=num_passengers,
-                Total_price=total_price,
-                Booking_status='pending',
-                Payment_status='unpaid',
-                Expiry_time=datetime.now() + timedelta(minutes=15)  # 15 min to complete payment
-            )
-            
-            db.add(new_booking)
-            db.flush()  # Get booking ID without committing
-            
-            # Create passenger records
-            for passenger_data in booking_data.passengers:
-                passenger = Passenger(
-                    BookingID=new_booking.BookingID,
-                    First_name=passenger_data.First_name,
-                    Last_name=passenger_data.Last_name,
-                    Date_of_birth=passenger_data.Date_of_birth,
-                    Gender=passenger_data.Gender,
-                    Passport_number=passenger_data.Passport_number,
-                    Nationality=passenger_data.Nationality,
-                    Email=passenger_data.Email,
-                    Phone=passenger_data.Phone
-                )
-                db.add(passenger)
+            new_booking = BookingService._add_booking(booking_data, user_id, total_price, flight, db)
             
             # Lock seats (reduce availability)
             seat_inv.Available_seats -= num_passengers
             
             # Commit transaction
-            db.commit()
-            db.refresh(new_booking)
+            BookingService._commit_keeping_state(db)
+            notify_inventory_changed([booking_data.FlightID])
+            hold_expiry.add_hold(new_booking.BookingID, new_booking.Expiry_time)
             
             return new_booking
             
@@ -138,97 +312,210 @@ class BookingService:
             )
     
     @staticmethod
-    def confirm_booking(pnr: str, payment_method: str, db: Session) -> Booking:
-        booking = db.query(Booking).filter(Booking.pnr == pnr).first()
+    def _find_booking(pnr: str, db: Session, booking: Optional[Booking]) -> Booking:
+
+        # Callers that already loaded the booking (the routers do, to check
+        # ownership) pass it in instead of having it read again
+        if booking is None:
+            booking = db.query(Booking).filter(Booking.pnr == pnr).first()
         
         if not booking:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="Booking not found"
             )
+        return booking
+    
+    @staticmethod
+    def confirm_booking(
+        pnr: str,
+        payment_method: str,
+        db: Session,
+        booking: Optional[Booking] = None
+    ) -> Booking:
+
+        booking = BookingService._find_booking(pnr, db, booking)
         
-        if booking.Booking_status == 'confirmed':
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Booking already confirmed"
-            )
+        if booking.Booking_status != 'pending':
+            raise BookingService._not_pending_error(booking.Booking_status, booking.Expiry_time)
         
         # Check if booking expired
         if booking.Expiry_time and datetime.now() > booking.Expiry_time:
-            # Release seats and cancel booking
-            BookingService.cancel_booking(pnr, db)
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Booking expired. Please create a new booking."
-            )
+            BookingService._expire_booking(pnr, booking, db)
         
-        # Update booking status
-        booking.Booking_status = 'confirmed'
-        booking.Payment_status = 'paid'
-        booking.Payment_date = datetime.now()
-        booking.Expiry_time = None
-        
-        # Create payment transaction record
-        transaction = PaymentTransaction(
-            BookingID=booking.BookingID,
-            Payment_method=payment_method,
-            Transaction_amount=booking.Total_price,
-            Transaction_status='success',
-            Payment_gateway_response="Payment successful"
-        )
-        db.add(transaction)
+        # Status change and payment record are written back to back with no
+        # reads in between; the status change only applies to a booking
+        # that is still pending, so a hold released meanwhile is not revived
+        confirmed = {
+            'Booking_status': 'confirmed',
+            'Payment_status': 'paid',
+            'Payment_date': datetime.now(),
+            'Expiry_time': None
+        }
+        try:
+            updated = db.execute(
+                update(Booking)
+                .where(
+                    and_(
+                        Booking.BookingID == booking.BookingID,
+                        Booking.Booking_status == 'pending'
+                    )
+                )
+                .values(**confirmed)
+                .execution_options(synchronize_session=False)
+            ).rowcount
+            if updated != 1:
+                # Start a new transaction so the re-read sees who changed it
+                booking_id = booking.BookingID
+                db.rollback()
+                BookingService._raise_not_pending(booking_id, db)
+            
+            db.execute(insert(PaymentTransaction).values(
+                BookingID=booking.BookingID,
+                Payment_method=payment_method,
+                Transaction_amount=booking.Total_price,
+                Transaction_status='success',
+                Payment_gateway_response="Payment successful"
+            ))
+            BookingService._commit_keeping_state(db)
+        except Exception:
+            db.rollback()
+            raise
         
-        db.commit()
-        db.refresh(booking)
+        for key, value in confirmed.items():
+            set_committed_value(booking, key, value)
+        hold_expiry.discard_hold(booking.BookingID)
         
         return booking
     
     @staticmethod
-    def cancel_booking(pnr: str, db: Session) -> dict:
+    def _expire_booking(pnr: str, booking: Booking, db: Session) -> None:
+
+        # Release seats and cancel booking; the hold expiry loop may have
+        # done so already
+        try:
+            BookingService.cancel_booking(pnr, db, booking=booking)
+        except HTTPException as e:
+            if e.status_code != status.HTTP_400_BAD_REQUEST:
+                raise
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Booking expired. Please create a new booking."
+        )
+    
+    @staticmethod
+    def _raise_not_pending(booking_id: int, db: Session) -> None:
 
-        booking = db.query(Booking).filter(Booking.pnr == pnr).first()
+        # The guarded confirm matched no row: report what happened to the
+        # booking instead of a generic conflict
+        current = db.query(Booking.Booking_status, Booking.Expiry_time).filter(
+            Booking.BookingID == booking_id
+        ).first()
         
-        if not booking:
+        if current is None:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="Booking not found"
             )
+        raise BookingService._not_pending_error(current.Booking_status, current.Expiry_time)
+    
+    @staticmethod
+    def _not_pending_error(booking_status: str, expiry_time: Optional[datetime]) -> HTTPException:
+
+        # A hold released at its deadline is cancelled with Expiry_time kept;
+        # cancel_booking clears it for holds cancelled before then, so the
+        # deadline tells an expired hold from a cancelled booking
+        if booking_status == 'confirmed':
+            return HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Booking already confirmed"
+            )
         
-        if booking.Booking_status == 'cancelled':
-            raise HTTPException(
+        if expiry_time and datetime.now() > expiry_time:
+            return HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Booking already cancelled"
+                detail="Booking expired. Please create a new booking."
             )
         
-        # Release seats
-        seat_inv = db.query(SeatInventory).filter(
-            and_(
-                SeatInventory.FlightID == booking.FlightID,
-                SeatInventory.Class == booking.Seat_class
+        if booking_status == 'cancelled':
+            return HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Booking was cancelled. Please create a new booking."
             )
-        ).first()
         
-        if seat_inv:
-            seat_inv.Available_seats += booking.Num_passengers
+        return HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Booking is no longer pending"
+        )
+    
+    @staticmethod
+    def cancel_booking(pnr: str, db: Session, booking: Optional[Booking] = None) -> dict:
+
+        booking = BookingService._find_booking(pnr, db, booking)
         
-        # Update booking status
-        booking.Booking_status = 'cancelled'
+        if booking.Booking_status == 'cancelled':
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Booking already cancelled"
+            )
         
-        # Handle refund if payment was made
+        # Refund if payment was made
+        cancelled = {'Booking_status': 'cancelled'}
+        if booking.Expiry_time and datetime.now() <= booking.Expiry_time:
+            # Cancelled before its deadline: the hold did not expire
+            cancelled['Expiry_time'] = None
         if booking.Payment_status == 'paid':
-            booking.Payment_status = 'refunded'
+            cancelled['Payment_status'] = 'refunded'
+        
+        try:
+            # Only one cancel (or hold expiry) may release the seats
+            updated = db.execute(
+                update(Booking)
+                .where(
+                    and_(
+                        Booking.BookingID == booking.BookingID,
+                        Booking.Booking_status != 'cancelled'
+                    )
+                )
+                .values(**cancelled)
+                .execution_options(synchronize_session=False)
+            ).rowcount
+            if updated != 1:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail="Booking already cancelled"
+                )
             
-            # Create refund transaction
-            transaction = PaymentTransaction(
-                BookingID=booking.BookingID,
-                Payment_method='refund',
-                Transaction_amount=booking.Total_price,
-                Transaction_status='refunded',
-                Payment_gateway_response="Refund processed"
+            # Release seats
+            db.execute(
+                update(SeatInventory)
+                .where(
+                    and_(
+                        SeatInventory.FlightID == booking.FlightID,
+                        SeatInventory.Class == booking.Seat_class
+                    )
+                )
+                .values(Available_seats=SeatInventory.Available_seats + booking.Num_passengers)
+                .execution_options(synchronize_session=False)
             )
-            db.add(transaction)
+            
+            if 'Payment_status' in cancelled:
+                db.execute(insert(PaymentTransaction).values(
+                    BookingID=booking.BookingID,
+                    Payment_method='refund',
+                    Transaction_amount=booking.Total_price,
+                    Transaction_status='refunded',
+                    Payment_gateway_response="Refund processed"
+                ))
+            BookingService._commit_keeping_state(db)
+        except Exception:
+            db.rollback()
+            raise
         
-        db.commit()
+        for key, value in cancelled.items():
+            set_committed_value(booking, key, value)
+        notify_inventory_changed([booking.FlightID])
+        hold_expiry.discard_hold(booking.BookingID)
         
         return {
             "message": "Booking cancelled successfully",
@@ -236,4 +523,6 @@ class BookingService:
             "refund_amount": float(booking.Total_price) if booking.Payment_status == 'refunded' else 0.0
         }
 
+BookingService.set_seat_mode(os.getenv("BOOKING_SEAT_MODE", "optimistic"))
+
 booking_service = BookingService()
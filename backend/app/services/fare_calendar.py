@@ -0,0 +1,167 @@
+# Cheapest fare per day for a route, priced in one batch
+#
+# One query returns every scheduled flight on the route in the date range
+# with its inventory for the requested class; the whole set is priced with
+# the batch engine and reduced to the cheapest bookable fare per day.
+# Calendars are cached per route and range, tagged with every flight that
+# was considered, so a booking, cancellation or fare edit on any of them
+# drops the entry. Flights newly added to a route show up once the entry
+# expires.
+
+import os
+from datetime import date, datetime, timedelta
+from typing import Dict
+import numpy as np
+from fastapi import HTTPException, status
+from sqlalchemy import and_
+from sqlalchemy.orm import Session, aliased
+from app.models import Airline, Airport, Flight, SeatInventory
+from app.services.inventory_events import on_inventory_change
+from app.services.pricing_engine import get_dynamic_prices_batch, pricing_engine
+from app.utils.cache import TTLCache
+
+MAX_CALENDAR_DAYS = 60
+
+calendar_cache = TTLCache(
+    maxsize=int(os.getenv("FARE_CALENDAR_CACHE_SIZE", "2000")),
+    ttl=float(os.getenv("FARE_CALENDAR_CACHE_TTL", "300"))
+)
+
+
+@on_inventory_change
+def invalidate_flight_calendars(flight_id: int) -> None:
+    calendar_cache.invalidate_tag(flight_id)
+
+
+def get_fare_calendar(
+    db: Session,
+    origin: str,
+    destination: str,
+    start_date: date,
+    days: int,
+    seat_class: str = 'economy',
+    passengers: int = 1
+) -> Dict:
+
+    origin, destination = origin.upper(), destination.upper()
+    key = (origin, destination, seat_class, start_date, days, passengers, pricing_engine.time_bucket())
+    cached = calendar_cache.get(key)
+    if cached is not None:
+        return cached
+
+    calendar, flight_ids = _build_fare_calendar(db, origin, destination, start_date, days, seat_class, passengers)
+    calendar_cache.set(key, calendar, tags=flight_ids)
+    return calendar
+
+
+def _build_fare_calendar(
+    db: Session,
+    origin: str,
+    destination: str,
+    start_date: date,
+    days: int,
+    seat_class: str,
+    passengers: int
+):
+
+    origin_airport, dest_airport = aliased(Airport), aliased(Airport)
+    start = datetime.combine(start_date, datetime.min.time())
+    # Never price departures that have already left
+    earliest = max(start, datetime.now())
+
+    rows = db.query(
+        Flight.FlightID,
+        Flight.Flight_Number,
+        Flight.Price,
+        Flight.Departure_Time,
+        Airline.Airline_Code,
+        SeatInventory.Available_seats,
+        SeatInventory.Total_Seats
+    ).join(
+        origin_airport, origin_airport.AirportID == Flight.Departure_AirportID
+    ).join(
+        dest_airport, dest_airport.AirportID == Flight.Arrival_AirportID
+    ).join(
+        Airline, Airline.AirlineID == Flight.AirlineID
+    ).join(
+        SeatInventory,
+        and_(
+            SeatInventory.FlightID == Flight.FlightID,
+            SeatInventory.Class == seat_class
+        )
+    ).filter(
+        and_(
+            origin_airport.Airport_Code == origin,
+            dest_airport.Airport_Code == destination,
+            Flight.Flight_status == 'scheduled',
+            Flight.Departure_Time >= earliest,
+            Flight.Departure_Time < start + timedelta(days=days)
+        )
+    ).all()
+
+    if not rows:
+        known = db.query(Airport.Airport_Code).filter(Airport.Airport_Code.in_([origin, destination])).count()
+        if known < len({origin, destination}):
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Invalid airport code"
+            )
+
+    calendar_days = [
+        {
+            "departure_date": start_date + timedelta(days=offset),
+            "cheapest_price": None,
+            "FlightID": None,
+            "Flight_Number": None,
+            "airline_code": None,
+            "flights_available": 0
+        }
+        for offset in range(days)
+    ]
+    calendar = {
+        "origin_code": origin,
+        "destination_code": destination,
+        "seat_class": seat_class,
+        "passengers": passengers,
+        "start_date": start_date,
+        "days": calendar_days
+    }
+
+    # Flights without enough seats are still tagged: a cancellation can
+    # make them bookable
+    flight_ids = [row.FlightID for row in rows]
+    bookable = [row for row in rows if row.Available_seats >= passengers]
+    if not bookable:
+        return calendar, flight_ids
+
+    prices = get_dynamic_prices_batch(
+        base_fares=[float(row.Price) for row in bookable],
+        seats_available=[row.Available_seats for row in bookable],
+        total_seats=[row.Total_Seats for row in bookable],
+        departure_times=[row.Departure_Time for row in bookable],
+        origin_codes=origin,
+        destination_codes=destination,
+        airline_codes=[row.Airline_Code for row in bookable],
+        seat_classes=seat_class,
+        flight_ids=[row.FlightID for row in bookable]
+    )['final_price']
+
+    day_index = np.array([(row.Departure_Time.date() - start_date).days for row in bookable])
+    counts = np.bincount(day_index, minlength=days)
+
+    # Sort by (day, price); the first row of each day is its cheapest
+    order = np.lexsort((prices, day_index))
+    first_of_day = np.ones(len(order), dtype=bool)
+    first_of_day[1:] = day_index[order][1:] != day_index[order][:-1]
+    for position in order[first_of_day]:
+        row = bookable[position]
+        entry = calendar_days[day_index[position]]
+        entry["cheapest_price"] = float(prices[position])
+        entry["FlightID"] = row.FlightID
+        entry["Flight_Number"] = row.Flight_Number
+        entry["airline_code"] = row.Airline_Code
+
+    for offset, count in enumerate(counts):
+        calendar_days[offset]["flights_available"] = int(count)
+
+    return calendar, flight_ids
@@ -0,0 +1,121 @@
+# Flight read paths that load everything a response needs up front
+#
+# Airline and both airports are many-to-one, so they ride along in the
+# flight query as joined loads; the inventory row for one class is joined
+# in the same statement. Listing and search each cost one query no matter
+# how many flights they return.
+
+from datetime import datetime
+from itertools import islice
+from typing import Dict, Iterator, List, Optional, Tuple
+from sqlalchemy import and_, or_, select
+from sqlalchemy.orm import Query, Session, joinedload, selectinload
+from app.models import Airport, Flight, SeatInventory
+
+# Stable orderings for keyset pagination; FlightID breaks ties
+LIST_ORDERINGS = ('flight_id', 'departure_time')
+
+FLIGHT_RELATIONS = (
+    joinedload(Flight.airline),
+    joinedload(Flight.departure_airport),
+    joinedload(Flight.arrival_airport),
+)
+
+
+def flights_with_inventory(db: Session, seat_class: str) -> Query:
+
+    # Rows of (Flight, SeatInventory or None); at most one inventory row
+    # per flight and class, so offset/limit still count flights
+    return db.query(Flight, SeatInventory).outerjoin(
+        SeatInventory,
+        and_(
+            SeatInventory.FlightID == Flight.FlightID,
+            SeatInventory.Class == seat_class
+        )
+    ).options(*FLIGHT_RELATIONS)
+
+
+def airport_id(code: str):
+
+    # Airport code resolved inside the flight query, not in a query of its own
+    return select(Airport.AirportID).where(Airport.Airport_Code == code).scalar_subquery()
+
+
+def flight_with_all_inventory(db: Session, flight_id: int):
+
+    # One joined query for the flight, one IN query for its inventory rows
+    return db.query(Flight).options(
+        *FLIGHT_RELATIONS,
+        selectinload(Flight.seat_inventory)
+    ).filter(Flight.FlightID == flight_id).first()
+
+
+def flights_with_all_inventory(db: Session, flight_ids: List[int]) -> List[Flight]:
+
+    # Same two queries for any number of flights
+    return db.query(Flight).options(
+        *FLIGHT_RELATIONS,
+        selectinload(Flight.seat_inventory)
+    ).filter(Flight.FlightID.in_(flight_ids)).all()
+
+
+def order_flights(query: Query, order_by: str) -> Query:
+
+    if order_by == 'departure_time':
+        return query.order_by(Flight.Departure_Time, Flight.FlightID)
+    return query.order_by(Flight.FlightID)
+
+
+def cursor_position(flight: Flight, order_by: str) -> Dict:
+
+    position = {'o': order_by, 'id': flight.FlightID}
+    if order_by == 'departure_time':
+        position['t'] = flight.Departure_Time.isoformat()
+    return position
+
+
+def after_position(query: Query, position: Dict, order_by: str) -> Query:
+
+    # Rows strictly after the cursor in the given ordering. Raises
+    # ValueError for a cursor issued under another ordering.
+    if position.get('o') != order_by:
+        raise ValueError("Cursor was issued for a different ordering")
+    try:
+        flight_id = int(position['id'])
+        if order_by == 'departure_time':
+            departure = datetime.fromisoformat(position['t'])
+            return query.filter(
+                or_(
+                    Flight.Departure_Time > departure,
+                    and_(Flight.Departure_Time == departure, Flight.FlightID > flight_id)
+                )
+            )
+    except (KeyError, TypeError, ValueError) as e:
+        raise ValueError("Malformed cursor") from e
+    return query.filter(Flight.FlightID > flight_id)
+
+
+def iter_flight_chunks(
+    db: Session,
+    seat_class: str,
+    order_by: str,
+    position: Optional[Dict] = None,
+    chunk_size: int = 500
+) -> Iterator[List[Tuple[Flight, SeatInventory]]]:
+
+    # Streams (Flight, SeatInventory) rows from a server-side cursor in
+    # chunks; flights without inventory for the class are left out
+    query = flights_with_inventory(db, seat_class).filter(SeatInventory.Inventory_ID.isnot(None))
+    if position is not None:
+        query = after_position(query, position, order_by)
+    rows = iter(order_flights(query, order_by).yield_per(chunk_size))
+    while True:
+        chunk = list(islice(rows, chunk_size))
+        if not chunk:
+            return
+        yield chunk
+        # Rows already handed out are not needed again; airlines and
+        # airports stay in the identity map and are reused
+        for flight, seat_inv in chunk:
+            db.expunge(flight)
+            db.expunge(seat_inv)
@@ -0,0 +1,239 @@
+# Seat-hold expiry
+#
+# A pending booking holds its seats until Expiry_time. Holds are kept in a
+# min-heap keyed by expiry, and a background loop sleeps until the earliest
+# one is due, so seats come back within moments of the deadline instead of
+# on the next simulator tick. Everything due at once is released together:
+# one locking read of the bookings, one UPDATE cancelling them and one
+# executemany UPDATE returning the seats per (flight, class).
+#
+# The heap is rebuilt from the pending bookings at startup and every
+# reload_interval, which also picks up holds created by other workers.
+# Several workers may see the same hold; the release only acts on rows
+# that are still pending under the row lock, so seats are returned once.
+
+import asyncio
+import heapq
+import logging
+import os
+import threading
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Set, Tuple
+from sqlalchemy import and_, bindparam, update
+from sqlalchemy.orm import Session
+from app.models import Booking, SeatInventory
+from app.services.inventory_events import notify_inventory_changed
+
+logger = logging.getLogger(__name__)
+
+_EPOCH = datetime(1970, 1, 1)
+
+# IN lists are split into chunks of this size
+QUERY_CHUNK_SIZE = 1000
+
+
+def _to_seconds(moment: datetime) -> float:
+    return (moment - _EPOCH).total_seconds()
+
+
+def _from_seconds(seconds: float) -> datetime:
+    return _EPOCH + timedelta(seconds=float(seconds))
+
+
+class HoldExpiryManager:
+
+    def __init__(self, reload_interval: int = 600, max_sleep: float = 5.0):
+        self._heap: List[Tuple[float, int]] = []
+        # BookingID -> expiry of its live heap entry; entries for holds that
+        # were confirmed, cancelled or rescheduled are skipped when popped
+        self._expires_at: Dict[int, float] = {}
+        self._lock = threading.Lock()
+        self.reload_interval = reload_interval
+        self.max_sleep = max_sleep
+        self.loaded_at: Optional[datetime] = None
+        self.released_total = 0
+
+    def add_hold(self, booking_id: int, expiry_time: Optional[datetime]) -> None:
+
+        if expiry_time is None:
+            return
+        expires = _to_seconds(expiry_time)
+        with self._lock:
+            self._expires_at[booking_id] = expires
+            heapq.heappush(self._heap, (expires, booking_id))
+
+    def discard_hold(self, booking_id: int) -> None:
+        with self._lock:
+            self._expires_at.pop(booking_id, None)
+
+    def pop_due(self, now: datetime) -> Set[int]:
+
+        now_seconds = _to_seconds(now)
+        due = set()
+        with self._lock:
+            while self._heap and self._heap[0][0] <= now_seconds:
+                expires, booking_id = heapq.heappop(self._heap)
+                if self._expires_at.get(booking_id) == expires:
+                    del self._expires_at[booking_id]
+                    due.add(booking_id)
+        return due
+
+    def seconds_until_next(self, now: datetime) -> float:
+
+        # How long the loop may sleep; capped so holds added meanwhile and
+        # reloads are noticed
+        with self._lock:
+            while self._heap and self._expires_at.get(self._heap[0][1]) != self._heap[0][0]:
+                heapq.heappop(self._heap)
+            if not self._heap:
+                return self.max_sleep
+            wait = self._heap[0][0] - _to_seconds(now)
+        return min(max(wait, 0.0), self.max_sleep)
+
+    def needs_reload(self, now: datetime) -> bool:
+
+        if self.loaded_at is None:
+            return True
+        return now - self.loaded_at >= timedelta(seconds=self.reload_interval)
+
+    def load(self, db: Session, now: Optional[datetime] = None) -> int:
+
+        # Rebuild the heap from every pending booking with a deadline
+        now = now or datetime.now()
+        rows = db.query(Booking.BookingID, Booking.Expiry_time).filter(
+            and_(
+                Booking.Booking_status == 'pending',
+                Booking.Expiry_time.isnot(None)
+            )
+        ).all()
+
+        expires_at = {booking_id: _to_seconds(expiry) for booking_id, expiry in rows}
+        with self._lock:
+            # Holds added while the query ran are kept; stale ones are
+            # filtered out by the release query
+            for booking_id, expires in self._expires_at.items():
+                expires_at.setdefault(booking_id, expires)
+            self._expires_at = expires_at
+            self._heap = [(expires, booking_id) for booking_id, expires in expires_at.items()]
+            heapq.heapify(self._heap)
+        self.loaded_at = now
+        logger.info(f"Hold expiry loaded {len(rows)} pending holds")
+        return len(rows)
+
+    def expire_due(self, db: Session, now: Optional[datetime] = None) -> int:
+
+        # Cancel every due hold and return its seats; commits
+        now = now or datetime.now()
+        if self.needs_reload(now):
+            self.load(db, now)
+        due = self.pop_due(now)
+        if not due:
+            return 0
+
+        released = 0
+        flight_ids = set()
+        try:
+            due_ids = sorted(due)
+            for start in range(0, len(due_ids), QUERY_CHUNK_SIZE):
+                count, flights = self._release(db, due_ids[start:start + QUERY_CHUNK_SIZE], now)
+                released += count
+                flight_ids.update(flights)
+            db.commit()
+        except Exception:
+            db.rollback()
+            # Try again on the next pass
+            with self._lock:
+                for booking_id in due:
+                    self._expires_at.setdefault(booking_id, _to_seconds(now))
+                    heapq.heappush(self._heap, (self._expires_at[booking_id], booking_id))
+            raise
+
+        notify_inventory_changed(flight_ids)
+        self.released_total += released
+        if released:
+            logger.info(f"Expired {released} pending bookings on {len(flight_ids)} flights")
+        return released
+
+    def _release(self, db: Session, booking_ids: List[int], now: datetime) -> Tuple[int, Set[int]]:
+
+        # Holds still pending and past their deadline, locked so a concurrent
+        # confirm or another worker cannot act on them at the same time
+        rows = db.query(
+            Booking.BookingID, Booking.FlightID, Booking.Seat_class, Booking.Num_passengers
+        ).filter(
+            and_(
+                Booking.BookingID.in_(booking_ids),
+                Booking.Booking_status == 'pending',
+                Booking.Expiry_time <= now
+            )
+        ).with_for_update().all()
+        if not rows:
+            return 0, set()
+
+        db.execute(
+            update(Booking)
+            .where(Booking.BookingID.in_([row.BookingID for row in rows]))
+            .values(Booking_status='cancelled')
+            .execution_options(synchronize_session=False)
+        )
+
+        seats: Dict[Tuple[int, str], int] = defaultdict(int)
+        for row in rows:
+            seats[(row.FlightID, row.Seat_class)] += row.Num_passengers
+        db.connection().execute(
+            update(SeatInventory)
+            .where(
+                and_(
+                    SeatInventory.FlightID == bindparam('flight_id'),
+                    SeatInventory.Class == bindparam('seat_class')
+                )
+            )
+            .values(Available_seats=SeatInventory.Available_seats + bindparam('released')),
+            [
+                {'flight_id': flight_id, 'seat_class': seat_class, 'released': count}
+                for (flight_id, seat_class), count in seats.items()
+            ]
+        )
+        return len(rows), {flight_id for flight_id, _ in seats}
+
+    def stats(self) -> Dict[str, object]:
+
+        with self._lock:
+            next_due = min(self._expires_at.values()) if self._expires_at else None
+            return {
+                'pending_holds': len(self._expires_at),
+                'heap_size': len(self._heap),
+                'next_expiry': _from_seconds(next_due).isoformat() if next_due is not None else None,
+                'released_total': self.released_total,
+                'loaded_at': self.loaded_at.isoformat() if self.loaded_at else None
+            }
+
+
+hold_expiry = HoldExpiryManager(
+    reload_interval=int(os.getenv("HOLD_EXPIRY_RELOAD_INTERVAL", "600")),
+    max_sleep=float(os.getenv("HOLD_EXPIRY_MAX_SLEEP", "5"))
+)
+
+
+def _expire_once() -> int:
+
+    from app.database_connection import SessionLocal
+
+    db = SessionLocal()
+    try:
+        return hold_expiry.expire_due(db)
+    finally:
+        db.close()
+
+
+async def hold_expiry_loop():
+
+    # Wake at the earliest deadline (or max_sleep) and release what is due
+    while True:
+        try:
+            await asyncio.to_thread(_expire_once)
+            await asyncio.sleep(hold_expiry.seconds_until_next(datetime.now()))
+        except Exception as e:
+            logger.error(f"Hold expiry failed: {e}")
+            await asyncio.sleep(hold_expiry.max_sleep)
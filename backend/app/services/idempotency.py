@@ -0,0 +1,290 @@
+# Idempotency-Key support for booking writes
+#
+# A client retrying POST /bookings/create or /bookings/{pnr}/confirm sends
+# the same Idempotency-Key header. The first request runs; its successful
+# response is stored per (endpoint, user, key) and replayed byte for byte
+# to every retry, which never touches inventory or payments again.
+#
+# Responses live in a bounded in-process LRU. With IDEMPOTENCY_PERSIST=1 the
+# Idempotency_keys table is used as well: a row claims the key before the
+# handler runs, so a retry landing on another worker waits its turn (409)
+# or replays the stored result instead of running twice.
+#
+# Only 2xx responses are stored. An error releases the key so the client
+# can retry once the problem (no seats, expired hold, ...) is dealt with.
+# A claim is a lease: while the handler runs, a helper thread renews it
+# every third of IDEMPOTENCY_LEASE_SECONDS, however long the request takes.
+# A claim left behind by a worker that died mid-request stops being renewed
+# and is taken over by a retry once the lease runs out. The lease must
+# therefore outlast the longest stretch in which a live worker cannot renew
+# (database unreachable or stalled); if it does not, a retry can run the
+# write a second time.
+
+import hashlib
+import logging
+import os
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from typing import Callable, NamedTuple, Optional, Set, Tuple
+from fastapi import HTTPException, Response, status
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from app.models import IdempotencyKey
+from app.utils.cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+MAX_KEY_LENGTH = 255
+
+
+class StoredResponse(NamedTuple):
+    request_hash: str
+    status_code: int
+    body: bytes
+
+
+class IdempotencyStore:
+
+    def __init__(
+        self,
+        maxsize: int = 10000,
+        ttl: float = 86400.0,
+        lease: float = 60.0,
+        persist: bool = False
+    ):
+        self.ttl = ttl
+        # How long an unfinished claim row blocks its key without renewal
+        self.lease = lease
+        self.persist = persist
+        self._responses = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._in_flight: Set[str] = set()
+        self._lock = threading.Lock()
+        self.replays = 0
+
+    def run(
+        self,
+        db: Session,
+        key: Optional[str],
+        scope: str,
+        request_fingerprint: str,
+        handler: Callable[[], Response]
+    ) -> Response:
+
+        # Without a key the request simply runs
+        if key is None:
+            return handler()
+        if not key or len(key) > MAX_KEY_LENGTH:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Idempotency-Key must be 1 to {MAX_KEY_LENGTH} characters"
+            )
+
+        scope_key = f"{scope}:{key}"
+        request_hash = hashlib.sha256(request_fingerprint.encode()).hexdigest()
+
+        stored = self._responses.get(scope_key)
+        if stored is not None:
+            return self._replay(stored, request_hash)
+
+        with self._lock:
+            if scope_key in self._in_flight:
+                raise self._in_progress()
+            self._in_flight.add(scope_key)
+
+        try:
+            claim_id = None
+            if self.persist:
+                claim_id, stored = self._claim(db, scope_key, request_hash)
+                if stored is not None:
+                    self._responses.set(scope_key, stored)
+                    return self._replay(stored, request_hash)
+
+            try:
+                with self._lease_renewal(db, claim_id):
+                    response = handler()
+            except BaseException:
+                self._release(db, claim_id)
+                raise
+
+            if not 200 <= response.status_code < 300:
+                self._release(db, claim_id)
+                return response
+
+            stored = StoredResponse(request_hash, response.status_code, bytes(response.body))
+            self._responses.set(scope_key, stored)
+            if claim_id is not None:
+                self._record(db, claim_id, scope_key, stored)
+            return response
+        finally:
+            with self._lock:
+                self._in_flight.discard(scope_key)
+
+    def _replay(self, stored: StoredResponse, request_hash: str) -> Response:
+
+        if stored.request_hash != request_hash:
+            raise HTTPException(
+                status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                detail="Idempotency-Key was already used with a different request"
+            )
+        self.replays += 1
+        return Response(
+            content=stored.body,
+            status_code=stored.status_code,
+            media_type="application/json",
+            headers={"Idempotent-Replayed": "true"}
+        )
+
+    @staticmethod
+    def _in_progress() -> HTTPException:
+        return HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="A request with this Idempotency-Key is still being processed"
+        )
+
+    def _claim(
+        self,
+        db: Session,
+        scope_key: str,
+        request_hash: str
+    ) -> Tuple[Optional[int], Optional[StoredResponse]]:
+
+        # Insert the key row in its own transaction so other workers see the
+        # claim at once. Returns the claimed row's KeyID, or the stored
+        # response if the key was already completed; raises 409 while
+        # another request holds it.
+        session = Session(bind=db.get_bind())
+        try:
+            for _ in range(2):
+                claim = IdempotencyKey(Scope_key=scope_key, Request_hash=request_hash)
+                session.add(claim)
+                try:
+                    session.commit()
+                    return claim.KeyID, None
+                except IntegrityError:
+                    session.rollback()
+
+                row = session.query(
+                    IdempotencyKey.KeyID,
+                    IdempotencyKey.Request_hash,
+                    IdempotencyKey.Status_code,
+                    IdempotencyKey.Response_body,
+                    IdempotencyKey.Created_at
+                ).filter(IdempotencyKey.Scope_key == scope_key).first()
+                if row is None:
+                    continue  # released meanwhile
+                # Unfinished claims expire after the lease, stored responses after the TTL
+                unfinished = row.Status_code is None
+                limit = self.lease if unfinished else self.ttl
+                cutoff = datetime.utcnow() - timedelta(seconds=limit)
+                if row.Created_at and row.Created_at < cutoff:
+                    # Drop the row unless its request finished or renewed the
+                    # lease meanwhile; the insert above then decides which
+                    # retry takes the key over
+                    stale = session.query(IdempotencyKey).filter(
+                        IdempotencyKey.KeyID == row.KeyID,
+                        IdempotencyKey.Created_at < cutoff
+                    )
+                    if unfinished:
+                        stale = stale.filter(IdempotencyKey.Status_code.is_(None))
+                    stale.delete(synchronize_session=False)
+                    session.commit()
+                    continue
+                if unfinished:
+                    raise self._in_progress()
+                return None, StoredResponse(row.Request_hash, row.Status_code, row.Response_body.encode())
+            raise self._in_progress()
+        finally:
+            session.close()
+
+    @contextmanager
+    def _lease_renewal(self, db: Session, claim_id: Optional[int]):
+
+        # Keeps a running request's claim fresh until the handler returns
+        if claim_id is None:
+            yield
+            return
+        done = threading.Event()
+        bind = db.get_bind()
+
+        def renew():
+            while not done.wait(self.lease / 3):
+                self._renew(bind, claim_id)
+
+        thread = threading.Thread(target=renew, name=f"idempotency-lease-{claim_id}", daemon=True)
+        thread.start()
+        try:
+            yield
+        finally:
+            done.set()
+            thread.join()
+
+    def _renew(self, bind, claim_id: int) -> None:
+
+        session = Session(bind=bind)
+        try:
+            session.query(IdempotencyKey).filter(
+                IdempotencyKey.KeyID == claim_id,
+                IdempotencyKey.Status_code.is_(None)
+            ).update({'Created_at': datetime.utcnow()}, synchronize_session=False)
+            session.commit()
+        except Exception as e:
+            # Retried at the next tick; the lease covers a missed renewal or two
+            session.rollback()
+            logger.warning(f"Could not renew Idempotency-Key claim {claim_id}: {e}")
+        finally:
+            session.close()
+
+    def _record(self, db: Session, claim_id: int, scope_key: str, stored: StoredResponse) -> None:
+
+        # By KeyID: if the lease ran out and another retry took the key over,
+        # its row is left alone
+        session = Session(bind=db.get_bind())
+        try:
+            session.query(IdempotencyKey).filter(IdempotencyKey.KeyID == claim_id).update(
+                {'Status_code': stored.status_code, 'Response_body': stored.body.decode()},
+                synchronize_session=False
+            )
+            session.commit()
+        except Exception as e:
+            # The write itself succeeded; this worker still replays from memory
+            session.rollback()
+            logger.error(f"Could not store idempotent response for {scope_key}: {e}")
+        finally:
+            session.close()
+
+    def _release(self, db: Session, claim_id: Optional[int]) -> None:
+
+        if claim_id is None:
+            return
+        session = Session(bind=db.get_bind())
+        try:
+            session.query(IdempotencyKey).filter(
+                IdempotencyKey.KeyID == claim_id,
+                IdempotencyKey.Status_code.is_(None)
+            ).delete(synchronize_session=False)
+            session.commit()
+        except Exception as e:
+            session.rollback()
+            logger.error(f"Could not release Idempotency-Key claim {claim_id}: {e}")
+        finally:
+            session.close()
+
+    def stats(self) -> dict:
+        with self._lock:
+            in_flight = len(self._in_flight)
+        return {
+            **self._responses.stats(),
+            "persist": self.persist,
+            "lease_seconds": self.lease,
+            "in_flight": in_flight,
+            "replays": self.replays
+        }
+
+
+idempotency_store = IdempotencyStore(
+    maxsize=int(os.getenv("IDEMPOTENCY_CACHE_SIZE", "10000")),
+    ttl=float(os.getenv("IDEMPOTENCY_KEY_TTL", "86400")),
+    lease=float(os.getenv("IDEMPOTENCY_LEASE_SECONDS", "60")),
+    persist=os.getenv("IDEMPOTENCY_PERSIST", "0") == "1"
+)
@@ -0,0 +1,32 @@
+# In-process notifications for committed writes to Flights / Seat_Inventory
+#
+# Write paths (bookings, simulator, admin) call notify_inventory_changed()
+# after their commit; caches and indexes register with on_inventory_change()
+# to drop or refresh whatever they hold for those flights.
+
+import logging
+from typing import Callable, Iterable, List
+
+logger = logging.getLogger(__name__)
+
+InventoryListener = Callable[[int], None]
+
+_listeners: List[InventoryListener] = []
+
+
+def on_inventory_change(listener: InventoryListener) -> InventoryListener:
+    # Usable as a decorator
+    _listeners.append(listener)
+    return listener
+
+
+def notify_inventory_changed(flight_ids: Iterable[int]) -> None:
+
+    for flight_id in set(flight_ids):
+        for listener in _listeners:
+            try:
+                listener(flight_id)
+            except Exception as e:
+                # The write is already committed; a failing listener must not
+                # turn it into an error response.
+                logger.error(f"Inventory listener {listener.__name__} failed for flight {flight_id}: {e}")
@@ -0,0 +1,104 @@
+# Connecting-flight itinerary search
+#
+# Depth-first, time-dependent search over the search index's departure
+# lists: from the origin on the requested date, each next leg must leave
+# the connecting airport between min and max connection time after the
+# previous leg lands. No airport is visited twice and every leg must have
+# enough seats in the requested class. The search stops expanding when the
+# per-request time budget or the candidate cap is hit, then prices every
+# distinct leg in a single batch and ranks the itineraries.
+
+import os
+import time
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Tuple
+from app.services.pricing_engine import get_dynamic_prices_batch
+from app.services.search_index import FlightSearchIndex, IndexedFlight
+
+DEFAULT_MIN_CONNECTION_MINUTES = 45
+DEFAULT_MAX_CONNECTION_MINUTES = 360
+
+# Wall-clock budget for the graph search part of one request
+SEARCH_BUDGET_MS = int(os.getenv("CONNECTION_SEARCH_BUDGET_MS", "250"))
+
+# Itineraries collected before pricing; bounds the batch size
+MAX_CANDIDATES = 2000
+
+Itinerary = Tuple[IndexedFlight, ...]
+
+
+def find_itineraries(
+    index: FlightSearchIndex,
+    origin: str,
+    destination: str,
+    departure_date: date,
+    seat_class: str,
+    passengers: int,
+    max_stops: int = 1,
+    min_connection: timedelta = timedelta(minutes=DEFAULT_MIN_CONNECTION_MINUTES),
+    max_connection: timedelta = timedelta(minutes=DEFAULT_MAX_CONNECTION_MINUTES),
+    budget_ms: int = SEARCH_BUDGET_MS
+) -> Tuple[List[Itinerary], bool]:
+
+    # Returns (itineraries, truncated); truncated means the budget or the
+    # candidate cap cut the search short
+    deadline = time.monotonic() + budget_ms / 1000.0
+    day_start = datetime.combine(departure_date, datetime.min.time())
+    first_legs = index.departures_between(origin, day_start, day_start + timedelta(days=1) - timedelta(microseconds=1))
+
+    def bookable(flight: IndexedFlight) -> bool:
+        seats = flight.inventory.get(seat_class)
+        return seats is not None and seats.available >= passengers
+
+    found: List[Itinerary] = []
+    # Stack of partial itineraries; reversed pushes keep earlier departures first
+    stack: List[Itinerary] = [(leg,) for leg in reversed(first_legs) if bookable(leg)]
+    while stack:
+        if len(found) >= MAX_CANDIDATES or time.monotonic() > deadline:
+            return found, True
+
+        path = stack.pop()
+        last = path[-1]
+        if last.destination_code == destination:
+            found.append(path)
+            continue
+        if len(path) > max_stops:
+            continue
+
+        visited = {leg.origin_code for leg in path}
+        visited.add(last.destination_code)
+        next_legs = index.departures_between(
+            last.destination_code,
+            last.Arrival_Time + min_connection,
+            last.Arrival_Time + max_connection
+        )
+        for leg in reversed(next_legs):
+            # No airport twice; the last allowed leg must reach the destination
+            if leg.destination_code in visited or not bookable(leg):
+                continue
+            if len(path) == max_stops and leg.destination_code != destination:
+                continue
+            stack.append(path + (leg,))
+
+    return found, False
+
+
+def price_itineraries(itineraries: List[Itinerary], seat_class: str) -> Dict[int, float]:
+
+    # One batch over every distinct leg; returns FlightID -> price per seat
+    legs = {leg.FlightID: leg for itinerary in itineraries for leg in itinerary}
+    if not legs:
+        return {}
+    flights = list(legs.values())
+    prices = get_dynamic_prices_batch(
+        base_fares=[flight.base_fare for flight in flights],
+        seats_available=[flight.inventory[seat_class].available for flight in flights],
+        total_seats=[flight.inventory[seat_class].total for flight in flights],
+        departure_times=[flight.Departure_Time for flight in flights],
+        origin_codes=[flight.origin_code for flight in flights],
+        destination_codes=[flight.destination_code for flight in flights],
+        airline_codes=[flight.airline_code for flight in flights],
+        seat_classes=seat_class,
+        flight_ids=[flight.FlightID for flight in flights]
+    )['final_price']
+    return {flight.FlightID: float(price) for flight, price in zip(flights, prices)}
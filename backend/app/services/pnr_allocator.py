@@ -0,0 +1,78 @@
+# Collision-free PNR allocation
+#
+# PNRs keep the 3 letters + 3 digits format (26^3 * 1000 codes). Every
+# code is the image of one integer of the PNR sequence under a fixed affine
+# permutation, so consecutive bookings get unrelated-looking codes and no
+# two sequence values share a code.
+#
+# Workers claim the sequence in blocks: inserting a Pnr_blocks row hands
+# the process the values of that block, and AUTO_INCREMENT keeps blocks
+# disjoint across uvicorn workers and hosts. Bookings then take codes from
+# memory. The database is touched once per block, which is also when codes
+# already used by bookings made with the old random generator are skipped.
+
+import os
+import string
+import threading
+from typing import List
+from sqlalchemy.orm import Session
+from app.models import Booking, PnrBlock
+
+PNR_SPACE = 26 ** 3 * 1000
+
+# Coprime with PNR_SPACE (2^6 * 5^3 * 13^3), so value -> code is a bijection
+_MULTIPLIER = 4_421_137
+_OFFSET = 4_815_162
+
+_LETTERS = string.ascii_uppercase
+
+
+def encode_pnr(value: int) -> str:
+
+    if not 0 <= value < PNR_SPACE:
+        raise ValueError(f"PNR sequence value {value} out of range")
+    code, digits = divmod((value * _MULTIPLIER + _OFFSET) % PNR_SPACE, 1000)
+    letters = _LETTERS[code // 676] + _LETTERS[code // 26 % 26] + _LETTERS[code % 26]
+    return f"{letters}{digits:03d}"
+
+
+class PnrAllocator:
+
+    def __init__(self, block_size: int = 1000):
+        if block_size <= 0:
+            raise ValueError("block_size must be positive")
+        self.block_size = block_size
+        self._codes: List[str] = []
+        self._lock = threading.Lock()
+
+    def allocate(self, db: Session) -> str:
+
+        with self._lock:
+            while not self._codes:
+                self._codes = self._claim_block(db)
+            return self._codes.pop()
+
+    def _claim_block(self, db: Session) -> List[str]:
+
+        # Own session so the claim commits whatever happens to the booking
+        session = Session(bind=db.get_bind())
+        try:
+            block = PnrBlock()
+            session.add(block)
+            session.commit()
+
+            start = (block.BlockID - 1) * self.block_size
+            if start >= PNR_SPACE:
+                raise RuntimeError("PNR space exhausted")
+            codes = [encode_pnr(value) for value in range(start, min(start + self.block_size, PNR_SPACE))]
+            taken = {
+                pnr for (pnr,) in session.query(Booking.pnr).filter(Booking.pnr.in_(codes))
+            }
+        finally:
+            session.close()
+
+        # Reversed so pop() hands codes out in sequence order
+        return [code for code in reversed(codes) if code not in taken]
+
+
+pnr_allocator = PnrAllocator(block_size=int(os.getenv("PNR_BLOCK_SIZE", "1000")))
@@ -1,7 +1,24 @@
-from datetime import datetime, timedelta
-from typing import Dict, Tuple
+from datetime import datetime, date, timedelta
+from typing import Dict, List, Tuple, Sequence, Optional, Union
+import asyncio
+import logging
 import random
 import math
+import time
+import zlib
+import os
+import numpy as np
+from app.utils.cache import TTLCache
+from app.services.inventory_events import on_inventory_change
+from app.services.pricing_plan import PricingPlan, load_pricing_plan
+
+# Ordinal of 1970-01-01, day zero of numpy datetime64[D]
+_EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+_EPOCH = datetime(1970, 1, 1)
+
+_MASK64 = (1 << 64) - 1
+
+logger = logging.getLogger(__name__)
 
 class DynamicPricingEngine:
 
@@ -28,9 +45,79 @@ class DynamicPricingEngine:
         'I5': 'budget',    # Air Asia
         'G8': 'budget',    # GoFirst
     }
+    TIER_FACTORS = {'premium': 0.10, 'standard': 0.0, 'budget': -0.05}
+
+    # Calendar factors are precomputed for this many days ahead
+    CALENDAR_HORIZON_DAYS = 400
+
+    CLASS_MULTIPLIERS = {
+        'economy': 1.0,
+        'business': 2.8,
+        'first': 4.5
+    }
+
+    # Stable per-class keys for the deterministic demand hash
+    CLASS_KEYS = {'economy': 1, 'business': 2, 'first': 3}
+
+    # Demand noise: 'random' draws fresh noise per quote, 'deterministic'
+    # derives it from (FlightID, class, time bucket, seed)
+    DEMAND_MODES = ('random', 'deterministic')
     
     def __init__(self):
         self.base_demand_factor = 1.0
+        self._rng = np.random.default_rng()
+        self._calendar = self._build_calendar_table()
+        # Built-in thresholds; active Pricing_rules are compiled on top of it
+        self.default_plan = self._build_default_plan()
+        self.plan = self.default_plan
+        self.configure_demand(
+            mode=os.getenv("PRICING_DEMAND_MODE", "random"),
+            seed=int(os.getenv("PRICING_SEED", "0")),
+            bucket_seconds=int(os.getenv("PRICING_BUCKET_SECONDS", "900"))
+        )
+
+    def configure_demand(self, mode: str = 'random', seed: int = 0, bucket_seconds: int = 900) -> None:
+
+        if mode not in self.DEMAND_MODES:
+            raise ValueError(f"Unknown demand mode '{mode}', expected one of {self.DEMAND_MODES}")
+        if bucket_seconds <= 0:
+            raise ValueError("bucket_seconds must be positive")
+
+        self.demand_mode = mode
+        self.demand_seed = seed & _MASK64
+        self.demand_bucket_seconds = bucket_seconds
+
+    def set_plan(self, plan: PricingPlan) -> None:
+        # Single attribute swap: in-flight quotes keep the plan they started with
+        self.plan = plan
+
+    def _build_default_plan(self) -> PricingPlan:
+
+        route_factors = {route: 0.06 for route in self.BUSINESS_ROUTES}
+        route_factors.update({route: 0.08 for route in self.TOURIST_ROUTES})
+        route_factors.update({route: 0.10 for route in self.METRO_ROUTES})
+
+        return PricingPlan(
+            version='default',
+            route_factors=route_factors,
+            airline_factors={
+                code: self.TIER_FACTORS[tier] for code, tier in self.AIRLINE_TIERS.items()
+            },
+            class_multipliers=self.CLASS_MULTIPLIERS
+        )
+
+    @property
+    def is_deterministic(self) -> bool:
+        return self.demand_mode == 'deterministic'
+
+    def time_bucket(self, now: Optional[datetime] = None) -> int:
+
+        # Index of the pricing time bucket containing `now`
+        elapsed = (now or datetime.now()) - _EPOCH
+        return int(elapsed.total_seconds() // self.demand_bucket_seconds)
+
+    def bucket_start(self, bucket: int) -> datetime:
+        return _EPOCH + timedelta(seconds=bucket * self.demand_bucket_seconds)
         
     def calculate_price(
         self,
@@ -41,20 +128,43 @@ class DynamicPricingEngine:
         origin_code: str,
         destination_code: str,
         airline_code: str,
-        seat_class: str = 'economy'
+        seat_class: str = 'economy',
+        flight_id: Optional[int] = None,
+        now: Optional[datetime] = None,
+        plan: Optional[PricingPlan] = None,
+        breakdown: bool = True
     ) -> Dict[str, float]:
 
+        # With breakdown=False only 'final_price' is returned
+        plan = plan or self.plan
+
+        # In deterministic mode every time-dependent input is evaluated at the
+        # start of the current bucket, so the quote is a pure function of its
+        # arguments until the bucket rolls over.
+        now = now or datetime.now()
+        if self.is_deterministic:
+            now = self.bucket_start(self.time_bucket(now))
         
         # Calculate individual factors
-        seat_factor = self._calculate_seat_availability_factor(seats_available, total_seats)
-        time_factor = self._calculate_time_to_departure_factor(departure_time)
-        demand_factor = self._calculate_demand_factor(departure_time, origin_code, destination_code)
+        until_departure = departure_time - now
+        seat_factor = plan.seat_factor(seats_available, total_seats)
+        time_factor = plan.time_factor(until_departure.days, until_departure.total_seconds() / 3600)
+        demand_factor = self._calculate_demand_factor(
+            departure_time, origin_code, destination_code,
+            flight_id=flight_id, seat_class=seat_class, now=now
+        )
         seasonal_factor = self._calculate_seasonal_factor(departure_time)
         weekend_factor = self._calculate_weekend_factor(departure_time)
         peak_hour_factor = self._calculate_peak_hour_factor(departure_time)
-        route_factor = self._calculate_route_category_factor(origin_code, destination_code)
-        airline_tier_factor = self._calculate_airline_tier_factor(airline_code)
-        class_multiplier = self._get_class_multiplier(seat_class)
+        if plan.factor_limits:
+            # Seat and time tables were clamped when the plan was compiled
+            demand_factor = plan.clamp_factor('demand_factor', demand_factor)
+            seasonal_factor = plan.clamp_factor('seasonal_factor', seasonal_factor)
+            weekend_factor = plan.clamp_factor('weekend_factor', weekend_factor)
+            peak_hour_factor = plan.clamp_factor('peak_hour_factor', peak_hour_factor)
+        route_factor = plan.route_factors.get(f"{origin_code}-{destination_code}", 0.0)
+        airline_tier_factor = plan.airline_factors.get(airline_code, 0.0)
+        class_multiplier = plan.class_multipliers.get(seat_class, 1.0)
         
         # Combine all factors
         total_multiplier = (
@@ -73,66 +183,315 @@ class DynamicPricingEngine:
         final_price = base_fare * total_multiplier * class_multiplier
         
         # Apply realistic bounds (prevent extreme pricing)
-        final_price = self._apply_price_bounds(final_price, base_fare)
+        final_price = plan.apply_fare_bounds(final_price, base_fare)
+        if not breakdown:
+            return {'final_price': _round_half_up(final_price, 2)}
         
         return {
-            'final_price': round(final_price, 2),
+            'final_price': _round_half_up(final_price, 2),
             'base_fare': base_fare,
-            'seat_factor': round(seat_factor, 3),
-            'time_factor': round(time_factor, 3),
-            'demand_factor': round(demand_factor, 3),
-            'seasonal_factor': round(seasonal_factor, 3),
-            'weekend_factor': round(weekend_factor, 3),
-            'peak_hour_factor': round(peak_hour_factor, 3),
-            'route_factor': round(route_factor, 3),
-            'airline_tier_factor': round(airline_tier_factor, 3),
+            'seat_factor': _round_half_up(seat_factor, 3),
+            'time_factor': _round_half_up(time_factor, 3),
+            'demand_factor': _round_half_up(demand_factor, 3),
+            'seasonal_factor': _round_half_up(seasonal_factor, 3),
+            'weekend_factor': _round_half_up(weekend_factor, 3),
+            'peak_hour_factor': _round_half_up(peak_hour_factor, 3),
+            'route_factor': _round_half_up(route_factor, 3),
+            'airline_tier_factor': _round_half_up(airline_tier_factor, 3),
             'class_multiplier': class_multiplier,
-            'total_multiplier': round(total_multiplier, 3)
+            'total_multiplier': _round_half_up(total_multiplier, 3)
         }
-    
-    def _calculate_seat_availability_factor(self, seats_available: int, total_seats: int) -> float:
 
-        if total_seats == 0:
-            return 0.0
-            
-        availability_percent = (seats_available / total_seats) * 100
-        
-        if availability_percent >= 80:
-            return -0.10  # Discount to attract customers
-        elif availability_percent >= 50:
-            return 0.0    # Base price
-        elif availability_percent >= 20:
-            return 0.20   # Moderate increase
-        elif availability_percent >= 10:
-            return 0.40   # High demand pricing
+    def calculate_prices_batch(
+        self,
+        base_fares: Sequence[float],
+        seats_available: Sequence[int],
+        total_seats: Sequence[int],
+        departure_times: Sequence[datetime],
+        origin_codes: Union[str, Sequence[str]],
+        destination_codes: Union[str, Sequence[str]],
+        airline_codes: Union[str, Sequence[str]],
+        seat_classes: Union[str, Sequence[str]] = 'economy',
+        flight_ids: Optional[Sequence[int]] = None,
+        now: Optional[Union[datetime, Sequence[datetime]]] = None,
+        plan: Optional[PricingPlan] = None,
+        breakdown: bool = True
+    ) -> Dict[str, np.ndarray]:
+
+        # Columnar version of calculate_price: one entry per inventory row,
+        # every factor computed for all rows in a single vectorized pass.
+        # Code arguments may be a single string shared by all rows; `now`
+        # may be one time for all rows or one per row (backtests).
+        plan = plan or self.plan
+        base_fare = np.asarray(base_fares, dtype=np.float64)
+        count = base_fare.shape[0]
+        available = np.asarray(seats_available, dtype=np.float64)
+        total = np.asarray(total_seats, dtype=np.float64)
+        departures = _to_datetime64(departure_times)
+        if now is None or isinstance(now, datetime):
+            now = now or datetime.now()
+            bucket = self.time_bucket(now)
+            if self.is_deterministic:
+                now = self.bucket_start(bucket)
+            now = np.datetime64(now, 'us')
         else:
-            return 0.60   # Scarcity pricing
-    
-    def _calculate_time_to_departure_factor(self, departure_time: datetime) -> float:
+            now = _to_datetime64(now)
+            bucket_us = self.demand_bucket_seconds * 1_000_000
+            bucket = now.astype(np.int64) // bucket_us
+            if self.is_deterministic:
+                now = (bucket * bucket_us).astype('datetime64[us]')
 
-        now = datetime.now()
-        days_until_departure = (departure_time - now).days
-        hours_until_departure = (departure_time - now).total_seconds() / 3600
-        
-        if days_until_departure >= 60:
-            return -0.15
-        elif days_until_departure >= 30:
-            return -0.05
-        elif days_until_departure >= 15:
-            return 0.0
-        elif days_until_departure >= 7:
-            return 0.15
-        elif days_until_departure >= 3:
-            return 0.30
-        elif days_until_departure >= 1:
-            return 0.50
-        elif hours_until_departure >= 1:
-            return 0.80
+        origins = _to_code_array(origin_codes, count)
+        destinations = _to_code_array(destination_codes, count)
+        airlines = _to_code_array(airline_codes, count)
+        classes = _to_code_array(seat_classes, count)
+
+        # Time until departure (timedelta.days floors, so floor-divide here too)
+        until_departure = (departures - now).astype(np.int64)
+        days_until = until_departure // 86_400_000_000
+        hours_until = until_departure / 3_600_000_000
+
+        seat_factor = plan.seat_factor_batch(available, total)
+        time_factor = plan.time_factor_batch(days_until, hours_until)
+        # Routes as (origin, destination) pair indices, so per-route lookups
+        # touch each distinct route once instead of building a string per row
+        route_names, route_index = _factorize_routes(origins, destinations)
+        if self.is_deterministic:
+            if flight_ids is None:
+                demand_keys = self._batch_route_demand_keys(route_names, route_index, departures)
+            else:
+                demand_keys = np.asarray(flight_ids, dtype=np.int64).astype(np.uint64)
+            class_keys = _lookup(classes, self.CLASS_KEYS, 0).astype(np.uint64)
+            demand_factor = self._batch_deterministic_demand_factor(
+                days_until, demand_keys, class_keys, bucket
+            )
         else:
-            return 1.00  # Extreme last minute
+            demand_factor = self._batch_demand_factor(days_until)
+        seasonal_factor, weekend_factor, peak_hour_factor = self._batch_calendar_factors(departures)
+        if plan.factor_limits:
+            demand_factor = plan.clamp_factor_batch('demand_factor', demand_factor)
+            seasonal_factor = plan.clamp_factor_batch('seasonal_factor', seasonal_factor)
+            weekend_factor = plan.clamp_factor_batch('weekend_factor', weekend_factor)
+            peak_hour_factor = plan.clamp_factor_batch('peak_hour_factor', peak_hour_factor)
+        route_factor = np.array(
+            [plan.route_factors.get(route, 0.0) for route in route_names], dtype=np.float64
+        )[route_index]
+        airline_tier_factor = _lookup(airlines, plan.airline_factors, 0.0)
+        class_multiplier = _lookup(classes, plan.class_multipliers, 1.0)
+
+        total_multiplier = (
+            1.0 +
+            seat_factor +
+            time_factor +
+            demand_factor +
+            seasonal_factor +
+            weekend_factor +
+            peak_hour_factor +
+            route_factor +
+            airline_tier_factor
+        )
+
+        min_multiple, max_multiple = plan.fare_bounds
+        final_price = np.clip(
+            base_fare * total_multiplier * class_multiplier,
+            base_fare * min_multiple,
+            base_fare * max_multiple
+        )
+        if not breakdown:
+            return {'final_price': _round_half_up_batch(final_price, 2)}
+
+        # Factors rounded like calculate_price, so every endpoint reports the
+        # same breakdown for the same quote
+        return {
+            'final_price': _round_half_up_batch(final_price, 2),
+            'base_fare': base_fare,
+            'seat_factor': _round_half_up_batch(seat_factor, 3),
+            'time_factor': _round_half_up_batch(time_factor, 3),
+            'demand_factor': _round_half_up_batch(demand_factor, 3),
+            'seasonal_factor': _round_half_up_batch(seasonal_factor, 3),
+            'weekend_factor': _round_half_up_batch(weekend_factor, 3),
+            'peak_hour_factor': _round_half_up_batch(peak_hour_factor, 3),
+            'route_factor': _round_half_up_batch(route_factor, 3),
+            'airline_tier_factor': _round_half_up_batch(airline_tier_factor, 3),
+            'class_multiplier': class_multiplier,
+            'total_multiplier': _round_half_up_batch(total_multiplier, 3)
+        }
+
+    def _batch_demand_factor(self, days_until: np.ndarray) -> np.ndarray:
+
+        count = days_until.shape[0]
+        base_random = self._rng.uniform(-0.05, 0.15, count)
+        demand_spike = np.where(days_until <= 7, self._rng.uniform(0.05, 0.20, count), 0.0)
+        return base_random + demand_spike
+
+    def _batch_deterministic_demand_factor(
+        self,
+        days_until: np.ndarray,
+        demand_keys: np.ndarray,
+        class_keys: np.ndarray,
+        bucket: Union[int, np.ndarray]
+    ) -> np.ndarray:
+
+        # Same splitmix64 chain as _demand_hash, with wrapping uint64 arithmetic
+        with np.errstate(over='ignore'):
+            h = np.full(demand_keys.shape[0], self.demand_seed, dtype=np.uint64)
+            h = _mix64_array(h ^ demand_keys)
+            h = _mix64_array(h ^ class_keys)
+            h = _mix64_array(h ^ np.asarray(bucket, dtype=np.int64).astype(np.uint64))
+            second = _mix64_array(h)
+        base_random = -0.05 + 0.20 * _unit_interval(h)
+        demand_spike = np.where(days_until <= 7, 0.05 + 0.15 * _unit_interval(second), 0.0)
+        return base_random + demand_spike
+
+    def _batch_route_demand_keys(
+        self,
+        route_names: Sequence[str],
+        route_index: np.ndarray,
+        departures: np.ndarray
+    ) -> np.ndarray:
+
+        route_keys = np.array([_route_key(route) for route in route_names], dtype=np.int64)
+        departure_minutes = departures.astype('datetime64[m]').astype(np.int64)
+        return (route_keys[route_index] ^ departure_minutes).astype(np.uint64)
+
+    def _batch_calendar_factors(self, departures: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+
+        # Departures inside the calendar horizon are plain table reads; the
+        # rest (history replays, far-future schedules) are computed directly.
+        origin, table, _ = self._calendar_table()
+        departure_days = departures.astype('datetime64[D]')
+        day_index = departure_days.astype(np.int64) - origin
+        hour = (departures - departure_days).astype('timedelta64[h]').astype(np.int64)
+        in_horizon = (day_index >= 0) & (day_index < self.CALENDAR_HORIZON_DAYS)
+
+        if in_horizon.all():
+            factors = table[day_index, hour]
+        else:
+            factors = np.empty((departures.shape[0], 3))
+            factors[in_horizon] = table[day_index[in_horizon], hour[in_horizon]]
+            outside = ~in_horizon
+            factors[outside] = np.column_stack(
+                self._compute_calendar_factors(departures[outside])
+            )
+
+        return factors[:, 0], factors[:, 1], factors[:, 2]
+
+    def _compute_calendar_factors(self, departures: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+
+        departure_days = departures.astype('datetime64[D]')
+        departure_months = departures.astype('datetime64[M]')
+        month = departure_months.astype(np.int64) % 12 + 1
+        day = (departure_days - departure_months.astype('datetime64[D]')).astype(np.int64) + 1
+        weekday = (departure_days.astype(np.int64) + 3) % 7  # 1970-01-01 was a Thursday
+        hour = (departures - departure_days).astype('timedelta64[h]').astype(np.int64)
+
+        seasonal_factor = self._batch_seasonal_factor(month, day)
+        weekend_factor = np.select(
+            [
+                weekday == 6,
+                weekday == 5,
+                (weekday == 4) & (hour >= 17),
+                (weekday == 0) & (hour <= 10),
+            ],
+            [0.20, 0.15, 0.18, 0.12],
+            0.0
+        )
+        peak_hour_factor = np.select(
+            [
+                (hour >= 5) & (hour < 8),
+                (hour >= 8) & (hour < 10),
+                (hour >= 18) & (hour < 22),
+                (hour >= 11) & (hour < 15),
+                (hour >= 22) | (hour < 5),
+            ],
+            [0.12, 0.08, 0.15, -0.05, -0.10],
+            0.0
+        )
+        return seasonal_factor, weekend_factor, peak_hour_factor
+
+    def update_calendar_config(
+        self,
+        peak_months: Optional[Sequence[int]] = None,
+        festival_periods: Optional[Sequence[Tuple[int, int, int, int]]] = None
+    ) -> None:
+
+        # Calendar factors are served from a precomputed table, so changes to
+        # the seasonal configuration must go through here to rebuild it.
+        if peak_months is not None:
+            self.PEAK_MONTHS = list(peak_months)
+        if festival_periods is not None:
+            self.FESTIVAL_PERIODS = [tuple(period) for period in festival_periods]
+        self._calendar = self._build_calendar_table()
+
+    def _calendar_table(self) -> Tuple[int, np.ndarray, float]:
+
+        calendar = self._calendar
+        if time.time() >= calendar[2]:
+            # Roll the horizon forward once the local date changes
+            calendar = self._calendar = self._build_calendar_table()
+        return calendar
+
+    def _build_calendar_table(self) -> Tuple[int, np.ndarray, float]:
+
+        # (day offset from today, hour) -> (seasonal, weekend, peak hour)
+        today = date.today()
+        origin = np.datetime64(today, 'D')
+        slots = (
+            origin.astype('datetime64[us]') +
+            np.arange(self.CALENDAR_HORIZON_DAYS * 24) * np.timedelta64(1, 'h')
+        )
+        table = np.column_stack(self._compute_calendar_factors(slots)).reshape(
+            self.CALENDAR_HORIZON_DAYS, 24, 3
+        )
+        expires_at = datetime.combine(today + timedelta(days=1), datetime.min.time()).timestamp()
+        return int(origin.astype(np.int64)), table, expires_at
+
+    def _calendar_lookup(self, departure_time: datetime) -> Optional[np.ndarray]:
+
+        origin, table, _ = self._calendar_table()
+        day_index = departure_time.toordinal() - _EPOCH_ORDINAL - origin
+        if 0 <= day_index < self.CALENDAR_HORIZON_DAYS:
+            return table[day_index, departure_time.hour]
+        return None
+
+    def _batch_seasonal_factor(self, month: np.ndarray, day: np.ndarray) -> np.ndarray:
+
+        factor = np.where(np.isin(month, self.PEAK_MONTHS), 0.15, 0.0)
+
+        for start_month, start_day, end_month, end_day in self.FESTIVAL_PERIODS:
+            if start_month == end_month:
+                in_period = (month == start_month) & (day >= start_day) & (day <= end_day)
+            else:
+                in_period = (
+                    ((month == start_month) & (day >= start_day)) |
+                    ((month == end_month) & (day <= end_day))
+                )
+                if start_month < end_month:
+                    in_period |= (month > start_month) & (month < end_month)
+                else:
+                    in_period |= (month > start_month) | (month < end_month)
+            factor = np.where(in_period, 0.25, factor)
+
+        return factor
+
+    def _calculate_seat_availability_factor(self, seats_available: int, total_seats: int) -> float:
+
+        return self.plan.seat_factor(seats_available, total_seats)
+    
+    def _calculate_time_to_departure_factor(self, departure_time: datetime, now: Optional[datetime] = None) -> float:
+
+        until_departure = departure_time - (now or datetime.now())
+        return self.plan.time_factor(until_departure.days, until_departure.total_seconds() / 3600)
     
     def _calculate_seasonal_factor(self, departure_time: datetime) -> float:
 
+        factors = self._calendar_lookup(departure_time)
+        if factors is not None:
+            return float(factors[0])
+        return self._compute_seasonal_factor(departure_time)
+
+    def _compute_seasonal_factor(self, departure_time: datetime) -> float:
+
         month = departure_time.month
         day = departure_time.day
         
@@ -151,6 +510,13 @@ class DynamicPricingEngine:
     
     def _calculate_weekend_factor(self, departure_time: datetime) -> float:
 
+        factors = self._calendar_lookup(departure_time)
+        if factors is not None:
+            return float(factors[1])
+        return self._compute_weekend_factor(departure_time)
+
+    def _compute_weekend_factor(self, departure_time: datetime) -> float:
+
         day_of_week = departure_time.weekday()  # 0=Monday, 6=Sunday
         hour = departure_time.hour
         
@@ -174,6 +540,13 @@ class DynamicPricingEngine:
     
     def _calculate_peak_hour_factor(self, departure_time: datetime) -> float:
 
+        factors = self._calendar_lookup(departure_time)
+        if factors is not None:
+            return float(factors[2])
+        return self._compute_peak_hour_factor(departure_time)
+
+    def _compute_peak_hour_factor(self, departure_time: datetime) -> float:
+
         hour = departure_time.hour
         
         # Early morning flights (5 AM - 8 AM)
@@ -200,62 +573,61 @@ class DynamicPricingEngine:
     
     def _calculate_route_category_factor(self, origin: str, destination: str) -> float:
 
-        route = f"{origin}-{destination}"
-        
-        if route in self.METRO_ROUTES:
-            return 0.10  # High demand metro routes
-        elif route in self.TOURIST_ROUTES:
-            return 0.08  # Popular tourist destinations
-        elif route in self.BUSINESS_ROUTES:
-            return 0.06  # Business travel routes
-        
-        return 0.0
+        return self.plan.route_factors.get(f"{origin}-{destination}", 0.0)
     
     def _calculate_airline_tier_factor(self, airline_code: str) -> float:
 
-        tier = self.AIRLINE_TIERS.get(airline_code, 'standard')
-        
-        if tier == 'premium':
-            return 0.10
-        elif tier == 'budget':
-            return -0.05
-        
-        return 0.0  # Standard
+        return self.plan.airline_factors.get(airline_code, 0.0)
     
     def _calculate_demand_factor(
         self,
         departure_time: datetime,
         origin: str,
-        destination: str
+        destination: str,
+        flight_id: Optional[int] = None,
+        seat_class: str = 'economy',
+        now: Optional[datetime] = None
     ) -> float:
 
-        # Base random demand between -5% to +15%
-        base_random = random.uniform(-0.05, 0.15)
+        now = now or datetime.now()
+        if self.is_deterministic:
+            if flight_id is None:
+                # No FlightID: key on route and departure minute instead
+                departure_minute = int((departure_time - _EPOCH).total_seconds() // 60)
+                demand_key = _route_key(f"{origin}-{destination}") ^ departure_minute
+            else:
+                demand_key = flight_id
+            first_draw, second_draw = self._demand_hash(demand_key, seat_class, self.time_bucket(now))
+        else:
+            first_draw, second_draw = random.random(), random.random()
+
+        # Base demand between -5% to +15%
+        base_random = -0.05 + 0.20 * first_draw
         
         # Time-sensitive demand spike (closer to departure)
-        days_until = (departure_time - datetime.now()).days
+        days_until = (departure_time - now).days
         if days_until <= 7:
-            demand_spike = random.uniform(0.05, 0.20)
+            demand_spike = 0.05 + 0.15 * second_draw
         else:
             demand_spike = 0.0
         
         return base_random + demand_spike
+
+    def _demand_hash(self, demand_key: int, seat_class: str, bucket: int) -> Tuple[float, float]:
+
+        # Two uniform draws in [0, 1) keyed by the global seed
+        h = _mix64(self.demand_seed ^ (demand_key & _MASK64))
+        h = _mix64(h ^ self.CLASS_KEYS.get(seat_class, 0))
+        h = _mix64(h ^ (bucket & _MASK64))
+        return (h >> 11) / 9007199254740992.0, (_mix64(h) >> 11) / 9007199254740992.0
     
     def _get_class_multiplier(self, seat_class: str) -> float:
 
-        multipliers = {
-            'economy': 1.0,
-            'business': 2.8,
-            'first': 4.5
-        }
-        return multipliers.get(seat_class, 1.0)
+        return self.plan.class_multipliers.get(seat_class, 1.0)
     
     def _apply_price_bounds(self, calculated_price: float, base_fare: float) -> float:
 
-        min_price = base_fare * 0.70
-        max_price = base_fare * 2.50
-        
-        return max(min_price, min(calculated_price, max_price))
+        return self.plan.apply_fare_bounds(calculated_price, base_fare)
     
     def _is_in_date_range(
         self,
@@ -285,9 +657,133 @@ class DynamicPricingEngine:
             )
 
 
+def _round_half_up(value: float, digits: int) -> float:
+
+    # Same float operations as _round_half_up_batch, so a single quote and
+    # its batch row round identically, half-paisa ties included
+    scale = 10.0 ** digits
+    return math.floor(value * scale + 0.5) / scale
+
+
+def _round_half_up_batch(values: np.ndarray, digits: int) -> np.ndarray:
+    scale = 10.0 ** digits
+    return np.floor(values * scale + 0.5) / scale
+
+
+def _mix64(value: int) -> int:
+
+    # splitmix64 finalizer
+    value = (value + 0x9E3779B97F4A7C15) & _MASK64
+    value = ((value ^ (value >> 30)) * 0xBF58476D1CE4E5B9) & _MASK64
+    value = ((value ^ (value >> 27)) * 0x94D049BB133111EB) & _MASK64
+    return value ^ (value >> 31)
+
+
+def _mix64_array(values: np.ndarray) -> np.ndarray:
+
+    values = values + np.uint64(0x9E3779B97F4A7C15)
+    values = (values ^ (values >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+    values = (values ^ (values >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+    return values ^ (values >> np.uint64(31))
+
+
+def _unit_interval(values: np.ndarray) -> np.ndarray:
+    return (values >> np.uint64(11)).astype(np.float64) / 9007199254740992.0
+
+
+def _route_key(route: str) -> int:
+    # crc32 rather than hash(): str hashes are salted per process
+    return zlib.crc32(route.encode())
+
+
+def _to_datetime64(values: Sequence[datetime]) -> np.ndarray:
+
+    if isinstance(values, np.ndarray) and np.issubdtype(values.dtype, np.datetime64):
+        return values.astype('datetime64[us]')
+    return np.array(list(values), dtype='datetime64[us]')
+
+
+def _to_code_array(values: Union[str, Sequence[str]], count: int) -> np.ndarray:
+
+    if isinstance(values, str):
+        return np.full(count, values)
+    return np.asarray(values, dtype=str)
+
+
+def _factorize_routes(origins: np.ndarray, destinations: np.ndarray) -> Tuple[List[str], np.ndarray]:
+
+    # Distinct "ORG-DST" names and, per row, the index of its route. Codes
+    # are factorized separately and combined as integers; only the distinct
+    # pairs are ever turned into strings.
+    origin_codes, origin_index = np.unique(origins, return_inverse=True)
+    destination_codes, destination_index = np.unique(destinations, return_inverse=True)
+    pair_index = origin_index.reshape(-1) * len(destination_codes) + destination_index.reshape(-1)
+    pairs, route_index = np.unique(pair_index, return_inverse=True)
+    route_names = [
+        f"{origin_codes[pair // len(destination_codes)]}-{destination_codes[pair % len(destination_codes)]}"
+        for pair in pairs.tolist()
+    ]
+    return route_names, route_index.reshape(-1)
+
+
+def _lookup(codes: np.ndarray, table: Dict[str, float], default: float) -> np.ndarray:
+
+    # Resolve each distinct code once, then scatter back to the rows
+    uniques, inverse = np.unique(codes, return_inverse=True)
+    values = np.array([table.get(code, default) for code in uniques], dtype=np.float64)
+    return values[inverse.reshape(-1)]
+
+
 # Global instance
 pricing_engine = DynamicPricingEngine()
 
+# Quotes keyed by (FlightID, class, seats available, time bucket). Seat
+# changes produce a new key; base fare changes and deletes are handled by
+# dropping every entry tagged with the flight.
+quote_cache = TTLCache(
+    maxsize=int(os.getenv("PRICE_CACHE_SIZE", "50000")),
+    ttl=float(os.getenv("PRICE_CACHE_TTL", "60"))
+)
+
+
+@on_inventory_change
+def invalidate_flight_quotes(flight_id: int) -> None:
+    quote_cache.invalidate_tag(flight_id)
+
+
+def reload_pricing_rules(db) -> PricingPlan:
+
+    # Recompile the active Pricing_rules and swap the plan if it changed
+    plan = load_pricing_plan(db, pricing_engine.default_plan)
+    if plan.version != pricing_engine.plan.version:
+        pricing_engine.set_plan(plan)
+        quote_cache.clear()
+        logger.info(f"Pricing plan switched to {plan.version}")
+    return pricing_engine.plan
+
+
+def _reload_once() -> PricingPlan:
+
+    from app.database_connection import SessionLocal
+
+    db = SessionLocal()
+    try:
+        return reload_pricing_rules(db)
+    finally:
+        db.close()
+
+
+async def pricing_rules_reload_loop(interval: int = 60):
+
+    # One small query per interval keeps the plan in sync with the table;
+    # it runs in a worker thread so the event loop never waits on it
+    while True:
+        try:
+            await asyncio.to_thread(_reload_once)
+        except Exception as e:
+            logger.error(f"Pricing rule reload failed: {e}")
+        await asyncio.sleep(interval)
+
 
 def get_dynamic_price(
     base_fare: float,
@@ -297,10 +793,27 @@ def get_dynamic_price(
     origin_code: str,
     destination_code: str,
     airline_code: str,
-    seat_class: str = 'economy'
+    seat_class: str = 'economy',
+    flight_id: Optional[int] = None,
+    breakdown: bool = True
 ) -> Dict[str, float]:
-    
-    return pricing_engine.calculate_price(
+
+    # Quotes without a FlightID cannot be invalidated, so they bypass the cache.
+    # Price-only quotes are cached under their own key but can also be served
+    # from a full breakdown already in the cache.
+    if flight_id is not None:
+        seat_class = getattr(seat_class, 'value', seat_class)
+        full_key = (flight_id, seat_class, seats_available, pricing_engine.time_bucket())
+        cached = quote_cache.get(full_key)
+        if cached is not None:
+            return dict(cached) if breakdown else {'final_price': cached['final_price']}
+        cache_key = full_key if breakdown else full_key + ('final',)
+        if not breakdown:
+            cached = quote_cache.get(cache_key)
+            if cached is not None:
+                return dict(cached)
+
+    price_data = pricing_engine.calculate_price(
         base_fare=base_fare,
         seats_available=seats_available,
         total_seats=total_seats,
@@ -308,5 +821,92 @@ def get_dynamic_price(
         origin_code=origin_code,
         destination_code=destination_code,
         airline_code=airline_code,
-        seat_class=seat_class
+        seat_class=seat_class,
+        flight_id=flight_id,
+        breakdown=breakdown
     )
+
+    if flight_id is not None:
+        quote_cache.set(cache_key, price_data, tags=(flight_id,))
+        price_data = dict(price_data)
+    return price_data
+
+
+def get_dynamic_prices_batch(
+    base_fares: Sequence[float],
+    seats_available: Sequence[int],
+    total_seats: Sequence[int],
+    departure_times: Sequence[datetime],
+    origin_codes: Union[str, Sequence[str]],
+    destination_codes: Union[str, Sequence[str]],
+    airline_codes: Union[str, Sequence[str]],
+    seat_classes: Union[str, Sequence[str]] = 'economy',
+    flight_ids: Optional[Sequence[int]] = None,
+    breakdown: bool = True
+) -> Dict[str, np.ndarray]:
+
+    # Rows with a FlightID share quote_cache with get_dynamic_price: cached
+    # quotes are reused, the misses are priced in one batch and stored, so
+    # calendar, round-trip, connection and export prices are the ones search
+    # and booking quote for the same inventory.
+    if flight_ids is None:
+        return pricing_engine.calculate_prices_batch(
+            base_fares=base_fares,
+            seats_available=seats_available,
+            total_seats=total_seats,
+            departure_times=departure_times,
+            origin_codes=origin_codes,
+            destination_codes=destination_codes,
+            airline_codes=airline_codes,
+            seat_classes=seat_classes,
+            breakdown=breakdown
+        )
+
+    count = len(flight_ids)
+    if isinstance(seat_classes, str):
+        classes = [seat_classes] * count
+    else:
+        classes = [getattr(seat_class, 'value', seat_class) for seat_class in seat_classes]
+    bucket = pricing_engine.time_bucket()
+
+    # Same keys as get_dynamic_price
+    quotes: List[Optional[Dict[str, float]]] = [None] * count
+    keys = []
+    misses = []
+    for i, (flight_id, seat_class, seats) in enumerate(zip(flight_ids, classes, seats_available)):
+        key = (flight_id, seat_class, seats, bucket)
+        cached = quote_cache.get(key)
+        if cached is None and not breakdown:
+            key += ('final',)
+            cached = quote_cache.get(key)
+        keys.append(key)
+        if cached is None:
+            misses.append(i)
+        else:
+            quotes[i] = cached if breakdown else {'final_price': cached['final_price']}
+
+    if misses:
+        def pick(values):
+            return values if isinstance(values, str) else [values[i] for i in misses]
+
+        priced = pricing_engine.calculate_prices_batch(
+            base_fares=pick(base_fares),
+            seats_available=pick(seats_available),
+            total_seats=pick(total_seats),
+            departure_times=pick(departure_times),
+            origin_codes=pick(origin_codes),
+            destination_codes=pick(destination_codes),
+            airline_codes=pick(airline_codes),
+            seat_classes=pick(classes),
+            flight_ids=pick(flight_ids),
+            breakdown=breakdown
+        )
+        columns = {name: values.tolist() for name, values in priced.items()}
+        for position, i in enumerate(misses):
+            quote = {name: values[position] for name, values in columns.items()}
+            quote_cache.set(keys[i], quote, tags=(flight_ids[i],))
+            quotes[i] = quote
+        if len(misses) == count:
+            return priced
+
+    return {name: np.array([quote[name] for quote in quotes]) for name in quotes[0]}
@@ -0,0 +1,229 @@
+# Immutable pricing plans compiled from the Pricing_rules table
+#
+# A plan holds every tunable the engine reads per quote: breakpoint arrays
+# for seat availability and time to departure, route/airline/class lookup
+# dicts, fare bounds and the multiplier bands from active pricing rules.
+# The engine swaps whole plans by attribute assignment, so a quote always
+# sees one consistent plan and no request ever reads the rules table.
+#
+# Rules bound each factor they govern on its own: a factor is kept inside
+# its rule type's band (the union of that type's rule ranges, as multiplier
+# - 1). The seat and time breakpoint tables are clamped when the plan is
+# compiled; the calendar and demand factors are clamped per quote. Price
+# breakdowns always report the factor after clamping, i.e. what was applied.
+
+import bisect
+import hashlib
+import logging
+from dataclasses import dataclass, field, replace
+from types import MappingProxyType
+from typing import Dict, Iterable, Mapping, Optional, Tuple
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Availability percent breakpoints (ascending) and the factor for each band:
+# <10%, 10-20%, 20-50%, 50-80%, >=80%
+DEFAULT_SEAT_BREAKPOINTS = (10.0, 20.0, 50.0, 80.0)
+DEFAULT_SEAT_FACTORS = (0.60, 0.40, 0.20, 0.0, -0.10)
+
+# Whole days to departure breakpoints (ascending) and the factor for each
+# band: <1, 1-3, 3-7, 7-15, 15-30, 30-60, >=60 days. Inside the last day the
+# factor is LAST_DAY_FACTOR, or FINAL_HOUR_FACTOR in the final hour.
+DEFAULT_TIME_BREAKPOINTS = (1, 3, 7, 15, 30, 60)
+DEFAULT_TIME_FACTORS = (None, 0.50, 0.30, 0.15, 0.0, -0.05, -0.15)
+DEFAULT_LAST_DAY_FACTOR = 0.80
+DEFAULT_FINAL_HOUR_FACTOR = 1.00
+
+# Final price stays within these multiples of the base fare
+DEFAULT_FARE_BOUNDS = (0.70, 2.50)
+
+# Which factors each Pricing_rules.Rule_type governs
+RULE_TYPE_FACTORS = {
+    'time_based': ('time_factor', 'weekend_factor', 'peak_hour_factor'),
+    'demand_based': ('seat_factor', 'demand_factor'),
+    'seasonal': ('seasonal_factor',),
+}
+
+
+def _readonly(values) -> np.ndarray:
+    array = np.array(values, dtype=np.float64)
+    array.flags.writeable = False
+    return array
+
+
+@dataclass(frozen=True)
+class PricingPlan:
+
+    version: str
+    seat_breakpoints: Tuple[float, ...] = DEFAULT_SEAT_BREAKPOINTS
+    seat_factors: Tuple[float, ...] = DEFAULT_SEAT_FACTORS
+    time_breakpoints: Tuple[int, ...] = DEFAULT_TIME_BREAKPOINTS
+    time_factors: Tuple[Optional[float], ...] = DEFAULT_TIME_FACTORS
+    last_day_factor: float = DEFAULT_LAST_DAY_FACTOR
+    final_hour_factor: float = DEFAULT_FINAL_HOUR_FACTOR
+    route_factors: Mapping[str, float] = field(default_factory=dict)
+    airline_factors: Mapping[str, float] = field(default_factory=dict)
+    class_multipliers: Mapping[str, float] = field(default_factory=dict)
+    fare_bounds: Tuple[float, float] = DEFAULT_FARE_BOUNDS
+    # Rule_type -> (min, max) band for each factor of that type
+    factor_bands: Mapping[str, Tuple[float, float]] = field(default_factory=dict)
+
+    def __post_init__(self):
+        if len(self.seat_factors) != len(self.seat_breakpoints) + 1:
+            raise ValueError("seat_factors needs one entry more than seat_breakpoints")
+        if len(self.time_factors) != len(self.time_breakpoints) + 1:
+            raise ValueError("time_factors needs one entry more than time_breakpoints")
+
+        # Freeze the lookup dicts and precompute the arrays used by the batch path
+        for name in ('route_factors', 'airline_factors', 'class_multipliers', 'factor_bands'):
+            object.__setattr__(self, name, MappingProxyType(dict(getattr(self, name))))
+        object.__setattr__(self, 'factor_limits', MappingProxyType({
+            name: band
+            for rule_type, band in self.factor_bands.items()
+            for name in RULE_TYPE_FACTORS[rule_type]
+        }))
+        object.__setattr__(self, 'seat_breakpoint_array', _readonly(self.seat_breakpoints))
+        object.__setattr__(self, 'seat_factor_array', _readonly(self.seat_factors))
+        object.__setattr__(self, 'time_breakpoint_array', _readonly(self.time_breakpoints))
+        object.__setattr__(
+            self, 'time_factor_array',
+            _readonly([0.0 if factor is None else factor for factor in self.time_factors])
+        )
+
+    def __reduce__(self):
+        # MappingProxyType does not pickle; rebuild from plain dicts (process pools)
+        return (_rebuild_plan, (self._as_kwargs(),))
+
+    def _as_kwargs(self) -> Dict:
+        return {
+            'version': self.version,
+            'seat_breakpoints': self.seat_breakpoints,
+            'seat_factors': self.seat_factors,
+            'time_breakpoints': self.time_breakpoints,
+            'time_factors': self.time_factors,
+            'last_day_factor': self.last_day_factor,
+            'final_hour_factor': self.final_hour_factor,
+            'route_factors': dict(self.route_factors),
+            'airline_factors': dict(self.airline_factors),
+            'class_multipliers': dict(self.class_multipliers),
+            'fare_bounds': self.fare_bounds,
+            'factor_bands': dict(self.factor_bands),
+        }
+
+    # Scalar evaluation
+
+    def seat_factor(self, seats_available: int, total_seats: int) -> float:
+
+        if total_seats == 0:
+            return 0.0
+        availability_percent = (seats_available / total_seats) * 100
+        return self.seat_factors[bisect.bisect_right(self.seat_breakpoints, availability_percent)]
+
+    def time_factor(self, days_until: int, hours_until: float) -> float:
+
+        band = bisect.bisect_right(self.time_breakpoints, days_until)
+        if band == 0:
+            return self.last_day_factor if hours_until >= 1 else self.final_hour_factor
+        return self.time_factors[band]
+
+    def clamp_factor(self, name: str, value: float) -> float:
+
+        band = self.factor_limits.get(name)
+        if band is None:
+            return value
+        return min(max(value, band[0]), band[1])
+
+    def apply_fare_bounds(self, price: float, base_fare: float) -> float:
+
+        low, high = self.fare_bounds
+        return max(base_fare * low, min(price, base_fare * high))
+
+    # Batch evaluation
+
+    def seat_factor_batch(self, available: np.ndarray, total: np.ndarray) -> np.ndarray:
+
+        availability_percent = np.divide(
+            available, total, out=np.zeros_like(available), where=total > 0
+        ) * 100
+        band = np.searchsorted(self.seat_breakpoint_array, availability_percent, side='right')
+        return np.where(total > 0, self.seat_factor_array[band], 0.0)
+
+    def time_factor_batch(self, days_until: np.ndarray, hours_until: np.ndarray) -> np.ndarray:
+
+        band = np.searchsorted(self.time_breakpoint_array, days_until, side='right')
+        last_day = np.where(hours_until >= 1, self.last_day_factor, self.final_hour_factor)
+        return np.where(band == 0, last_day, self.time_factor_array[band])
+
+    def clamp_factor_batch(self, name: str, values: np.ndarray) -> np.ndarray:
+
+        band = self.factor_limits.get(name)
+        if band is None:
+            return values
+        return np.clip(values, band[0], band[1])
+
+
+def _rebuild_plan(kwargs: Dict) -> PricingPlan:
+    return PricingPlan(**kwargs)
+
+
+def _clamp(value: Optional[float], band: Optional[Tuple[float, float]]) -> Optional[float]:
+
+    if value is None or band is None:
+        return value
+    return min(max(value, band[0]), band[1])
+
+
+def compile_pricing_plan(rules: Iterable, base_plan: PricingPlan) -> PricingPlan:
+
+    # Each active rule contributes its [Multiplier_min, Multiplier_max]
+    # range; the band for a rule type is the union of its rules' ranges,
+    # expressed as an additive factor (multiplier - 1). The breakpoint
+    # tables of the base plan are then clamped into their bands.
+    bands = {}
+    signature = []
+    for rule in rules:
+        rule_type = rule.Rule_type
+        low, high = float(rule.Multiplier_min), float(rule.Multiplier_max)
+        if rule_type not in RULE_TYPE_FACTORS:
+            logger.warning(f"Ignoring pricing rule {rule.RuleID}: unknown type '{rule_type}'")
+            continue
+        if low > high:
+            logger.warning(f"Ignoring pricing rule {rule.RuleID}: Multiplier_min > Multiplier_max")
+            continue
+
+        current_low, current_high = bands.get(rule_type, (float('inf'), float('-inf')))
+        bands[rule_type] = (
+            min(current_low, round(low - 1.0, 4)),
+            max(current_high, round(high - 1.0, 4))
+        )
+        signature.append((rule.RuleID, rule_type, low, high))
+
+    if not signature:
+        return base_plan
+
+    digest = hashlib.sha1(repr(sorted(signature)).encode()).hexdigest()[:12]
+    return clamp_to_bands(replace(base_plan, version=f"rules-{digest}", factor_bands=bands))
+
+
+def clamp_to_bands(plan: PricingPlan) -> PricingPlan:
+
+    # Seat and time tables pulled into the plan's rule bands; compiled
+    # plans and backtest candidates both go through here
+    seat_band = plan.factor_bands.get('demand_based')
+    time_band = plan.factor_bands.get('time_based')
+    return replace(
+        plan,
+        seat_factors=tuple(_clamp(factor, seat_band) for factor in plan.seat_factors),
+        time_factors=tuple(_clamp(factor, time_band) for factor in plan.time_factors),
+        last_day_factor=_clamp(plan.last_day_factor, time_band),
+        final_hour_factor=_clamp(plan.final_hour_factor, time_band)
+    )
+
+
+def load_pricing_plan(db, base_plan: PricingPlan) -> PricingPlan:
+
+    from app.models import PricingRule
+
+    rules = db.query(PricingRule).filter(PricingRule.Is_active == True).all()  # noqa: E712
+    return compile_pricing_plan(rules, base_plan)
@@ -0,0 +1,120 @@
+# Airline and airport reference sets, served pre-serialized
+#
+# Both tables are small and rarely change, so each set is loaded once,
+# serialized to JSON and hashed. The hash is the ETag: a client that sends
+# it back in If-None-Match gets an empty 304 instead of the list. Rows
+# edited in the database are picked up when the TTL runs out, or at once by
+# POST /admin/reference/reload; when a reload finds a new ETag the search
+# index takes the new airport codes, city and airline names.
+
+import hashlib
+import json
+import os
+from typing import Callable, Dict, NamedTuple, Optional
+from fastapi import Response, status
+from sqlalchemy.orm import Session
+from app.models import Airline, Airport
+from app.schemas import AirlineResponse, AirportResponse
+from app.utils.cache import TTLCache
+
+# How long clients may reuse a list before revalidating
+REFERENCE_MAX_AGE = int(os.getenv("REFERENCE_DATA_MAX_AGE", "60"))
+
+
+class ReferenceSet(NamedTuple):
+    body: bytes
+    etag: str
+
+
+def _load_airlines(db: Session) -> list:
+    return [
+        AirlineResponse.model_validate(airline).model_dump(mode='json')
+        for airline in db.query(Airline).order_by(Airline.AirlineID)
+    ]
+
+
+def _load_airports(db: Session) -> list:
+    return [
+        AirportResponse.model_validate(airport).model_dump(mode='json')
+        for airport in db.query(Airport).order_by(Airport.AirportID)
+    ]
+
+
+REFERENCE_LOADERS: Dict[str, Callable[[Session], list]] = {
+    'airlines': _load_airlines,
+    'airports': _load_airports,
+}
+
+reference_cache = TTLCache(
+    maxsize=len(REFERENCE_LOADERS),
+    ttl=float(os.getenv("REFERENCE_DATA_CACHE_TTL", "3600"))
+)
+
+
+# ETag of the last set of each name handed to the search index
+_applied_etags: Dict[str, str] = {}
+
+
+def get_reference_set(db: Session, name: str) -> ReferenceSet:
+
+    cached = reference_cache.get(name)
+    if cached is not None:
+        return cached
+
+    rows = REFERENCE_LOADERS[name](db)
+    body = json.dumps(rows, separators=(',', ':')).encode()
+    reference_set = ReferenceSet(body, '"' + hashlib.sha256(body).hexdigest()[:32] + '"')
+    reference_cache.set(name, reference_set)
+    if _applied_etags.get(name) != reference_set.etag:
+        _apply_to_search_index(name, rows)
+        _applied_etags[name] = reference_set.etag
+    return reference_set
+
+
+def reload_reference_data(db: Session) -> Dict[str, str]:
+
+    # Drop the cached sets and load them again; returns each set's ETag
+    reference_cache.clear()
+    return {name: get_reference_set(db, name).etag for name in REFERENCE_LOADERS}
+
+
+def _apply_to_search_index(name: str, rows: list) -> None:
+
+    from app.services.search_index import search_index
+
+    if name == 'airlines':
+        search_index.apply_reference(
+            airline_names={row['Airline_Code']: row['Airline_Name'] for row in rows}
+        )
+    else:
+        search_index.apply_reference(
+            airport_cities={row['Airport_Code']: row['City'] for row in rows}
+        )
+
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+
+    if not if_none_match:
+        return False
+    for candidate in if_none_match.split(','):
+        candidate = candidate.strip()
+        if candidate == '*':
+            return True
+        # Weak comparison, as If-None-Match requires
+        if candidate.startswith('W/'):
+            candidate = candidate[2:]
+        if candidate == etag:
+            return True
+    return False
+
+
+def reference_response(db: Session, name: str, if_none_match: Optional[str]) -> Response:
+
+    reference_set = get_reference_set(db, name)
+    headers = {
+        'ETag': reference_set.etag,
+        'Cache-Control': f'public, max-age={REFERENCE_MAX_AGE}'
+    }
+    if _etag_matches(if_none_match, reference_set.etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return Response(content=reference_set.body, media_type='application/json', headers=headers)
@@ -0,0 +1,277 @@
+# Event-driven repricing
+#
+# Between bookings, an inventory's price only moves when the clock crosses
+# one of the time-based boundaries of the pricing plan: a days-to-departure
+# band, the 7-day demand spike, the final hour, or (in deterministic demand
+# mode) the start of the next demand bucket. The scheduler keeps the next
+# such instant per inventory in a min-heap, so each simulator tick reprices
+# only the inventories that are due plus those touched by a booking or
+# cancellation since the last tick.
+
+import heapq
+import logging
+import os
+import threading
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+import numpy as np
+from sqlalchemy import and_, insert, or_
+from sqlalchemy.orm import Session, joinedload
+from app.models import Flight, PriceHistory, SeatInventory
+from app.services.inventory_events import on_inventory_change
+from app.services.pricing_engine import pricing_engine, get_dynamic_prices_batch
+
+logger = logging.getLogger(__name__)
+
+_EPOCH = datetime(1970, 1, 1)
+
+# Days before departure at which the demand spike switches on (days_until <= 7)
+DEMAND_SPIKE_DAYS = 8
+
+# IN lists are split into chunks of this size
+QUERY_CHUNK_SIZE = 1000
+
+
+def _to_seconds(moment: datetime) -> float:
+    return (moment - _EPOCH).total_seconds()
+
+
+def _from_seconds(seconds: float) -> datetime:
+    return _EPOCH + timedelta(seconds=float(seconds))
+
+
+class RepricingScheduler:
+
+    def __init__(self, reload_interval: int = 3600):
+        self._heap: List[Tuple[float, int]] = []
+        # Inventory_ID -> due time of its live heap entry; superseded heap
+        # entries are skipped when popped
+        self._due_at: Dict[int, float] = {}
+        self._touched: Set[int] = set()
+        self._lock = threading.Lock()
+        self.reload_interval = reload_interval
+        self.loaded_at: Optional[datetime] = None
+        self.plan_version: Optional[str] = None
+
+    def boundary_offsets(self) -> np.ndarray:
+
+        # Seconds before departure at which a time-based factor changes
+        days = set(pricing_engine.plan.time_breakpoints) | {DEMAND_SPIKE_DAYS}
+        offsets = [day * 86_400.0 for day in days] + [3_600.0]
+        return np.array(sorted(offsets), dtype=np.float64)
+
+    def next_change_times(self, departure_seconds: np.ndarray, now: datetime) -> np.ndarray:
+
+        # Earliest boundary strictly after now for each departure; NaN once
+        # the flight has departed and no further change is possible
+        now_seconds = _to_seconds(now)
+        candidates = departure_seconds[:, None] - self.boundary_offsets()[None, :]
+        candidates = np.where(candidates > now_seconds, candidates, np.inf)
+        next_times = candidates.min(axis=1)
+
+        if pricing_engine.is_deterministic:
+            bucket_end = _to_seconds(pricing_engine.bucket_start(pricing_engine.time_bucket(now) + 1))
+            next_times = np.minimum(next_times, bucket_end)
+
+        return np.where(departure_seconds > now_seconds, next_times, np.nan)
+
+    def next_change_time(self, departure_time: datetime, now: Optional[datetime] = None) -> Optional[datetime]:
+
+        now = now or datetime.now()
+        due = self.next_change_times(np.array([_to_seconds(departure_time)]), now)[0]
+        return None if np.isnan(due) else _from_seconds(due)
+
+    def schedule(self, inventory_ids: Iterable[int], due_seconds: Iterable[float]) -> None:
+
+        with self._lock:
+            for inventory_id, due in zip(inventory_ids, due_seconds):
+                if np.isnan(due):
+                    self._due_at.pop(inventory_id, None)
+                    continue
+                self._due_at[inventory_id] = due
+                heapq.heappush(self._heap, (due, inventory_id))
+
+    def mark_touched(self, flight_id: int) -> None:
+        with self._lock:
+            self._touched.add(flight_id)
+
+    def pop_due(self, now: datetime) -> Tuple[Set[int], Set[int]]:
+
+        # Inventory ids whose next change has passed, and flights touched by
+        # writes since the previous call
+        now_seconds = _to_seconds(now)
+        due = set()
+        with self._lock:
+            while self._heap and self._heap[0][0] <= now_seconds:
+                due_seconds, inventory_id = heapq.heappop(self._heap)
+                if self._due_at.get(inventory_id) == due_seconds:
+                    del self._due_at[inventory_id]
+                    due.add(inventory_id)
+            touched, self._touched = self._touched, set()
+        return due, touched
+
+    def needs_reload(self, now: datetime) -> bool:
+
+        # A new pricing plan may move the time breakpoints
+        if self.loaded_at is None or self.plan_version != pricing_engine.plan.version:
+            return True
+        return now - self.loaded_at >= timedelta(seconds=self.reload_interval)
+
+    def load(self, db: Session, now: Optional[datetime] = None) -> int:
+
+        # Rebuild the heap from every scheduled future inventory. Run at
+        # startup and periodically, so inventories created by other workers
+        # or outside the API are picked up.
+        now = now or datetime.now()
+        rows = db.query(SeatInventory.Inventory_ID, Flight.Departure_Time).join(
+            Flight, Flight.FlightID == SeatInventory.FlightID
+        ).filter(
+            and_(
+                Flight.Flight_status == 'scheduled',
+                Flight.Departure_Time > now
+            )
+        ).all()
+
+        inventory_ids = [row[0] for row in rows]
+        departures = np.array([_to_seconds(row[1]) for row in rows], dtype=np.float64)
+        due_seconds = self.next_change_times(departures, now) if rows else []
+
+        with self._lock:
+            self._heap = []
+            self._due_at = {}
+        self.schedule(inventory_ids, due_seconds)
+        self.loaded_at = now
+        self.plan_version = pricing_engine.plan.version
+        logger.info(f"Repricing scheduler loaded {len(inventory_ids)} inventories")
+        return len(inventory_ids)
+
+    def stats(self) -> Dict[str, object]:
+
+        with self._lock:
+            next_due = min(self._due_at.values()) if self._due_at else None
+            return {
+                'scheduled': len(self._due_at),
+                'heap_size': len(self._heap),
+                'touched_flights': len(self._touched),
+                'next_due': _from_seconds(next_due).isoformat() if next_due is not None else None,
+                'loaded_at': self.loaded_at.isoformat() if self.loaded_at else None,
+                'plan_version': self.plan_version
+            }
+
+    def reprice_due(self, db: Session, now: Optional[datetime] = None) -> int:
+
+        # Reprice due and touched inventories in one batch, record them in
+        # Price_history and schedule each one's next change. The caller commits.
+        now = now or datetime.now()
+        # Pop before reloading: a reload only schedules changes after now
+        due_inventories, touched_flights = self.pop_due(now)
+        if self.needs_reload(now):
+            self.load(db, now)
+
+        if not due_inventories and not touched_flights:
+            return 0
+
+        rows = self._load_inventories(db, due_inventories, touched_flights, now)
+        if not rows:
+            return 0
+
+        prices = get_dynamic_prices_batch(
+            base_fares=[float(flight.Price) for _, flight in rows],
+            seats_available=[inventory.Available_seats for inventory, _ in rows],
+            total_seats=[inventory.Total_Seats for inventory, _ in rows],
+            departure_times=[flight.Departure_Time for _, flight in rows],
+            origin_codes=[flight.departure_airport.Airport_Code for _, flight in rows],
+            destination_codes=[flight.arrival_airport.Airport_Code for _, flight in rows],
+            airline_codes=[flight.airline.Airline_Code for _, flight in rows],
+            seat_classes=[inventory.Class for inventory, _ in rows],
+            flight_ids=[flight.FlightID for _, flight in rows]
+        )['final_price']
+
+        db.execute(insert(PriceHistory), [
+            {
+                'FlightID': flight.FlightID,
+                'Seat_class': inventory.Class,
+                'Calculated_price': float(price),
+                'Available_seats': inventory.Available_seats,
+                'Days_to_departure': max(0, (flight.Departure_Time - now).days)
+            }
+            for (inventory, flight), price in zip(rows, prices)
+        ])
+
+        departures = np.array([_to_seconds(flight.Departure_Time) for _, flight in rows], dtype=np.float64)
+        self.schedule(
+            [inventory.Inventory_ID for inventory, _ in rows],
+            self.next_change_times(departures, now)
+        )
+
+        logger.info(
+            f"Repriced {len(rows)} inventories "
+            f"({len(due_inventories)} due, {len(touched_flights)} flights touched)"
+        )
+        return len(rows)
+
+    def _load_inventories(
+        self,
+        db: Session,
+        inventory_ids: Set[int],
+        flight_ids: Set[int],
+        now: datetime
+    ) -> List[Tuple[SeatInventory, Flight]]:
+
+        rows = {}
+        inventory_ids, flight_ids = sorted(inventory_ids), sorted(flight_ids)
+        chunks = max(len(inventory_ids), len(flight_ids))
+        for start in range(0, chunks, QUERY_CHUNK_SIZE):
+            inventory_chunk = inventory_ids[start:start + QUERY_CHUNK_SIZE]
+            flight_chunk = flight_ids[start:start + QUERY_CHUNK_SIZE]
+            conditions = []
+            if inventory_chunk:
+                conditions.append(SeatInventory.Inventory_ID.in_(inventory_chunk))
+            if flight_chunk:
+                conditions.append(SeatInventory.FlightID.in_(flight_chunk))
+
+            query = db.query(SeatInventory, Flight).join(
+                Flight, Flight.FlightID == SeatInventory.FlightID
+            ).options(
+                joinedload(Flight.airline),
+                joinedload(Flight.departure_airport),
+                joinedload(Flight.arrival_airport)
+            ).filter(
+                and_(
+                    or_(*conditions),
+                    Flight.Flight_status == 'scheduled',
+                    Flight.Departure_Time > now
+                )
+            )
+            for inventory, flight in query:
+                rows[inventory.Inventory_ID] = (inventory, flight)
+
+        return list(rows.values())
+
+
+repricing_scheduler = RepricingScheduler(
+    reload_interval=int(os.getenv("REPRICING_RELOAD_INTERVAL", "3600"))
+)
+
+
+def reprice_pending() -> int:
+
+    # One repricing pass in its own session; blocking, so async callers run
+    # it with asyncio.to_thread to keep the event loop free
+    from app.database_connection import SessionLocal
+
+    db = SessionLocal()
+    try:
+        repriced = repricing_scheduler.reprice_due(db)
+        db.commit()
+        return repriced
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+@on_inventory_change
+def mark_flight_for_repricing(flight_id: int) -> None:
+    repricing_scheduler.mark_touched(flight_id)
@@ -0,0 +1,158 @@
+# Round-trip search helpers
+#
+# Outbound and return candidates come from the search index, or from one
+# SQL query covering both directions when the index cannot answer. The
+# cheapest combinations are produced lazily from the two price-sorted
+# lists with a heap, so only about K pairs are ever looked at instead of
+# the full outbound x return product, even when most pairs do not fit.
+
+import heapq
+from datetime import date, datetime
+from typing import Callable, List, Sequence, Tuple
+from fastapi import HTTPException, status
+from sqlalchemy import and_, or_
+from sqlalchemy.orm import Session
+from app.models import Airport, Flight
+from app.services.flight_queries import flights_with_inventory
+from app.services.search_index import IndexedFlight, SeatAvailability, search_index
+
+
+def _day_range(day: date) -> Tuple[datetime, datetime]:
+    start = datetime.combine(day, datetime.min.time())
+    return start, datetime.combine(day, datetime.max.time())
+
+
+def load_round_trip_candidates(
+    db: Session,
+    origin: str,
+    destination: str,
+    departure_date: date,
+    return_date: date,
+    seat_class: str
+) -> Tuple[List[IndexedFlight], List[IndexedFlight]]:
+
+    if search_index.is_ready and departure_date >= date.today():
+        if not search_index.has_airport(origin) or not search_index.has_airport(destination):
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Invalid airport code"
+            )
+        return (
+            search_index.search(origin, destination, departure_date),
+            search_index.search(destination, origin, return_date)
+        )
+
+    airports = {
+        airport.Airport_Code: airport.AirportID
+        for airport in db.query(Airport).filter(Airport.Airport_Code.in_([origin, destination]))
+    }
+    if origin not in airports or destination not in airports:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Invalid airport code"
+        )
+
+    # Both directions in one query
+    out_start, out_end = _day_range(departure_date)
+    ret_start, ret_end = _day_range(return_date)
+    rows = flights_with_inventory(db, seat_class).filter(
+        and_(
+            Flight.Flight_status == 'scheduled',
+            or_(
+                and_(
+                    Flight.Departure_AirportID == airports[origin],
+                    Flight.Arrival_AirportID == airports[destination],
+                    Flight.Departure_Time >= out_start,
+                    Flight.Departure_Time < out_end
+                ),
+                and_(
+                    Flight.Departure_AirportID == airports[destination],
+                    Flight.Arrival_AirportID == airports[origin],
+                    Flight.Departure_Time >= ret_start,
+                    Flight.Departure_Time < ret_end
+                )
+            )
+        )
+    ).all()
+
+    outbound, inbound = [], []
+    for flight, seat_inv in rows:
+        record = IndexedFlight(
+            flight.FlightID,
+            flight.Flight_Number,
+            flight.Departure_Time,
+            flight.Arrival_Time,
+            flight.Duration,
+            float(flight.Price),
+            flight.airline.Airline_Code,
+            flight.airline.Airline_Name,
+            flight.departure_airport.Airport_Code,
+            flight.departure_airport.City,
+            flight.arrival_airport.Airport_Code,
+            flight.arrival_airport.City,
+            {seat_class: SeatAvailability(seat_inv.Available_seats, seat_inv.Total_Seats)} if seat_inv else {}
+        )
+        (outbound if record.origin_code == origin else inbound).append(record)
+    return outbound, inbound
+
+
+def _first_at_least(table: List[List], start: int, threshold) -> int:
+
+    # First index >= start whose value is >= threshold, or len(values).
+    # table[l][q] is the max of values[q:q + 2**l]; runs of values below
+    # the threshold are skipped in power-of-two steps.
+    size = len(table[0])
+    index = start
+    for level in range(len(table) - 1, -1, -1):
+        step = 1 << level
+        if index + step <= size and table[level][index] < threshold:
+            index += step
+    return index
+
+
+def _max_table(values: Sequence) -> List[List]:
+
+    table = [list(values)]
+    step = 1
+    while step * 2 <= len(values):
+        previous = table[-1]
+        table.append([
+            max(previous[q], previous[q + step]) for q in range(len(values) - step * 2 + 1)
+        ])
+        step *= 2
+    return table
+
+
+def top_k_combinations(
+    outbound_prices: Sequence[float],
+    return_prices: Sequence[float],
+    k: int,
+    earliest_return: Sequence,
+    return_departures: Sequence
+) -> List[Tuple[int, int]]:
+
+    # Both price lists must be sorted ascending. Return j fits outbound i
+    # when return_departures[j] >= earliest_return[i]. Pops (i, j) pairs in
+    # order of outbound_prices[i] + return_prices[j]; each outbound walks
+    # only the returns that fit it, jumping over the rest through a max
+    # table of return departures, so every pop is a result and the work is
+    # O((N + k) log M) however many pairs are incompatible.
+    if not outbound_prices or not return_prices or k <= 0:
+        return []
+
+    table = _max_table(return_departures)
+    heap = []
+    for i, ready in enumerate(earliest_return):
+        j = _first_at_least(table, 0, ready)
+        if j < len(return_prices):
+            heap.append((outbound_prices[i] + return_prices[j], i, j))
+    heapq.heapify(heap)
+
+    result = []
+    while heap and len(result) < k:
+        _, i, j = heapq.heappop(heap)
+        result.append((i, j))
+        j = _first_at_least(table, j + 1, earliest_return[i])
+        if j < len(return_prices):
+            heapq.heappush(heap, (outbound_prices[i] + return_prices[j], i, j))
+    return result
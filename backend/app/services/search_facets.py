@@ -0,0 +1,127 @@
+# Server-side filtering, facet counts and paging for search results
+#
+# Filters and facets are computed in one pass over the priced candidates.
+# Each facet counts the rows that pass every filter except its own, so a
+# client can show "IndiGo (4)" next to an unticked airline box and the
+# count stays right while other airlines are selected.
+
+import heapq
+from dataclasses import dataclass, field
+from typing import Dict, FrozenSet, List, Optional, Sequence, Tuple
+
+# Departure time bands, [start hour, end hour)
+TIME_BANDS = (
+    ('night', 0, 6),
+    ('morning', 6, 12),
+    ('afternoon', 12, 18),
+    ('evening', 18, 24),
+)
+_BAND_BY_HOUR = tuple(
+    next(name for name, start, end in TIME_BANDS if start <= hour < end)
+    for hour in range(24)
+)
+
+SORT_KEYS = {
+    'price': lambda row: row.dynamic_price,
+    'duration': lambda row: row.Duration,
+    'departure_time': lambda row: row.Departure_Time,
+}
+
+
+@dataclass(frozen=True)
+class SearchFilters:
+    airlines: FrozenSet[str] = frozenset()
+    departure_bands: FrozenSet[str] = frozenset()
+    max_duration: Optional[int] = None
+    min_price: Optional[float] = None
+    max_price: Optional[float] = None
+
+
+@dataclass
+class FacetCounts:
+    price_bucket: float
+    airlines: Dict[str, dict] = field(default_factory=dict)
+    departure_bands: Dict[str, int] = field(default_factory=lambda: {name: 0 for name, _, _ in TIME_BANDS})
+    price_buckets: Dict[int, int] = field(default_factory=dict)
+
+    def as_dict(self) -> dict:
+        return {
+            "airlines": sorted(self.airlines.values(), key=lambda a: (-a["count"], a["airline_code"])),
+            "departure_bands": [
+                {"band": name, "count": self.departure_bands[name]} for name, _, _ in TIME_BANDS
+            ],
+            "price_histogram": [
+                {
+                    "min_price": round(bucket * self.price_bucket, 2),
+                    "max_price": round((bucket + 1) * self.price_bucket, 2),
+                    "count": self.price_buckets[bucket]
+                }
+                for bucket in sorted(self.price_buckets)
+            ]
+        }
+
+
+def departure_band(row) -> str:
+    return _BAND_BY_HOUR[row.Departure_Time.hour]
+
+
+def filter_and_facet(
+    rows: Sequence,
+    filters: SearchFilters,
+    price_bucket: float = 1000.0,
+    with_facets: bool = True
+) -> Tuple[List, Optional[FacetCounts]]:
+
+    # Rows passing every filter, plus facet counts. A row that fails exactly
+    # one filter still counts towards that filter's facet.
+    facets = FacetCounts(price_bucket) if with_facets else None
+    kept = []
+
+    for row in rows:
+        price = row.dynamic_price
+        band = _BAND_BY_HOUR[row.Departure_Time.hour]
+        airline_ok = not filters.airlines or row.airline_code in filters.airlines
+        band_ok = not filters.departure_bands or band in filters.departure_bands
+        duration_ok = filters.max_duration is None or row.Duration <= filters.max_duration
+        price_ok = (
+            (filters.min_price is None or price >= filters.min_price) and
+            (filters.max_price is None or price <= filters.max_price)
+        )
+
+        failed = (not airline_ok) + (not band_ok) + (not duration_ok) + (not price_ok)
+        if failed == 0:
+            kept.append(row)
+        if facets is None or failed > 1:
+            continue
+
+        if band_ok and duration_ok and price_ok:
+            airline = facets.airlines.get(row.airline_code)
+            if airline is None:
+                facets.airlines[row.airline_code] = {
+                    "airline_code": row.airline_code,
+                    "airline_name": row.airline_name,
+                    "count": 1,
+                    "min_price": price
+                }
+            else:
+                airline["count"] += 1
+                airline["min_price"] = min(airline["min_price"], price)
+        if airline_ok and duration_ok and price_ok:
+            facets.departure_bands[band] += 1
+        if airline_ok and band_ok and duration_ok:
+            bucket = int(price // price_bucket)
+            facets.price_buckets[bucket] = facets.price_buckets.get(bucket, 0) + 1
+
+    return kept, facets
+
+
+def sort_and_page(rows: List, sort_by: Optional[str], offset: int = 0, limit: Optional[int] = None) -> List:
+
+    # Only the first offset + limit rows are ordered when a page is asked for
+    key = SORT_KEYS.get(sort_by)
+    if key is None:
+        return rows[offset:offset + limit] if limit is not None else rows[offset:]
+    if limit is not None and offset + limit < len(rows):
+        return heapq.nsmallest(offset + limit, rows, key=key)[offset:]
+    rows.sort(key=key)
+    return rows[offset:]
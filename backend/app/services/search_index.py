@@ -0,0 +1,340 @@
+# In-process flight search index
+#
+# Scheduled flights from today onwards, keyed by (origin code, destination
+# code, departure date), as compact records carrying everything a search
+# result needs: times, fare, airline, airports and per-class availability.
+# The index is built at startup. Inventory events (bookings, cancellations,
+# expiries, simulator and admin writes) only mark their flights dirty; the
+# background loop refreshes the marked flights in one batched query every
+# second or so, so write paths never wait on the index. Records are updated
+# in place when the airline/airport reference data changes, and fully
+# rebuilt by a periodic reconciliation pass, which also drops past dates and
+# picks up anything written outside this process. Searches on an indexed
+# route are answered without touching the database.
+
+import asyncio
+import bisect
+import logging
+import threading
+from datetime import date, datetime
+from typing import Callable, Dict, Iterable, List, Mapping, NamedTuple, Optional, Set, Tuple
+from sqlalchemy import and_, select
+from sqlalchemy.orm import Session, aliased
+from app.models import Airline, Airport, Flight, SeatInventory
+from app.services.inventory_events import on_inventory_change
+
+logger = logging.getLogger(__name__)
+
+RouteDateKey = Tuple[str, str, date]
+
+
+class SeatAvailability(NamedTuple):
+    available: int
+    total: int
+
+
+class IndexedFlight(NamedTuple):
+    FlightID: int
+    Flight_Number: str
+    Departure_Time: datetime
+    Arrival_Time: datetime
+    Duration: int
+    base_fare: float
+    airline_code: str
+    airline_name: str
+    origin_code: str
+    origin_city: str
+    destination_code: str
+    destination_city: str
+    # seat class -> availability
+    inventory: Dict[str, SeatAvailability]
+
+    @property
+    def key(self) -> RouteDateKey:
+        return (self.origin_code, self.destination_code, self.Departure_Time.date())
+
+
+def _index_query(after: datetime, flight_ids: Optional[Iterable[int]] = None):
+
+    # One row per (flight, class); flights without inventory get one row
+    # with NULL class columns
+    origin, destination = aliased(Airport), aliased(Airport)
+    query = select(
+        Flight.FlightID,
+        Flight.Flight_Number,
+        Flight.Departure_Time,
+        Flight.Arrival_Time,
+        Flight.Duration,
+        Flight.Price,
+        Airline.Airline_Code,
+        Airline.Airline_Name,
+        origin.Airport_Code,
+        origin.City,
+        destination.Airport_Code,
+        destination.City,
+        SeatInventory.Class,
+        SeatInventory.Available_seats,
+        SeatInventory.Total_Seats
+    ).join(
+        Airline, Airline.AirlineID == Flight.AirlineID
+    ).join(
+        origin, origin.AirportID == Flight.Departure_AirportID
+    ).join(
+        destination, destination.AirportID == Flight.Arrival_AirportID
+    ).outerjoin(
+        SeatInventory, SeatInventory.FlightID == Flight.FlightID
+    ).where(
+        and_(
+            Flight.Flight_status == 'scheduled',
+            Flight.Departure_Time >= after
+        )
+    )
+    if flight_ids is not None:
+        query = query.where(Flight.FlightID.in_(list(flight_ids)))
+    return query
+
+
+def _records_from_rows(rows) -> Dict[int, IndexedFlight]:
+
+    records = {}
+    for row in rows:
+        (flight_id, number, departure, arrival, duration, price, airline_code, airline_name,
+         origin_code, origin_city, dest_code, dest_city, seat_class, available, total) = row
+        record = records.get(flight_id)
+        if record is None:
+            record = records[flight_id] = IndexedFlight(
+                flight_id, number, departure, arrival, duration, float(price),
+                airline_code, airline_name, origin_code, origin_city, dest_code, dest_city, {}
+            )
+        if seat_class is not None:
+            record.inventory[seat_class] = SeatAvailability(available, total)
+    return records
+
+
+class FlightSearchIndex:
+
+    def __init__(self, session_factory: Optional[Callable[[], Session]] = None):
+        self.session_factory = session_factory
+        self._by_key: Dict[RouteDateKey, Dict[int, IndexedFlight]] = {}
+        self._by_id: Dict[int, IndexedFlight] = {}
+        # Origin code -> (departure time, FlightID) in ascending order, the
+        # adjacency lists for connecting-flight search
+        self._departures: Dict[str, List[Tuple[datetime, int]]] = {}
+        self._airport_codes: Set[str] = set()
+        self._lock = threading.Lock()
+        # Flights changed since the last refresh; a mark that arrives while a
+        # rebuild is reading the database stays here and is refreshed after it
+        self._dirty: Set[int] = set()
+        self.built_at: Optional[datetime] = None
+
+    @property
+    def is_ready(self) -> bool:
+        return self.built_at is not None
+
+    def _session(self) -> Session:
+        if self.session_factory is None:
+            from app.database_connection import SessionLocal
+            self.session_factory = SessionLocal
+        return self.session_factory()
+
+    def _today(self) -> datetime:
+        return datetime.combine(date.today(), datetime.min.time())
+
+    def rebuild(self) -> int:
+
+        # Build fresh maps off to the side and swap them in, so searches
+        # keep reading the previous index while this runs
+        db = self._session()
+        try:
+            records = _records_from_rows(db.execute(_index_query(self._today())))
+            airport_codes = {code for (code,) in db.execute(select(Airport.Airport_Code))}
+        finally:
+            db.close()
+
+        by_key, departures = {}, {}
+        for record in records.values():
+            by_key.setdefault(record.key, {})[record.FlightID] = record
+            departures.setdefault(record.origin_code, []).append((record.Departure_Time, record.FlightID))
+        for entries in departures.values():
+            entries.sort()
+
+        with self._lock:
+            self._by_key, self._by_id = by_key, records
+            self._departures = departures
+            self._airport_codes = airport_codes
+            self.built_at = datetime.now()
+
+        logger.info(f"Search index built: {len(records)} flights on {len(by_key)} route-days")
+        return len(records)
+
+    def clear(self) -> None:
+
+        # Back to the unbuilt state; searches fall back to the database
+        with self._lock:
+            self._by_key, self._by_id = {}, {}
+            self._departures = {}
+            self._airport_codes = set()
+            self._dirty = set()
+            self.built_at = None
+
+    def mark_dirty(self, flight_ids: Iterable[int]) -> None:
+        with self._lock:
+            self._dirty.update(flight_ids)
+
+    @property
+    def has_dirty(self) -> bool:
+        return bool(self._dirty)
+
+    def refresh_dirty(self) -> int:
+
+        # Refresh every flight marked since the last call in one query
+        with self._lock:
+            flight_ids, self._dirty = self._dirty, set()
+        try:
+            self.refresh_flights(flight_ids)
+        except Exception:
+            # Try again on the next pass
+            self.mark_dirty(flight_ids)
+            raise
+        return len(flight_ids)
+
+    def refresh_flights(self, flight_ids: Iterable[int]) -> None:
+
+        flight_ids = set(flight_ids)
+        if not self.is_ready or not flight_ids:
+            return
+
+        db = self._session()
+        try:
+            records = _records_from_rows(db.execute(_index_query(self._today(), flight_ids)))
+        finally:
+            db.close()
+
+        with self._lock:
+            for flight_id in flight_ids:
+                self._remove(flight_id)
+                record = records.get(flight_id)
+                if record is not None:
+                    self._by_id[flight_id] = record
+                    self._by_key.setdefault(record.key, {})[flight_id] = record
+                    bisect.insort(
+                        self._departures.setdefault(record.origin_code, []),
+                        (record.Departure_Time, flight_id)
+                    )
+
+    def _remove(self, flight_id: int) -> None:
+
+        previous = self._by_id.pop(flight_id, None)
+        if previous is None:
+            return
+        flights = self._by_key.get(previous.key)
+        if flights is not None:
+            flights.pop(flight_id, None)
+            if not flights:
+                del self._by_key[previous.key]
+        entries = self._departures.get(previous.origin_code)
+        if entries is not None:
+            position = bisect.bisect_left(entries, (previous.Departure_Time, flight_id))
+            if position < len(entries) and entries[position] == (previous.Departure_Time, flight_id):
+                del entries[position]
+
+    def has_airport(self, code: str) -> bool:
+        return code in self._airport_codes
+
+    def apply_reference(
+        self,
+        airline_names: Optional[Mapping[str, str]] = None,
+        airport_cities: Optional[Mapping[str, str]] = None
+    ) -> int:
+
+        # Airline and airport rows changed: take the known airport codes and
+        # rewrite the names cached in flight records, instead of serving
+        # stale names until the next rebuild. Returns the records replaced.
+        replaced = 0
+        with self._lock:
+            if not self.is_ready:
+                return 0
+            if airport_cities is not None:
+                self._airport_codes = set(airport_cities)
+            for flight_id, record in list(self._by_id.items()):
+                changes = {}
+                if airline_names is not None:
+                    name = airline_names.get(record.airline_code, record.airline_name)
+                    if name != record.airline_name:
+                        changes['airline_name'] = name
+                if airport_cities is not None:
+                    origin_city = airport_cities.get(record.origin_code, record.origin_city)
+                    destination_city = airport_cities.get(record.destination_code, record.destination_city)
+                    if origin_city != record.origin_city:
+                        changes['origin_city'] = origin_city
+                    if destination_city != record.destination_city:
+                        changes['destination_city'] = destination_city
+                if changes:
+                    record = record._replace(**changes)
+                    self._by_id[flight_id] = record
+                    self._by_key[record.key][flight_id] = record
+                    replaced += 1
+        return replaced
+
+    def search(self, origin: str, destination: str, departure_date: date) -> List[IndexedFlight]:
+
+        with self._lock:
+            flights = self._by_key.get((origin, destination, departure_date))
+            return list(flights.values()) if flights else []
+
+    def departures_between(self, origin: str, earliest: datetime, latest: datetime) -> List[IndexedFlight]:
+
+        # Flights leaving origin in [earliest, latest], by departure time
+        with self._lock:
+            entries = self._departures.get(origin)
+            if not entries:
+                return []
+            start = bisect.bisect_left(entries, (earliest, -1))
+            end = bisect.bisect_right(entries, (latest, float('inf')))
+            return [self._by_id[flight_id] for _, flight_id in entries[start:end]]
+
+    def get(self, flight_id: int) -> Optional[IndexedFlight]:
+        return self._by_id.get(flight_id)
+
+    def stats(self) -> Dict[str, object]:
+
+        with self._lock:
+            return {
+                'ready': self.is_ready,
+                'flights': len(self._by_id),
+                'route_days': len(self._by_key),
+                'airports': len(self._airport_codes),
+                'dirty': len(self._dirty),
+                'built_at': self.built_at.isoformat() if self.built_at else None
+            }
+
+
+search_index = FlightSearchIndex()
+
+
+@on_inventory_change
+def mark_indexed_flight(flight_id: int) -> None:
+    # No database work here: write paths call this before they return
+    search_index.mark_dirty([flight_id])
+
+
+async def search_index_reconcile_loop(interval: int = 300, refresh_interval: float = 1.0):
+
+    # First pass builds the index; later passes reconcile it with the
+    # database (writes from other processes, day rollover). In between,
+    # flights marked by inventory events are refreshed in batches.
+    loop = asyncio.get_running_loop()
+    next_rebuild = loop.time()
+    while True:
+        if loop.time() >= next_rebuild:
+            try:
+                await asyncio.to_thread(search_index.rebuild)
+            except Exception as e:
+                logger.error(f"Search index rebuild failed: {e}")
+            next_rebuild = loop.time() + interval
+        if search_index.has_dirty:
+            try:
+                await asyncio.to_thread(search_index.refresh_dirty)
+            except Exception as e:
+                logger.error(f"Search index refresh failed: {e}")
+        await asyncio.sleep(refresh_interval)
@@ -4,8 +4,9 @@ from datetime import datetime, timedelta
 from sqlalchemy.orm import Session
 from sqlalchemy import and_
 from app.database_connection import SessionLocal
-from app.models import Flight, SeatInventory, PriceHistory, Booking
-from app.services.pricing_engine import get_dynamic_price
+from app.models import Flight, SeatInventory
+from app.services.inventory_events import notify_inventory_changed
+from app.services.repricing_scheduler import reprice_pending
 import logging
 
 logging.basicConfig(level=logging.INFO)
@@ -32,23 +33,26 @@ class MarketSimulator:
                 )
             ).all()
             
-            if not flights:
-                logger.info("No flights to simulate")
-                return
-            
             # Simulate market activity for random subset of flights
             num_flights_to_update = min(len(flights), random.randint(5, 15))
             selected_flights = random.sample(flights, num_flights_to_update)
             
-            logger.info(f"Simulating market for {num_flights_to_update} flights")
+            if selected_flights:
+                logger.info(f"Simulating market for {num_flights_to_update} flights")
             
             for flight in selected_flights:
                 await self._simulate_flight_activity(flight, db)
             
-            # Auto-expire pending bookings
-            await self._expire_pending_bookings(db)
-            
+            # Expired holds are released by the hold expiry loop
             db.commit()
+            # Marks these flights for repricing along with the other listeners
+            await asyncio.to_thread(
+                notify_inventory_changed, [flight.FlightID for flight in selected_flights]
+            )
+            
+            # Reprice only inventories whose price can have changed since the
+            # last step, off the event loop and in its own session
+            await asyncio.to_thread(reprice_pending)
             logger.info("Market simulation step completed")
             
         except Exception as e:
@@ -59,13 +63,6 @@ class MarketSimulator:
     
     async def _simulate_flight_activity(self, flight: Flight, db: Session):
         
-        from app.models import Airline, Airport
-        
-        # Get flight details
-        airline = db.query(Airline).filter(Airline.AirlineID == flight.AirlineID).first()
-        origin = db.query(Airport).filter(Airport.AirportID == flight.Departure_AirportID).first()
-        dest = db.query(Airport).filter(Airport.AirportID == flight.Arrival_AirportID).first()
-        
         # Get seat inventories
         seat_inventories = db.query(SeatInventory).filter(
             SeatInventory.FlightID == flight.FlightID
@@ -111,72 +108,7 @@ class MarketSimulator:
                     f"Simulated cancellation: {seats_to_release} seats on {flight.Flight_Number} "
                     f"({seat_inv.Class}) - {seat_inv.Available_seats}/{seat_inv.Total_Seats} available"
                 )
-            
-            # Calculate and record new price
-            price_data = get_dynamic_price(
-                base_fare=float(flight.Price),
-                seats_available=seat_inv.Available_seats,
-                total_seats=seat_inv.Total_Seats,
-                departure_time=flight.Departure_Time,
-                origin_code=origin.Airport_Code,
-                destination_code=dest.Airport_Code,
-                airline_code=airline.Airline_Code,
-                seat_class=seat_inv.Class
-            )
-            
-            # Store price history
-            price_record = PriceHistory(
-                FlightID=flight.FlightID,
-                Seat_class=seat_inv.Class,
-                Calculated_price=price_data['final_price'],
-                Available_seats=seat_inv.Available_seats,
-                Days_to_departure=max(0, days_to_departure)
-            )
-            db.add(price_record)
-            
-            logger.info(
-                f"Price update: {flight.Flight_Number} ({seat_inv.Class}) - "
-                f"₹{price_data['final_price']:.2f} "
-                f"(base: ₹{float(flight.Price):.2f})"
-            )
-    
-    async def _expire_pending_bookings(self, db: Session):
 
-        now = datetime.now()
-        
-        expired_bookings = db.query(Booking).filter(
-            and_(
-                Booking.Booking_status == 'pending',
-                Booking.Expiry_time <= now,
-                Booking.Expiry_time.isnot(None)
-            )
-        ).all()
-        
-        if not expired_bookings:
-            return
-        
-        logger.info(f"Expiring {len(expired_bookings)} pending bookings")
-        
-        for booking in expired_bookings:
-            # Release seats back to inventory
-            seat_inv = db.query(SeatInventory).filter(
-                and_(
-                    SeatInventory.FlightID == booking.FlightID,
-                    SeatInventory.Class == booking.Seat_class
-                )
-            ).first()
-            
-            if seat_inv:
-                seat_inv.Available_seats += booking.Num_passengers
-                logger.info(
-                    f"Released {booking.Num_passengers} seats for expired booking {booking.pnr}"
-                )
-            
-            # Update booking status
-            booking.Booking_status = 'cancelled'
-        
-        logger.info("Expired bookings processed")
-    
     async def scheduler_loop(self, interval: int = None):
 
         if interval:
@@ -0,0 +1,25 @@
+# Raw JSON responses for hot read paths
+#
+# Handlers on these paths build plain dicts and dataclasses and encode them
+# once with orjson. Returning a Response directly makes FastAPI skip the
+# response_model validation and its jsonable_encoder pass; the routes keep
+# their response_model, so the OpenAPI schema does not change.
+
+from typing import Any, Dict, Optional
+import orjson
+from fastapi import Response
+
+JSON_OPTIONS = orjson.OPT_SERIALIZE_NUMPY
+
+
+def dumps(content: Any) -> bytes:
+    return orjson.dumps(content, option=JSON_OPTIONS)
+
+
+def json_response(content: Any, status_code: int = 200, headers: Optional[Dict[str, str]] = None) -> Response:
+    return Response(
+        content=dumps(content),
+        status_code=status_code,
+        headers=headers,
+        media_type="application/json"
+    )
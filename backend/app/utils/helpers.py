@@ -1,12 +1,7 @@
-import random
-import string
+import base64
+import json
 from datetime import datetime
 
-def generate_pnr() -> str:
-    letters = ''.join(random.choices(string.ascii_uppercase, k=3))
-    digits = ''.join(random.choices(string.digits, k=3))
-    return f"{letters}{digits}"
-
 def calculate_flight_duration(departure: datetime, arrival: datetime) -> int:
     return int((arrival - departure).total_seconds() / 60)
 
@@ -15,3 +10,18 @@ def format_currency(amount: float) -> str:
 
 def validate_airport_code(code: str) -> bool:
     return len(code) == 3 and code.isalpha() and code.isupper()
+
+def encode_cursor(payload: dict) -> str:
+    # Opaque pagination token: urlsafe base64 of compact JSON
+    raw = json.dumps(payload, separators=(",", ":"), default=str).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def decode_cursor(token: str) -> dict:
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (ValueError, TypeError) as e:
+        raise ValueError("Malformed cursor") from e
+    if not isinstance(payload, dict):
+        raise ValueError("Malformed cursor")
+    return payload
@@ -0,0 +1,134 @@
+# Booking contention benchmark: many threads booking seats on one flight,
+# once with BookingService in 'locking' mode and once in 'optimistic' mode.
+#
+# Row locks only matter on a real server, so point BENCH_DATABASE_URL at a
+# scratch MySQL database to compare the modes properly (the schema is
+# created and dropped there). Without it a file-backed SQLite database is
+# used, which serializes writers itself and only shows per-booking cost.
+
+import os
+import statistics
+import tempfile
+import threading
+import time
+from datetime import date
+from typing import Dict, Optional
+
+from fastapi import HTTPException
+from sqlalchemy import create_engine, update
+from sqlalchemy.orm import sessionmaker
+
+from benchmarks.common import populate_synthetic_dataset
+from app.models import Base, SeatInventory
+from app.schemas import BookingCreate, PassengerCreate
+from app.services.booking_service import BookingService
+
+HOT_FLIGHT_ID = 1
+
+
+def _create_engine(database_url: Optional[str], threads: int):
+
+    if database_url:
+        return create_engine(database_url, pool_size=threads, max_overflow=0), None
+
+    handle, path = tempfile.mkstemp(suffix=".db")
+    os.close(handle)
+    engine = create_engine(
+        f"sqlite:///{path}",
+        connect_args={"check_same_thread": False, "timeout": 30}
+    )
+    return engine, path
+
+
+def _contend(SessionLocal, engine, threads: int, per_thread: int) -> Dict[str, float]:
+
+    # Enough seats that every attempt can succeed
+    with engine.begin() as conn:
+        conn.execute(
+            update(SeatInventory)
+            .where(SeatInventory.FlightID == HOT_FLIGHT_ID, SeatInventory.Class == 'economy')
+            .values(Available_seats=threads * per_thread, Total_Seats=threads * per_thread)
+        )
+
+    booking = BookingCreate(
+        FlightID=HOT_FLIGHT_ID,
+        Seat_class="economy",
+        passengers=[PassengerCreate(
+            First_name="Bench",
+            Last_name="Contention",
+            Date_of_birth=date(1990, 1, 1),
+            Gender="other",
+            Email="contention@example.com",
+            Phone="+919876543210"
+        )]
+    )
+    barrier = threading.Barrier(threads + 1)
+    latencies, conflicts, errors = [], [0], []
+    lock = threading.Lock()
+
+    def worker():
+        db = SessionLocal()
+        samples, failed = [], 0
+        try:
+            barrier.wait()
+            for _ in range(per_thread):
+                start = time.perf_counter()
+                try:
+                    BookingService.create_booking(booking, user_id=1, db=db)
+                except HTTPException as e:
+                    if e.status_code >= 500:
+                        errors.append(e.detail)
+                    failed += 1
+                samples.append(time.perf_counter() - start)
+        finally:
+            db.close()
+            with lock:
+                latencies.extend(samples)
+                conflicts[0] += failed
+
+    workers = [threading.Thread(target=worker) for _ in range(threads)]
+    for thread in workers:
+        thread.start()
+    barrier.wait()
+    start = time.perf_counter()
+    for thread in workers:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    if errors:
+        raise RuntimeError(f"{len(errors)} bookings failed, first: {errors[0]}")
+
+    return {
+        "median_s": statistics.median(latencies),
+        "min_s": min(latencies),
+        "max_s": max(latencies),
+        "calls": len(latencies),
+        "bookings_per_s": (len(latencies) - conflicts[0]) / elapsed,
+        "conflicts": conflicts[0]
+    }
+
+
+def run(threads: int = 8, per_thread: int = 25, database_url: Optional[str] = None) -> Dict[str, Dict[str, float]]:
+
+    database_url = database_url or os.getenv("BENCH_DATABASE_URL")
+    engine, sqlite_path = _create_engine(database_url, threads)
+    Base.metadata.create_all(bind=engine)
+    populate_synthetic_dataset(engine, num_flights=50, days=10)
+    SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+    previous_mode = BookingService.seat_mode
+    results = {}
+    try:
+        for mode in BookingService.SEAT_MODES:
+            BookingService.set_seat_mode(mode)
+            results[f"contention.{mode}.{threads}threads"] = _contend(
+                SessionLocal, engine, threads, per_thread
+            )
+    finally:
+        BookingService.set_seat_mode(previous_mode)
+        Base.metadata.drop_all(bind=engine)
+        engine.dispose()
+        if sqlite_path:
+            os.remove(sqlite_path)
+
+    return results
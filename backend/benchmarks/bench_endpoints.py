@@ -0,0 +1,170 @@
+# End-to-end benchmarks of the flight search and booking paths against an
+# in-memory SQLite database loaded with a synthetic schedule. Read paths
+# also report how many statements one call issues ("queries"), so an N+1
+# regression fails the queries threshold.
+
+import itertools
+from datetime import date, timedelta
+from typing import Dict
+
+from benchmarks.common import (
+    HOT_ROUTE,
+    count_queries,
+    create_sqlite_session_factory,
+    measure,
+    populate_synthetic_dataset,
+)
+from app.routers import flights as flights_router
+from app.schemas import (
+    BookingCreate,
+    ConnectingSearchRequest,
+    FlightSearchRequest,
+    PassengerCreate,
+    RoundTripSearchRequest,
+)
+from app.services.booking_service import BookingService
+from app.services.search_index import search_index
+
+
+def _passenger(index: int) -> PassengerCreate:
+    return PassengerCreate(
+        First_name="Bench",
+        Last_name=f"Passenger{index}",
+        Date_of_birth=date(1990, 1, 1),
+        Gender="other",
+        Email=f"passenger{index}@example.com",
+        Phone="+919876543210"
+    )
+
+
+def run(num_flights: int = 5000) -> Dict[str, Dict[str, float]]:
+
+    engine, SessionLocal = create_sqlite_session_factory()
+    dataset = populate_synthetic_dataset(engine, num_flights=num_flights)
+    results = {}
+
+    db = SessionLocal()
+    try:
+        search_days = itertools.cycle(range(1, min(dataset["days"], 30) + 1))
+
+        def search():
+            flights_router.search_flights(
+                FlightSearchRequest(
+                    origin=HOT_ROUTE[0],
+                    destination=HOT_ROUTE[1],
+                    departure_date=date.today() + timedelta(days=next(search_days)),
+                    seat_class="economy",
+                    passengers=1
+                ),
+                db
+            )
+
+        def list_flights():
+            flights_router.list_all_flights(
+                skip=0, limit=100, cursor=None, order_by="flight_id",
+                fields=None, include_breakdown=True, db=db
+            )
+
+        def flight_details():
+            flights_router.get_flight_details(
+                flight_id=1, fields=None, include_breakdown=True, db=db
+            )
+
+        batch_ids = ",".join(str(flight_id) for flight_id in range(1, 101))
+
+        def flight_details_batch():
+            flights_router.get_flight_details_batch(
+                ids=batch_ids, fields=None, include_breakdown=True, db=db
+            )
+
+        read_paths = {
+            "e2e.search_flights": (search, 50),
+            "e2e.list_all_flights": (list_flights, 10),
+            "e2e.get_flight_details": (flight_details, 50),
+            "e2e.get_flight_details.batch100": (flight_details_batch, 10),
+        }
+        for name, (fn, number) in read_paths.items():
+            queries = count_queries(engine, fn)
+            # Identity map would hide lazy loads on repeat calls
+            db.expunge_all()
+            results[name] = measure(fn, number=number, repeat=3)
+            results[name]["queries"] = queries
+
+        # Autocomplete keystrokes; the first call builds the prefix index
+        prefixes = itertools.cycle(["d", "de", "mum", "ban", "go", "c"])
+
+        def suggest_airports():
+            flights_router.suggest_airports_by_prefix(q=next(prefixes), limit=10, db=db)
+
+        suggest_airports()
+        queries = count_queries(engine, suggest_airports)
+        results["e2e.suggest_airports"] = measure(suggest_airports, number=1000, repeat=3)
+        results["e2e.suggest_airports"]["queries"] = queries
+
+        # Same searches served from the in-memory index
+        search_index.session_factory = SessionLocal
+        search_index.rebuild()
+        queries = count_queries(engine, search)
+        results["e2e.search_flights.indexed"] = measure(search, number=50, repeat=3)
+        results["e2e.search_flights.indexed"]["queries"] = queries
+
+        # One- and two-stop itineraries between two non-hub airports
+        connection_days = itertools.cycle(range(1, min(dataset["days"], 30) + 1))
+
+        def search_connections():
+            flights_router.search_connecting_flights(
+                ConnectingSearchRequest(
+                    origin="GOI",
+                    destination="LKO",
+                    departure_date=date.today() + timedelta(days=next(connection_days)),
+                    max_stops=2
+                )
+            )
+
+        queries = count_queries(engine, search_connections)
+        results["e2e.search_connections"] = measure(search_connections, number=20, repeat=3)
+        results["e2e.search_connections"]["queries"] = queries
+
+        # Hot route out, back two days later
+        round_trip_days = itertools.cycle(range(1, min(dataset["days"], 30) - 1))
+
+        def search_round_trip():
+            departure = date.today() + timedelta(days=next(round_trip_days))
+            flights_router.search_round_trip(
+                RoundTripSearchRequest(
+                    origin=HOT_ROUTE[0],
+                    destination=HOT_ROUTE[1],
+                    departure_date=departure,
+                    return_date=departure + timedelta(days=2)
+                ),
+                db
+            )
+
+        queries = count_queries(engine, search_round_trip)
+        results["e2e.search_round_trip"] = measure(search_round_trip, number=50, repeat=3)
+        results["e2e.search_round_trip"]["queries"] = queries
+
+        # Spread bookings over the hot route so no inventory runs dry
+        flight_ids = itertools.cycle(range(1, dataset["hot_route_flights"] + 1))
+        for party_size in (1, 9):
+            passengers = [_passenger(i) for i in range(party_size)]
+
+            def book():
+                BookingService.create_booking(
+                    BookingCreate(
+                        FlightID=next(flight_ids),
+                        Seat_class="economy",
+                        passengers=passengers
+                    ),
+                    user_id=1,
+                    db=db
+                )
+
+            results[f"e2e.create_booking.{party_size}pax"] = measure(book, number=20, repeat=3)
+    finally:
+        search_index.clear()
+        search_index.session_factory = None
+        db.close()
+        engine.dispose()
+
+    return results
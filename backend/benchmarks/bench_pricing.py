@@ -0,0 +1,89 @@
+# Pricing engine benchmarks: per-factor microbenchmarks, calculate_price and
+# the vectorized batch path at several inventory sizes.
+
+from datetime import datetime, timedelta
+from typing import Dict, Iterable
+
+import numpy as np
+
+from benchmarks.common import AIRLINES, AIRPORTS, measure
+from app.services.pricing_engine import DynamicPricingEngine
+
+BATCH_SIZES = (1_000, 100_000, 1_000_000)
+
+
+def run_micro(engine: DynamicPricingEngine) -> Dict[str, Dict[str, float]]:
+
+    departure = datetime.now() + timedelta(days=5, hours=7)
+    factors = {
+        "seat_availability_factor": lambda: engine._calculate_seat_availability_factor(37, 180),
+        "time_to_departure_factor": lambda: engine._calculate_time_to_departure_factor(departure),
+        "demand_factor": lambda: engine._calculate_demand_factor(departure, 'DEL', 'BOM', flight_id=42),
+        "seasonal_factor": lambda: engine._calculate_seasonal_factor(departure),
+        "weekend_factor": lambda: engine._calculate_weekend_factor(departure),
+        "peak_hour_factor": lambda: engine._calculate_peak_hour_factor(departure),
+        "route_category_factor": lambda: engine._calculate_route_category_factor('DEL', 'BOM'),
+        "airline_tier_factor": lambda: engine._calculate_airline_tier_factor('AI'),
+        "class_multiplier": lambda: engine._get_class_multiplier('business'),
+    }
+
+    results = {
+        f"micro.{name}": measure(fn, number=20_000)
+        for name, fn in factors.items()
+    }
+    results["micro.calculate_price"] = measure(
+        lambda: engine.calculate_price(
+            base_fare=5500.0,
+            seats_available=37,
+            total_seats=180,
+            departure_time=departure,
+            origin_code='DEL',
+            destination_code='BOM',
+            airline_code='AI',
+            seat_class='economy',
+            flight_id=42
+        ),
+        number=5_000
+    )
+    return results
+
+
+def synthetic_columns(size: int, seed: int = 11) -> Dict[str, np.ndarray]:
+
+    rng = np.random.default_rng(seed)
+    codes = np.array([code for code, _ in AIRPORTS])
+    now = np.datetime64(datetime.now(), 'us')
+    total = rng.choice([8, 24, 180], size)
+
+    return {
+        "base_fares": rng.uniform(2500, 9000, size),
+        "seats_available": rng.integers(0, total + 1),
+        "total_seats": total,
+        "departure_times": now + rng.integers(3_600, 90 * 86_400, size) * np.timedelta64(1, 's'),
+        "origin_codes": codes[rng.integers(0, len(codes), size)],
+        "destination_codes": codes[rng.integers(0, len(codes), size)],
+        "airline_codes": np.array([code for _, code in AIRLINES])[rng.integers(0, len(AIRLINES), size)],
+        "seat_classes": np.array(['economy', 'business', 'first'])[rng.integers(0, 3, size)],
+        "flight_ids": rng.integers(1, size + 1, size),
+    }
+
+
+def run_batch(engine: DynamicPricingEngine, sizes: Iterable[int] = BATCH_SIZES) -> Dict[str, Dict[str, float]]:
+
+    results = {}
+    for size in sizes:
+        columns = synthetic_columns(size)
+        # Keep total work per size roughly constant
+        number = max(1, 100_000 // size)
+        result = measure(lambda: engine.calculate_prices_batch(**columns), number=number, repeat=3)
+        result["per_item_s"] = result["median_s"] / size
+        results[f"batch.{size}"] = result
+    return results
+
+
+def run(sizes: Iterable[int] = BATCH_SIZES) -> Dict[str, Dict[str, float]]:
+
+    engine = DynamicPricingEngine()
+    results = run_micro(engine)
+    results.update(run_batch(engine, sizes))
+    return results
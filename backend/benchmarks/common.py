@@ -0,0 +1,197 @@
+# Shared setup for the benchmark suite: import paths, timing helpers and a
+# synthetic SQLite stand-in for the MySQL schema.
+
+import os
+import random
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta
+from typing import Callable, Dict
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+REPO_DIR = os.path.dirname(BACKEND_DIR)
+
+# app.* modules import each other as `app`, models.py as `backend.app`
+for path in (BACKEND_DIR, REPO_DIR):
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+# database_connection builds the MySQL engine at import time; it is never
+# connected to here, it only needs a parseable URL.
+for key, value in {
+    "DB_USER": "bench",
+    "DB_PASSWORD": "bench",
+    "DB_HOST": "localhost",
+    "DB_PORT": "3306",
+    "DB_NAME": "Flight_Booking",
+}.items():
+    os.environ.setdefault(key, value)
+
+from sqlalchemy import create_engine, event, insert  # noqa: E402
+from sqlalchemy.orm import sessionmaker  # noqa: E402
+from sqlalchemy.pool import StaticPool  # noqa: E402
+
+AIRLINES = [
+    ('Air India', 'AI'),
+    ('IndiGo', '6E'),
+    ('SpiceJet', 'SG'),
+    ('Vistara', 'UK'),
+    ('Air Asia India', 'I5'),
+    ('GoFirst', 'G8'),
+]
+
+AIRPORTS = [
+    ('DEL', 'New Delhi'), ('BOM', 'Mumbai'), ('BLR', 'Bangalore'), ('MAA', 'Chennai'),
+    ('CCU', 'Kolkata'), ('HYD', 'Hyderabad'), ('PNQ', 'Pune'), ('AMD', 'Ahmedabad'),
+    ('GOI', 'Goa'), ('COK', 'Kochi'), ('JAI', 'Jaipur'), ('LKO', 'Lucknow'),
+    ('SXR', 'Srinagar'), ('IXL', 'Leh'), ('GAU', 'Guwahati'), ('TRV', 'Thiruvananthapuram'),
+    ('IXC', 'Chandigarh'), ('NAG', 'Nagpur'), ('PAT', 'Patna'), ('BBI', 'Bhubaneswar'),
+]
+
+# Every day of the horizon has this many DEL->BOM departures, so searches
+# on the benchmark route never come back empty.
+HOT_ROUTE = ('DEL', 'BOM')
+HOT_ROUTE_DAILY_FLIGHTS = 12
+
+SEAT_CLASSES = [('economy', 180, 1.0), ('business', 24, 2.5), ('first', 8, 4.5)]
+
+
+def measure(fn: Callable[[], object], number: int = 100, repeat: int = 5) -> Dict[str, float]:
+
+    # Best-of and median over `repeat` runs of `number` calls each
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        samples.append((time.perf_counter() - start) / number)
+
+    return {
+        "median_s": statistics.median(samples),
+        "min_s": min(samples),
+        "max_s": max(samples),
+        "calls": number * repeat
+    }
+
+
+class QueryCounter:
+
+    # Counts statements sent to the database while active:
+    #
+    #   with QueryCounter(engine) as counter:
+    #       ...
+    #   counter.count
+    def __init__(self, engine):
+        self.engine = engine
+        self.count = 0
+
+    def _on_execute(self, conn, cursor, statement, parameters, context, executemany):
+        self.count += 1
+
+    def __enter__(self):
+        self.count = 0
+        event.listen(self.engine, "before_cursor_execute", self._on_execute)
+        return self
+
+    def __exit__(self, *exc_info):
+        event.remove(self.engine, "before_cursor_execute", self._on_execute)
+
+
+def count_queries(engine, fn: Callable[[], object]) -> int:
+
+    with QueryCounter(engine) as counter:
+        fn()
+    return counter.count
+
+
+def create_sqlite_session_factory():
+
+    from app.models import Base
+
+    engine = create_engine(
+        "sqlite://",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool
+    )
+    Base.metadata.create_all(bind=engine)
+    return engine, sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+
+def populate_synthetic_dataset(engine, num_flights: int = 5000, days: int = 60, seed: int = 7) -> Dict[str, int]:
+
+    from app.models import Airline, Airport, Flight, SeatInventory, User
+
+    rng = random.Random(seed)
+    today = datetime.combine(datetime.now().date(), datetime.min.time())
+
+    with engine.begin() as conn:
+        conn.execute(insert(Airline), [
+            {"AirlineID": i, "Airline_Name": name, "Airline_Code": code, "Country": "India"}
+            for i, (name, code) in enumerate(AIRLINES, start=1)
+        ])
+        conn.execute(insert(Airport), [
+            {
+                "AirportID": i,
+                "Airport_Name": f"{city} Airport",
+                "Airport_Code": code,
+                "City": city,
+                "Country": "India",
+                "Timezone": "Asia/Kolkata"
+            }
+            for i, (code, city) in enumerate(AIRPORTS, start=1)
+        ])
+        conn.execute(insert(User), [{
+            "UserID": 1,
+            "Email": "bench@example.com",
+            "PasswordHash": "x",
+            "First_name": "Bench",
+            "Last_name": "User",
+            "Phone": "+919999999999"
+        }])
+
+        airport_ids = {code: i for i, (code, _) in enumerate(AIRPORTS, start=1)}
+        hot_total = HOT_ROUTE_DAILY_FLIGHTS * days
+        flights, inventories = [], []
+        for flight_id in range(1, num_flights + 1):
+            if flight_id <= hot_total:
+                origin, destination = HOT_ROUTE
+                day, slot = divmod(flight_id - 1, HOT_ROUTE_DAILY_FLIGHTS)
+                departure = today + timedelta(days=day + 1, minutes=300 + slot * 90)
+            else:
+                origin, destination = rng.sample([code for code, _ in AIRPORTS], 2)
+                departure = today + timedelta(days=rng.randint(1, days), hours=rng.randint(0, 23))
+
+            duration = rng.randint(60, 240)
+            airline_id = rng.randint(1, len(AIRLINES))
+            flights.append({
+                "FlightID": flight_id,
+                "AirlineID": airline_id,
+                "Flight_Number": f"{AIRLINES[airline_id - 1][1]}{flight_id}",
+                "Departure_AirportID": airport_ids[origin],
+                "Arrival_AirportID": airport_ids[destination],
+                "Departure_Time": departure,
+                "Arrival_Time": departure + timedelta(minutes=duration),
+                "Duration": duration,
+                "Price": round(rng.uniform(2500, 9000), 2),
+                "Seats_Available": sum(seats for _, seats, _ in SEAT_CLASSES),
+                "Flight_status": "scheduled"
+            })
+            for seat_class, seats, multiplier in SEAT_CLASSES:
+                inventories.append({
+                    "FlightID": flight_id,
+                    "Class": seat_class,
+                    "Total_Seats": seats,
+                    "Available_seats": rng.randint(seats // 4, seats),
+                    "Price": multiplier
+                })
+
+        conn.execute(insert(Flight), flights)
+        conn.execute(insert(SeatInventory), inventories)
+
+    return {
+        "flights": num_flights,
+        "inventories": num_flights * len(SEAT_CLASSES),
+        "hot_route_flights": min(hot_total, num_flights),
+        "days": days
+    }
@@ -0,0 +1,127 @@
+# Benchmark runner
+#
+#   cd backend
+#   python -m benchmarks.run                      # all suites, writes benchmarks/results.json
+#   python -m benchmarks.run --suite pricing --quick
+#   python -m benchmarks.run --baseline previous.json --tolerance 0.25
+#   BENCH_DATABASE_URL=mysql+pymysql://... python -m benchmarks.run --suite contention
+#
+# Exits with status 1 when a benchmark exceeds its limit in thresholds.json
+# or regresses past --tolerance against a baseline results file.
+
+import argparse
+import json
+import os
+import platform
+import sys
+from datetime import datetime
+from typing import Dict, List
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+
+from benchmarks import common  # noqa: E402,F401  (sets up import paths and env)
+
+DEFAULT_THRESHOLDS = os.path.join(BENCH_DIR, "thresholds.json")
+DEFAULT_OUTPUT = os.path.join(BENCH_DIR, "results.json")
+
+
+def run_suites(suites: List[str], quick: bool) -> Dict[str, Dict[str, float]]:
+
+    results = {}
+    if "pricing" in suites:
+        from benchmarks import bench_pricing
+        sizes = bench_pricing.BATCH_SIZES[:2] if quick else bench_pricing.BATCH_SIZES
+        results.update(bench_pricing.run(sizes))
+    if "endpoints" in suites:
+        from benchmarks import bench_endpoints
+        results.update(bench_endpoints.run(num_flights=1000 if quick else 5000))
+    if "contention" in suites:
+        from benchmarks import bench_booking_contention
+        results.update(bench_booking_contention.run(per_thread=5 if quick else 25))
+    return results
+
+
+def check_regressions(
+    results: Dict[str, Dict[str, float]],
+    thresholds: Dict[str, Dict[str, float]],
+    baseline: Dict[str, Dict[str, float]],
+    tolerance: float
+) -> List[str]:
+
+    failures = []
+    for name, result in results.items():
+        for metric, limit in thresholds.get(name, {}).items():
+            value = result.get(metric)
+            if value is not None and value > limit:
+                failures.append(f"{name}: {metric}={value:.3g} exceeds threshold {limit:.3g}")
+
+        previous = baseline.get(name)
+        if previous and previous.get("median_s"):
+            ratio = result["median_s"] / previous["median_s"]
+            if ratio > 1.0 + tolerance:
+                failures.append(
+                    f"{name}: median {result['median_s']:.3g}s is {ratio:.2f}x the baseline "
+                    f"{previous['median_s']:.3g}s"
+                )
+    return failures
+
+
+def main(argv=None) -> int:
+
+    parser = argparse.ArgumentParser(description="Pricing and search benchmarks")
+    parser.add_argument("--suite", action="append", choices=["pricing", "endpoints", "contention"],
+                        help="Suite to run (repeatable, default: all)")
+    parser.add_argument("--quick", action="store_true", help="Skip the largest batch and dataset sizes")
+    parser.add_argument("--output", default=DEFAULT_OUTPUT, help="Where to write the JSON results")
+    parser.add_argument("--thresholds", default=DEFAULT_THRESHOLDS, help="Absolute limits per benchmark")
+    parser.add_argument("--baseline", help="Previous results JSON to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.25,
+                        help="Allowed slowdown versus --baseline (0.25 = 25%%)")
+    args = parser.parse_args(argv)
+
+    results = run_suites(args.suite or ["pricing", "endpoints", "contention"], args.quick)
+
+    thresholds = {}
+    if args.thresholds and os.path.exists(args.thresholds):
+        with open(args.thresholds) as f:
+            thresholds = json.load(f)
+    baseline = {}
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f).get("results", {})
+
+    failures = check_regressions(results, thresholds, baseline, args.tolerance)
+
+    report = {
+        "meta": {
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "quick": args.quick
+        },
+        "results": results,
+        "regressions": failures
+    }
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2, sort_keys=True)
+
+    width = max(len(name) for name in results) if results else 0
+    for name, result in sorted(results.items()):
+        line = f"{name:<{width}}  median {result['median_s'] * 1e6:12.2f} us"
+        if "per_item_s" in result:
+            line += f"  ({result['per_item_s'] * 1e9:.1f} ns/item)"
+        print(line)
+
+    if failures:
+        print("\nRegressions:")
+        for failure in failures:
+            print(f"  - {failure}")
+        return 1
+
+    print(f"\nNo regressions. Results written to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
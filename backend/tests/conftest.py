@@ -0,0 +1,5 @@
+# Shared test setup: the benchmark helpers put backend/ and the repo root on
+# sys.path and give database_connection a parseable URL, so app modules
+# import without a MySQL server. Tests use the synthetic SQLite dataset.
+
+import benchmarks.common  # noqa: F401
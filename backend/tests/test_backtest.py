@@ -0,0 +1,44 @@
+from types import SimpleNamespace
+
+from app.services.backtest import BASELINE_PLAN, build_candidate_plans
+from app.services.pricing_engine import DynamicPricingEngine
+from app.services.pricing_plan import compile_pricing_plan
+
+
+def _active_plan():
+    rules = [
+        SimpleNamespace(RuleID=1, Rule_type='time_based', Multiplier_min=0.85, Multiplier_max=1.60),
+        SimpleNamespace(RuleID=2, Rule_type='demand_based', Multiplier_min=0.90, Multiplier_max=1.50),
+    ]
+    return compile_pricing_plan(rules, DynamicPricingEngine().default_plan)
+
+
+def test_overrides_become_plans():
+
+    base = _active_plan()
+    plans = build_candidate_plans(base, {
+        'cheaper_far_out': {'time_factors': [None, 0.5, 0.3, 0.15, 0.0, -0.10, -0.15]},
+        'tighter_cap': {'fare_bounds': [0.7, 2.0]},
+    })
+
+    assert plans[BASELINE_PLAN] is base
+    assert plans['cheaper_far_out'].time_factors == (None, 0.5, 0.3, 0.15, 0.0, -0.10, -0.15)
+    assert plans['cheaper_far_out'].version == 'cheaper_far_out'
+    assert plans['tighter_cap'].fare_bounds == (0.7, 2.0)
+    assert plans['tighter_cap'].seat_factors == base.seat_factors
+
+
+def test_overrides_are_clamped_to_the_rule_bands():
+
+    plans = build_candidate_plans(_active_plan(), {
+        'aggressive': {
+            'time_factors': [None, 0.9, 0.3, 0.15, 0.0, -0.20, -0.40],
+            'final_hour_factor': 1.5,
+            'seat_factors': [0.8, 0.4, 0.2, 0.0, -0.3],
+        },
+    })
+
+    plan = plans['aggressive']
+    assert plan.time_factors == (None, 0.6, 0.3, 0.15, 0.0, -0.15, -0.15)
+    assert plan.final_hour_factor == 0.6
+    assert plan.seat_factors == (0.5, 0.4, 0.2, 0.0, -0.1)
@@ -0,0 +1,87 @@
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi import HTTPException
+
+from benchmarks.bench_endpoints import _passenger
+from benchmarks.common import create_sqlite_session_factory, populate_synthetic_dataset
+from app.models import Booking
+from app.schemas import BookingCreate
+from app.services.booking_service import BookingService
+
+
+@pytest.fixture
+def db():
+    engine, SessionLocal = create_sqlite_session_factory()
+    populate_synthetic_dataset(engine, num_flights=20, days=5)
+    session = SessionLocal()
+    yield session
+    session.close()
+    engine.dispose()
+
+
+def _hold(db, flight_id: int = 1) -> Booking:
+    return BookingService.create_booking(
+        BookingCreate(FlightID=flight_id, Seat_class="economy", passengers=[_passenger(0)]),
+        user_id=1,
+        db=db
+    )
+
+
+def _confirm_error(db, pnr: str) -> HTTPException:
+    with pytest.raises(HTTPException) as error:
+        BookingService.confirm_booking(pnr, "card", db)
+    return error.value
+
+
+def _past_deadline(db, booking: Booking, **values) -> None:
+    db.query(Booking).filter(Booking.BookingID == booking.BookingID).update(
+        {'Expiry_time': datetime.now() - timedelta(minutes=1), **values}
+    )
+    db.commit()
+    db.expire_all()
+
+
+def test_hold_released_by_the_expiry_loop_reports_expiry(db):
+
+    booking = _hold(db)
+    # What the expiry loop writes when it releases the hold
+    _past_deadline(db, booking, Booking_status='cancelled')
+
+    error = _confirm_error(db, booking.pnr)
+    assert error.status_code == 400 and "expired" in error.detail
+
+
+def test_expired_pending_hold_reports_expiry(db):
+
+    booking = _hold(db)
+    _past_deadline(db, booking)
+
+    error = _confirm_error(db, booking.pnr)
+    assert error.status_code == 400 and "expired" in error.detail
+    assert db.query(Booking.Booking_status).filter(
+        Booking.BookingID == booking.BookingID
+    ).scalar() == 'cancelled'
+
+
+def test_cancelled_hold_reports_cancellation_after_its_deadline(db):
+
+    booking = _hold(db)
+    BookingService.cancel_booking(booking.pnr, db)
+    # The deadline is dropped, so its passing later does not read as expiry
+    db.expire_all()
+    assert db.query(Booking.Expiry_time).filter(
+        Booking.BookingID == booking.BookingID
+    ).scalar() is None
+
+    error = _confirm_error(db, booking.pnr)
+    assert error.status_code == 400 and "cancelled" in error.detail
+
+
+def test_confirmed_booking_cannot_be_confirmed_again(db):
+
+    booking = _hold(db)
+    BookingService.confirm_booking(booking.pnr, "card", db)
+
+    error = _confirm_error(db, booking.pnr)
+    assert error.status_code == 400 and "already confirmed" in error.detail
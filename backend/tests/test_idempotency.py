@@ -0,0 +1,122 @@
+import threading
+import time
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi import HTTPException, Response
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.models import Base, IdempotencyKey
+from app.services.idempotency import IdempotencyStore
+
+SCOPE = "bookings.create:1"
+
+
+@pytest.fixture
+def db(tmp_path):
+    # A file database, so worker threads get connections of their own
+    engine = create_engine(
+        f"sqlite:///{tmp_path / 'idempotency.db'}",
+        connect_args={"check_same_thread": False}
+    )
+    Base.metadata.create_all(bind=engine)
+    session = sessionmaker(bind=engine)()
+    yield session
+    session.close()
+    engine.dispose()
+
+
+class Handler:
+
+    def __init__(self, status_code: int = 201, delay: float = 0.0):
+        self.status_code = status_code
+        self.delay = delay
+        self.calls = 0
+
+    def __call__(self) -> Response:
+        self.calls += 1
+        time.sleep(self.delay)
+        return Response(content=b'{"pnr":"ABC123"}', status_code=self.status_code)
+
+
+def test_retry_replays_the_stored_response(db):
+
+    store = IdempotencyStore(persist=True)
+    handler = Handler()
+    first = store.run(db, "key-1", SCOPE, "body", handler)
+    retry = store.run(db, "key-1", SCOPE, "body", handler)
+
+    assert handler.calls == 1
+    assert retry.body == first.body and retry.status_code == 201
+    assert retry.headers["Idempotent-Replayed"] == "true"
+
+
+def test_key_reused_with_another_body_is_rejected(db):
+
+    store = IdempotencyStore(persist=True)
+    store.run(db, "key-1", SCOPE, "body", Handler())
+    with pytest.raises(HTTPException) as error:
+        store.run(db, "key-1", SCOPE, "other body", Handler())
+    assert error.value.status_code == 422
+
+
+def test_other_worker_replays_from_the_table(db):
+
+    handler = Handler()
+    IdempotencyStore(persist=True).run(db, "key-1", SCOPE, "body", handler)
+    replay = IdempotencyStore(persist=True).run(db, "key-1", SCOPE, "body", handler)
+
+    assert handler.calls == 1
+    assert replay.headers["Idempotent-Replayed"] == "true"
+
+
+def test_error_response_releases_the_key(db):
+
+    store = IdempotencyStore(persist=True)
+    failing = Handler(status_code=409)
+    assert store.run(db, "key-1", SCOPE, "body", failing).status_code == 409
+    assert db.query(IdempotencyKey).count() == 0
+
+    succeeding = Handler()
+    assert store.run(db, "key-1", SCOPE, "body", succeeding).status_code == 201
+    assert succeeding.calls == 1
+
+
+def test_running_request_keeps_its_key_past_the_lease(db):
+
+    lease = 0.3
+    slow = Handler(delay=4 * lease)
+    worker_db = sessionmaker(bind=db.get_bind())()
+    worker = threading.Thread(
+        target=IdempotencyStore(lease=lease, persist=True).run,
+        args=(worker_db, "key-1", SCOPE, "body", slow)
+    )
+    worker.start()
+    time.sleep(2 * lease)
+
+    # Another worker retries after the lease has run out once over
+    retry = Handler()
+    with pytest.raises(HTTPException) as error:
+        IdempotencyStore(lease=lease, persist=True).run(db, "key-1", SCOPE, "body", retry)
+    worker.join()
+    worker_db.close()
+
+    assert error.value.status_code == 409
+    assert retry.calls == 0 and slow.calls == 1
+
+
+def test_abandoned_claim_is_taken_over_after_the_lease(db):
+
+    db.add(IdempotencyKey(
+        Scope_key=f"{SCOPE}:key-1",
+        Request_hash="x" * 64,
+        Created_at=datetime.utcnow() - timedelta(seconds=120)
+    ))
+    db.commit()
+
+    handler = Handler()
+    response = IdempotencyStore(lease=60, persist=True).run(db, "key-1", SCOPE, "body", handler)
+
+    assert response.status_code == 201 and handler.calls == 1
+    assert db.query(IdempotencyKey.Status_code).scalar() == 201
@@ -0,0 +1,53 @@
+import re
+
+import numpy as np
+
+from benchmarks.common import create_sqlite_session_factory
+from app.models import Booking
+from app.services import pnr_allocator as allocator_module
+from app.services.pnr_allocator import PNR_SPACE, PnrAllocator, encode_pnr
+
+PNR_FORMAT = re.compile(r"^[A-Z]{3}\d{3}$")
+
+
+def test_sequence_to_code_is_a_bijection():
+
+    # Every code of the space is hit once: a surjection between two sets of
+    # the same size is a bijection
+    seen = np.zeros(PNR_SPACE, dtype=bool)
+    chunk = 1_000_000
+    for start in range(0, PNR_SPACE, chunk):
+        values = np.arange(start, min(start + chunk, PNR_SPACE), dtype=np.int64)
+        seen[(values * allocator_module._MULTIPLIER + allocator_module._OFFSET) % PNR_SPACE] = True
+    assert seen.all()
+
+
+def test_codes_keep_the_pnr_format():
+
+    samples = [0, 1, 999, 1000, PNR_SPACE // 2, PNR_SPACE - 1]
+    codes = [encode_pnr(value) for value in samples]
+    assert all(PNR_FORMAT.match(code) for code in codes)
+    assert len(set(codes)) == len(codes)
+    # Neighbouring sequence values do not give neighbouring codes
+    assert encode_pnr(1)[:3] != encode_pnr(0)[:3]
+
+
+def test_workers_draw_disjoint_blocks_and_skip_taken_codes():
+
+    engine, SessionLocal = create_sqlite_session_factory()
+    db = SessionLocal()
+    try:
+        # A booking from the old random generator already holds a code of block 1
+        taken = encode_pnr(5)
+        db.add(Booking(pnr=taken, UserID=1, FlightID=1, Num_passengers=1, Total_price=1))
+        db.commit()
+
+        first, second = PnrAllocator(block_size=10), PnrAllocator(block_size=10)
+        codes = [first.allocate(db) for _ in range(15)] + [second.allocate(db) for _ in range(15)]
+
+        assert len(set(codes)) == len(codes)
+        assert taken not in codes
+        assert all(PNR_FORMAT.match(code) for code in codes)
+    finally:
+        db.close()
+        engine.dispose()
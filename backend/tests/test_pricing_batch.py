@@ -0,0 +1,70 @@
+import random
+from datetime import datetime, timedelta
+
+from app.services.pricing_engine import DynamicPricingEngine
+
+CODES = ['DEL', 'BOM', 'BLR', 'MAA', 'CCU', 'HYD', 'GOI']
+AIRLINES = ['AI', '6E', 'SG', 'UK', 'I5', 'G8']
+CLASSES = [('economy', 180), ('business', 24), ('first', 8)]
+NOW = datetime(2026, 10, 16, 10, 0)
+
+
+def _random_rows(count: int, seed: int = 1):
+
+    rng = random.Random(seed)
+    rows = []
+    for flight_id in range(1, count + 1):
+        origin, destination = rng.sample(CODES, 2)
+        seat_class, total = rng.choice(CLASSES)
+        rows.append({
+            'base_fare': round(rng.uniform(2000, 15000), 2),
+            'seats_available': rng.randint(0, total),
+            'total_seats': total,
+            'departure_time': NOW + timedelta(minutes=rng.randint(30, 60 * 24 * 90)),
+            'origin_code': origin,
+            'destination_code': destination,
+            'airline_code': rng.choice(AIRLINES),
+            'seat_class': seat_class,
+            'flight_id': flight_id
+        })
+    return rows
+
+
+def _batch(engine, rows, breakdown=True):
+    return engine.calculate_prices_batch(
+        base_fares=[row['base_fare'] for row in rows],
+        seats_available=[row['seats_available'] for row in rows],
+        total_seats=[row['total_seats'] for row in rows],
+        departure_times=[row['departure_time'] for row in rows],
+        origin_codes=[row['origin_code'] for row in rows],
+        destination_codes=[row['destination_code'] for row in rows],
+        airline_codes=[row['airline_code'] for row in rows],
+        seat_classes=[row['seat_class'] for row in rows],
+        flight_ids=[row['flight_id'] for row in rows],
+        now=NOW,
+        breakdown=breakdown
+    )
+
+
+def test_batch_matches_scalar_quotes():
+
+    engine = DynamicPricingEngine()
+    engine.configure_demand(mode='deterministic', seed=3)
+    rows = _random_rows(3000)
+    batch = _batch(engine, rows)
+
+    for i, row in enumerate(rows):
+        quote = engine.calculate_price(**row, now=NOW)
+        for name, value in quote.items():
+            assert batch[name][i] == value, (name, row)
+
+
+def test_batch_price_only_matches_scalar():
+
+    engine = DynamicPricingEngine()
+    engine.configure_demand(mode='deterministic', seed=3)
+    rows = _random_rows(500, seed=2)
+    prices = _batch(engine, rows, breakdown=False)['final_price']
+
+    for i, row in enumerate(rows):
+        assert prices[i] == engine.calculate_price(**row, now=NOW, breakdown=False)['final_price']
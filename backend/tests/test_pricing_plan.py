@@ -0,0 +1,93 @@
+import os
+import re
+from datetime import datetime
+from types import SimpleNamespace
+
+import numpy as np
+
+from benchmarks.common import REPO_DIR
+from app.services.pricing_engine import DynamicPricingEngine
+from app.services.pricing_plan import compile_pricing_plan
+from tests.test_pricing_batch import NOW, _random_rows
+
+SEED_ROW = re.compile(r"\('([^']+)', '(\w+)', ([\d.]+), ([\d.]+), TRUE\)")
+
+
+def _seeded_rules():
+
+    # The Pricing_rules rows database.sql inserts
+    with open(os.path.join(REPO_DIR, 'Database', 'database.sql')) as sql:
+        rows = SEED_ROW.findall(sql.read())
+    assert rows
+    return [
+        SimpleNamespace(RuleID=rule_id, Rule_name=name, Rule_type=rule_type,
+                        Multiplier_min=float(low), Multiplier_max=float(high))
+        for rule_id, (name, rule_type, low, high) in enumerate(rows, start=1)
+    ]
+
+
+def _quotes(engine, plan):
+    rows = _random_rows(2000, seed=5)
+    return engine.calculate_prices_batch(
+        base_fares=[row['base_fare'] for row in rows],
+        seats_available=[row['seats_available'] for row in rows],
+        total_seats=[row['total_seats'] for row in rows],
+        departure_times=[row['departure_time'] for row in rows],
+        origin_codes=[row['origin_code'] for row in rows],
+        destination_codes=[row['destination_code'] for row in rows],
+        airline_codes=[row['airline_code'] for row in rows],
+        seat_classes=[row['seat_class'] for row in rows],
+        flight_ids=[row['flight_id'] for row in rows],
+        now=NOW,
+        plan=plan
+    )
+
+
+def test_seeded_rules_keep_the_built_in_factors():
+
+    engine = DynamicPricingEngine()
+    base = engine.default_plan
+    plan = compile_pricing_plan(_seeded_rules(), base)
+
+    assert plan.version != base.version
+    assert plan.seat_factors == base.seat_factors
+    assert plan.time_factors == base.time_factors
+    assert plan.last_day_factor == base.last_day_factor
+    assert plan.final_hour_factor == base.final_hour_factor
+
+
+def test_seeded_rules_do_not_change_quotes():
+
+    engine = DynamicPricingEngine()
+    engine.configure_demand(mode='deterministic', seed=11)
+    base = _quotes(engine, engine.default_plan)
+    compiled = _quotes(engine, compile_pricing_plan(_seeded_rules(), engine.default_plan))
+
+    for name, values in base.items():
+        np.testing.assert_array_equal(compiled[name], values, err_msg=name)
+
+
+def test_narrow_rules_bound_each_factor():
+
+    engine = DynamicPricingEngine()
+    rules = [
+        SimpleNamespace(RuleID=1, Rule_type='time_based', Multiplier_min=0.95, Multiplier_max=1.40),
+        SimpleNamespace(RuleID=2, Rule_type='demand_based', Multiplier_min=1.00, Multiplier_max=1.30),
+    ]
+    plan = compile_pricing_plan(rules, engine.default_plan)
+
+    assert plan.final_hour_factor == 0.40
+    assert plan.last_day_factor == 0.40
+    assert min(factor for factor in plan.time_factors if factor is not None) == -0.05
+    assert plan.seat_factors == (0.30, 0.30, 0.20, 0.0, 0.0)
+    assert plan.clamp_factor('peak_hour_factor', -0.10) == -0.05
+    assert plan.clamp_factor('demand_factor', 0.35) == 0.30
+    # Types without rules are left alone
+    assert plan.clamp_factor('seasonal_factor', 0.25) == 0.25
+
+    quote = engine.calculate_price(
+        5000.0, 1, 180, datetime(2026, 10, 16, 10, 30), 'DEL', 'BOM', '6E',
+        now=NOW, plan=plan
+    )
+    assert quote['time_factor'] == 0.40
+    assert quote['seat_factor'] == 0.30
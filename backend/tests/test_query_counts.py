@@ -0,0 +1,119 @@
+# Statements per call on the read and booking paths, against the synthetic
+# SQLite dataset. An N+1 pattern (lazy loads per flight, per inventory row,
+# per passenger) changes these counts and fails here.
+
+from datetime import date, timedelta
+
+import pytest
+
+from benchmarks.bench_endpoints import _passenger
+from benchmarks.common import (
+    HOT_ROUTE,
+    QueryCounter,
+    create_sqlite_session_factory,
+    populate_synthetic_dataset,
+)
+from app.routers import flights as flights_router
+from app.schemas import BookingCreate, FlightSearchRequest
+from app.services.booking_service import BookingService
+from app.services.pricing_engine import quote_cache
+from app.services.search_index import search_index
+
+
+@pytest.fixture(scope="module")
+def database():
+    engine, SessionLocal = create_sqlite_session_factory()
+    populate_synthetic_dataset(engine, num_flights=500, days=10)
+    yield engine, SessionLocal
+    engine.dispose()
+
+
+@pytest.fixture
+def db(database):
+    _, SessionLocal = database
+    session = SessionLocal()
+    search_index.clear()
+    quote_cache.clear()
+    yield session
+    search_index.clear()
+    search_index.session_factory = None
+    session.close()
+
+
+def _queries(database, db, fn) -> int:
+
+    engine, _ = database
+    # Nothing may come from the identity map of an earlier call
+    db.expunge_all()
+    with QueryCounter(engine) as counter:
+        fn()
+    return counter.count
+
+
+def _search(db, days_ahead: int = 2):
+    return flights_router.search_flights(
+        FlightSearchRequest(
+            origin=HOT_ROUTE[0],
+            destination=HOT_ROUTE[1],
+            departure_date=date.today() + timedelta(days=days_ahead),
+            seat_class="economy",
+            passengers=1
+        ),
+        db
+    )
+
+
+def test_listing_is_one_query(database, db):
+
+    for limit in (10, 100):
+        assert _queries(database, db, lambda: flights_router.list_all_flights(
+            skip=0, limit=limit, cursor=None, order_by="flight_id",
+            fields=None, include_breakdown=True, db=db
+        )) == 1
+
+
+def test_search_is_one_query(database, db):
+
+    assert _queries(database, db, lambda: _search(db)) == 1
+
+
+def test_indexed_search_skips_the_database(database, db):
+
+    _, SessionLocal = database
+    search_index.session_factory = SessionLocal
+    search_index.rebuild()
+    assert _queries(database, db, lambda: _search(db)) == 0
+
+
+def test_details_take_two_queries(database, db):
+
+    assert _queries(database, db, lambda: flights_router.get_flight_details(
+        flight_id=1, fields=None, include_breakdown=True, db=db
+    )) == 2
+    # Flight query plus one IN query for every flight's inventory
+    for count in (3, 100):
+        ids = ",".join(str(flight_id) for flight_id in range(1, count + 1))
+        assert _queries(database, db, lambda: flights_router.get_flight_details_batch(
+            ids=ids, fields=None, include_breakdown=True, db=db
+        )) == 2
+
+
+def test_booking_statements_do_not_grow_with_passengers(database, db):
+
+    def book(flight_id: int, party_size: int):
+        return lambda: BookingService.create_booking(
+            BookingCreate(
+                FlightID=flight_id,
+                Seat_class="economy",
+                passengers=[_passenger(i) for i in range(party_size)]
+            ),
+            user_id=1,
+            db=db
+        )
+
+    # The first booking also claims a block of PNRs
+    book(1, 1)()
+    # Flight and inventory reads, booking and passenger inserts, passenger
+    # ids, conditional seat UPDATE
+    for flight_id, party_size in ((2, 1), (3, 4), (4, 9)):
+        assert _queries(database, db, book(flight_id, party_size)) == 6
@@ -0,0 +1,87 @@
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from app.services.pricing_engine import (
+    get_dynamic_price, get_dynamic_prices_batch, pricing_engine, quote_cache
+)
+
+DEPARTURE = datetime.now() + timedelta(days=5, hours=3)
+ROWS = [
+    # (FlightID, class, base fare, seats available, total seats, airline)
+    (101, 'economy', 5400.0, 120, 180, '6E'),
+    (102, 'economy', 6100.0, 14, 180, 'AI'),
+    (102, 'business', 6100.0, 10, 24, 'AI'),
+    (103, 'first', 8800.0, 2, 8, 'UK'),
+]
+
+
+def _batch(rows, breakdown=True):
+    return get_dynamic_prices_batch(
+        base_fares=[row[2] for row in rows],
+        seats_available=[row[3] for row in rows],
+        total_seats=[row[4] for row in rows],
+        departure_times=[DEPARTURE] * len(rows),
+        origin_codes='DEL',
+        destination_codes='BOM',
+        airline_codes=[row[5] for row in rows],
+        seat_classes=[row[1] for row in rows],
+        flight_ids=[row[0] for row in rows],
+        breakdown=breakdown
+    )
+
+
+def _single(row, breakdown=True):
+    flight_id, seat_class, base_fare, available, total, airline = row
+    return get_dynamic_price(
+        base_fare, available, total, DEPARTURE, 'DEL', 'BOM', airline,
+        seat_class=seat_class, flight_id=flight_id, breakdown=breakdown
+    )
+
+
+def setup_function():
+    # Random demand mode, where only the cache keeps quotes consistent
+    pricing_engine.configure_demand(mode='random')
+    quote_cache.clear()
+
+
+def test_batch_reuses_single_quotes():
+
+    singles = [_single(row) for row in ROWS[:2]]
+    batch = _batch(ROWS)
+
+    for i, quote in enumerate(singles):
+        for name, value in quote.items():
+            assert batch[name][i] == value
+    # The rest were priced and stored for the single-quote path
+    for i, row in enumerate(ROWS[2:], start=2):
+        assert _single(row)['final_price'] == batch['final_price'][i]
+
+
+def test_single_quotes_reuse_batch_prices():
+
+    batch = _batch(ROWS)
+    again = _batch(ROWS)
+
+    np.testing.assert_array_equal(batch['final_price'], again['final_price'])
+    for i, row in enumerate(ROWS):
+        assert _single(row, breakdown=False)['final_price'] == batch['final_price'][i]
+
+
+def test_price_only_batch_uses_full_quotes():
+
+    full = [_single(row) for row in ROWS]
+    prices = _batch(ROWS, breakdown=False)
+
+    assert list(prices) == ['final_price']
+    assert prices['final_price'].tolist() == [quote['final_price'] for quote in full]
+
+
+def test_inventory_change_drops_cached_quotes():
+
+    from app.services.inventory_events import notify_inventory_changed
+
+    _batch(ROWS)
+    notify_inventory_changed([101])
+    assert quote_cache.get((101, 'economy', 120, pricing_engine.time_bucket())) is None
+    assert quote_cache.get((103, 'first', 2, pricing_engine.time_bucket())) is not None
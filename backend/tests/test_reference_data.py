@@ -0,0 +1,38 @@
+from benchmarks.common import create_sqlite_session_factory, populate_synthetic_dataset
+from app.models import Airport
+from app.services.reference_data import get_reference_set, reference_cache, reload_reference_data
+from app.services.search_index import search_index
+
+
+def test_reload_picks_up_edited_airports():
+
+    engine, SessionLocal = create_sqlite_session_factory()
+    populate_synthetic_dataset(engine, num_flights=50, days=5)
+    db = SessionLocal()
+    reference_cache.clear()
+    search_index.session_factory = SessionLocal
+    try:
+        search_index.rebuild()
+        before = get_reference_set(db, 'airports')
+
+        db.query(Airport).filter(Airport.Airport_Code == 'BOM').update({'City': 'Bombay'})
+        db.commit()
+        # Still cached until the TTL runs out
+        assert get_reference_set(db, 'airports').etag == before.etag
+
+        etags = reload_reference_data(db)
+        assert etags['airports'] != before.etag
+        assert b'Bombay' in get_reference_set(db, 'airports').body
+        # Flight records in the search index carry the new city as well
+        cities = {
+            record.destination_city
+            for record in map(search_index.get, range(1, 51))
+            if record is not None and record.destination_code == 'BOM'
+        }
+        assert cities == {'Bombay'}
+    finally:
+        reference_cache.clear()
+        search_index.clear()
+        search_index.session_factory = None
+        db.close()
+        engine.dispose()
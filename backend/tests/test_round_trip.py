@@ -0,0 +1,60 @@
+import random
+from datetime import datetime, timedelta
+
+from app.services.round_trip import top_k_combinations
+
+START = datetime(2026, 10, 20)
+
+
+def _case(rng: random.Random, outbound: int, inbound: int):
+    outbound_prices = sorted(round(rng.uniform(3000, 9000), 2) for _ in range(outbound))
+    return_prices = sorted(round(rng.uniform(3000, 9000), 2) for _ in range(inbound))
+    earliest_return = [START + timedelta(hours=rng.randint(0, 72)) for _ in range(outbound)]
+    return_departures = [START + timedelta(hours=rng.randint(0, 72)) for _ in range(inbound)]
+    return outbound_prices, return_prices, earliest_return, return_departures
+
+
+def _brute_force(outbound_prices, return_prices, k, earliest_return, return_departures):
+    pairs = [
+        (outbound_prices[i] + return_prices[j], i, j)
+        for i in range(len(outbound_prices))
+        for j in range(len(return_prices))
+        if return_departures[j] >= earliest_return[i]
+    ]
+    return sorted(pairs)[:k]
+
+
+def test_matches_brute_force():
+
+    rng = random.Random(14)
+    for _ in range(300):
+        outbound_prices, return_prices, earliest, departures = _case(
+            rng, rng.randint(1, 25), rng.randint(1, 25)
+        )
+        k = rng.randint(1, 40)
+        result = top_k_combinations(outbound_prices, return_prices, k, earliest, departures)
+        expected = _brute_force(outbound_prices, return_prices, k, earliest, departures)
+
+        # Ties may come out in either order; totals and fit must agree
+        assert len(result) == len(expected)
+        assert len(set(result)) == len(result)
+        assert all(departures[j] >= earliest[i] for i, j in result)
+        assert [outbound_prices[i] + return_prices[j] for i, j in result] == [
+            total for total, _, _ in expected
+        ]
+
+
+def test_no_fitting_returns():
+
+    outbound_prices, return_prices = [100.0, 200.0], [50.0, 60.0]
+    late = [START + timedelta(days=5)] * 2
+    early = [START, START + timedelta(hours=1)]
+    assert top_k_combinations(outbound_prices, return_prices, 10, late, early) == []
+    assert top_k_combinations([], return_prices, 10, [], early) == []
+    assert top_k_combinations(outbound_prices, return_prices, 0, early, early) == []
+
+
+def test_cheapest_pairs_first_when_all_fit():
+
+    result = top_k_combinations([100.0, 150.0], [10.0, 20.0, 90.0], 4, [START] * 2, [START] * 3)
+    assert result == [(0, 0), (0, 1), (1, 0), (1, 1)]
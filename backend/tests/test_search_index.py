@@ -0,0 +1,37 @@
+from benchmarks.common import QueryCounter, create_sqlite_session_factory, populate_synthetic_dataset
+from app.models import SeatInventory
+from app.services.inventory_events import notify_inventory_changed
+from app.services.search_index import search_index
+
+
+def test_inventory_events_are_refreshed_in_one_batch():
+
+    engine, SessionLocal = create_sqlite_session_factory()
+    populate_synthetic_dataset(engine, num_flights=50, days=5)
+    db = SessionLocal()
+    search_index.session_factory = SessionLocal
+    try:
+        search_index.rebuild()
+        flight_ids = [3, 7, 11]
+        db.query(SeatInventory).filter(
+            SeatInventory.FlightID.in_(flight_ids), SeatInventory.Class == 'economy'
+        ).update({'Available_seats': 1}, synchronize_session=False)
+        db.commit()
+
+        # Write paths only mark the flights
+        with QueryCounter(engine) as counter:
+            notify_inventory_changed(flight_ids)
+        assert counter.count == 0
+        assert search_index.stats()['dirty'] == len(flight_ids)
+        assert search_index.get(3).inventory['economy'].available != 1
+
+        with QueryCounter(engine) as counter:
+            assert search_index.refresh_dirty() == len(flight_ids)
+        assert counter.count == 1
+        assert all(search_index.get(flight_id).inventory['economy'].available == 1 for flight_id in flight_ids)
+        assert not search_index.has_dirty
+    finally:
+        search_index.clear()
+        search_index.session_factory = None
+        db.close()
+        engine.dispose()
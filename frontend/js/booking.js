@@ -4,6 +4,7 @@ let selectedFlight = null;
 let searchParams = null;
 let passengerCount = 0;
 let currentPassengerData = [];
+let bookingIdempotency = { body: null, key: null };
 
 // Initialize page
 document.addEventListener('DOMContentLoaded', () => {
@@ -315,9 +316,11 @@ async function proceedToPayment() {
             passengers: passengers
         };
         
+        const body = JSON.stringify(bookingData);
         const response = await apiRequest(API_CONFIG.ENDPOINTS.CREATE_BOOKING, {
             method: 'POST',
-            body: JSON.stringify(bookingData)
+            headers: { 'Idempotency-Key': idempotencyKeyFor(bookingIdempotency, body) },
+            body: body
         });
         
         hideLoading();
@@ -9,9 +9,11 @@ const API_CONFIG = {
         
         // Flights
         SEARCH_FLIGHTS: '/api/v1/flights/search',
+        SEARCH_FLIGHTS_FACETED: '/api/v1/flights/search/faceted',
         GET_FLIGHT: '/api/v1/flights',
         LIST_AIRLINES: '/api/v1/flights/airlines/list',
         LIST_AIRPORTS: '/api/v1/flights/airports/list',
+        SUGGEST_AIRPORTS: '/api/v1/flights/airports/suggest',
         
         // Bookings
         CREATE_BOOKING: '/api/v1/bookings/create',
@@ -37,7 +39,7 @@ const STORAGE_KEYS = {
     BOOKING_DATA: 'booking_data'
 };
 
-// Indian cities and airports
+// Indian cities and airports; fallback until loadAirports() fetches the live list
 const INDIAN_AIRPORTS = [
     { code: 'DEL', city: 'New Delhi', name: 'Indira Gandhi International Airport' },
     { code: 'BOM', city: 'Mumbai', name: 'Chhatrapati Shivaji Maharaj International' },
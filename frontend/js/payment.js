@@ -3,6 +3,7 @@
 let bookingData = null;
 let timerInterval = null;
 let timeRemaining = 15 * 60; // 15 minutes in seconds
+let paymentIdempotency = { body: null, key: null };
 
 // Initialize page
 document.addEventListener('DOMContentLoaded', () => {
@@ -154,11 +155,14 @@ async function processPayment() {
         
         // Confirm booking with backend
         const endpoint = API_CONFIG.ENDPOINTS.CONFIRM_BOOKING.replace('{pnr}', bookingData.pnr);
+        const body = JSON.stringify({
+            payment_method: paymentMethod
+        });
         const response = await apiRequest(endpoint, {
             method: 'POST',
-            body: JSON.stringify({
-                payment_method: paymentMethod
-            })
+            // Keyed on the PNR too, so another booking never reuses the key
+            headers: { 'Idempotency-Key': idempotencyKeyFor(paymentIdempotency, endpoint + body) },
+            body: body
         });
         
         hideLoading();
@@ -16,6 +16,7 @@ document.addEventListener('DOMContentLoaded', async () => {
     }
     
     searchParams = JSON.parse(params);
+    await loadAirports();
     displaySearchSummary();
     
     // Search flights
@@ -37,17 +38,22 @@ function displaySearchSummary() {
         `${formatDate(searchParams.departure_date)} • ${searchParams.passengers} Passenger(s) • ${searchParams.seat_class}`;
 }
 
+// Filtered search: the server applies filters and sorting and returns facet counts
+function fetchFacetedResults(filters = {}) {
+    return apiRequest(API_CONFIG.ENDPOINTS.SEARCH_FLIGHTS_FACETED, {
+        method: 'POST',
+        body: JSON.stringify({ ...searchParams, ...filters })
+    });
+}
+
 // Search flights via API
 async function searchFlights() {
     showLoading();
     
     try {
-        const response = await apiRequest(API_CONFIG.ENDPOINTS.SEARCH_FLIGHTS, {
-            method: 'POST',
-            body: JSON.stringify(searchParams)
-        });
+        const response = await fetchFacetedResults();
         
-        allFlights = response;
+        allFlights = response.results;
         filteredFlights = [...allFlights];
         
         hideLoading();
@@ -56,7 +62,7 @@ async function searchFlights() {
             showNoResults();
         } else {
             displayFlights(filteredFlights);
-            populateAirlineFilters();
+            populateAirlineFilters(response.facets.airlines);
         }
         
     } catch (error) {
@@ -177,15 +183,14 @@ function bookFlight(flightId) {
     }
 }
 
-// Populate airline filters
-function populateAirlineFilters() {
-    const airlines = [...new Set(allFlights.map(f => f.airline_name))];
+// Populate airline filters from the airline facet
+function populateAirlineFilters(airlineFacets) {
     const container = document.getElementById('airline-filters');
     
-    container.innerHTML = airlines.map(airline => `
+    container.innerHTML = airlineFacets.map(airline => `
         <label class="checkbox-label">
-            <input type="checkbox" value="${airline}" class="airline-filter" checked>
-            <span>${airline}</span>
+            <input type="checkbox" value="${airline.airline_code}" class="airline-filter" checked>
+            <span>${airline.airline_name} (<span class="airline-count" data-code="${airline.airline_code}">${airline.count}</span>)</span>
         </label>
     `).join('');
     
@@ -218,54 +223,34 @@ function setupFilters() {
     });
 }
 
-// Apply all filters
-function applyFilters() {
-    filteredFlights = [...allFlights];
-    
-    // Filter by airline
+// Apply all filters on the server
+async function applyFilters() {
     const selectedAirlines = Array.from(document.querySelectorAll('.airline-filter:checked'))
         .map(cb => cb.value);
-    
-    if (selectedAirlines.length > 0) {
-        filteredFlights = filteredFlights.filter(f => 
-            selectedAirlines.includes(f.airline_name)
-        );
-    }
-    
-    // Filter by price
-    const maxPrice = parseInt(document.getElementById('price-range').value);
-    filteredFlights = filteredFlights.filter(f => f.dynamic_price <= maxPrice);
-    
-    // Filter by departure time
     const selectedTimes = Array.from(document.querySelectorAll('.time-filter:checked'))
         .map(cb => cb.value);
     
-    if (selectedTimes.length > 0) {
-        filteredFlights = filteredFlights.filter(f => {
-            const hour = new Date(f.Departure_Time).getHours();
-            
-            if (selectedTimes.includes('morning') && hour >= 6 && hour < 12) return true;
-            if (selectedTimes.includes('afternoon') && hour >= 12 && hour < 18) return true;
-            if (selectedTimes.includes('evening') && hour >= 18 && hour < 24) return true;
-            
-            return false;
+    try {
+        const response = await fetchFacetedResults({
+            airlines: selectedAirlines,
+            departure_bands: selectedTimes.length > 0 ? selectedTimes : null,
+            max_price: parseInt(document.getElementById('price-range').value),
+            sort_by: document.querySelector('input[name="sort"]:checked').value
         });
+        
+        filteredFlights = response.results;
+        allFlights = filteredFlights;
+        
+        // Counts for each airline under the other active filters
+        document.querySelectorAll('.airline-count').forEach(span => {
+            const facet = response.facets.airlines.find(a => a.airline_code === span.dataset.code);
+            span.textContent = facet ? facet.count : 0;
+        });
+        
+        displayFlights(filteredFlights);
+    } catch (error) {
+        showError(error.message || 'Failed to filter flights');
     }
-    
-    // Sort
-    const sortBy = document.querySelector('input[name="sort"]:checked').value;
-    
-    if (sortBy === 'price') {
-        filteredFlights.sort((a, b) => a.dynamic_price - b.dynamic_price);
-    } else if (sortBy === 'duration') {
-        filteredFlights.sort((a, b) => a.Duration - b.Duration);
-    } else if (sortBy === 'departure_time') {
-        filteredFlights.sort((a, b) => 
-            new Date(a.Departure_Time) - new Date(b.Departure_Time)
-        );
-    }
-    
-    displayFlights(filteredFlights);
 }
 
 // Reset filters
@@ -108,6 +108,26 @@ function showSuccess(message, containerId = 'success-message') {
     }
 }
 
+// Replace the built-in airport list with the server's; the browser cache
+// revalidates with If-None-Match, so repeat visits get an empty 304
+async function loadAirports() {
+    try {
+        const response = await fetch(`${API_CONFIG.BASE_URL}${API_CONFIG.ENDPOINTS.LIST_AIRPORTS}`);
+        if (!response.ok) {
+            return INDIAN_AIRPORTS;
+        }
+        const airports = await response.json();
+        INDIAN_AIRPORTS.splice(0, INDIAN_AIRPORTS.length, ...airports.map(airport => ({
+            code: airport.Airport_Code,
+            city: airport.City,
+            name: airport.Airport_Name
+        })));
+    } catch (error) {
+        console.error('Airport list unavailable, using built-in list:', error);
+    }
+    return INDIAN_AIRPORTS;
+}
+
 // Get query parameter from URL
 function getQueryParam(param) {
     const urlParams = new URLSearchParams(window.location.search);
@@ -166,6 +186,25 @@ function generateRandomPNR() {
     return pnr;
 }
 
+// Idempotency-Key for booking writes; reused when the same request is retried
+
+function generateIdempotencyKey() {
+    if (window.crypto && crypto.randomUUID) {
+        return crypto.randomUUID();
+    }
+    return `${Date.now().toString(36)}-${Math.random().toString(36).slice(2)}`;
+}
+
+// Same payload keeps its key so a resubmit is replayed; a changed payload
+// (e.g. after fixing a validation error) is a new request with a new key
+function idempotencyKeyFor(state, body) {
+    if (state.body !== body) {
+        state.body = body;
+        state.key = generateIdempotencyKey();
+    }
+    return state.key;
+}
+
 // Scroll to top smoothly
 function scrollToTop() {
     window.scrollTo({